@@ -1,251 +1,388 @@
+import time
+_PROCESS_START = time.time()           # before any other import, for --profile-startup
 import tkinter as tk
-from tkinter import messagebox, Toplevel
+from tkinter import messagebox, Toplevel, filedialog
 from tkinter import ttk                # ensure ttk is imported
+import argparse
 import calendar
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-import pyodbc
+import datetime
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+from urllib.parse import urlsplit
+import background
+import cache
+import charts
+import compare_batch
+import cube
+import daily_metrics
+import db
+import disk_cache
+import distribution
+import incremental
+import leaderboard
+import regression
+import rotation
+import schedule
+import telemetry
+import typeahead
+from background import LoadingIndicator
 import numpy as np
-import pandas as pd
 
-def show_regression_for_airline(airline_code):
-    from sklearn.linear_model import LinearRegression
-    from sklearn.metrics import r2_score
+# Per-request timeouts (seconds) for background queries
+REGRESSION_TIMEOUT = 120
+SERIES_TIMEOUT = 120
+CUBE_TIMEOUT = 600         # one scan of ops.Flights on first use
+ROTATION_TIMEOUT = 900     # a year of legs, read in chunks
+LEADERBOARD_TIMEOUT = 300  # every airline's daily stats in one scan
+LOOKUP_TIMEOUT = 30
 
+# How often the app checks for newly loaded flights (ms)
+REFRESH_CHECK_MS = 60_000
+
+# Plotting and HTTP modules cost most of the import time but most sessions
+# only look up one flight: they are imported on first use, and pre-warmed on a
+# worker once the search window is up
+PREWARM_MODULES = ("matplotlib.figure", "matplotlib.backends.backend_tkagg", "decimate", "requests")
+
+def prewarm():
+    for name in PREWARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"❌ Error pre-loading {name}:", e)
+
+# --profile-startup runs the app in a child process under `python -X importtime`;
+# the child prints its timestamps on a STARTUP_MARKER line once the search
+# window is drawn, then exits
+STARTUP_PROFILE_ENV = "AIRLINE_PROFILE_STARTUP"
+STARTUP_MARKER = "STARTUP_PROFILE "
+STARTUP_PROFILE_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_profile.jsonl")
+STARTUP_TOP_IMPORTS = 15
+
+def _parse_importtime(stderr):
+    """[(module, self ms, cumulative ms)] for the imports made directly by the app or Python's startup."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if name.startswith(" ") and not name.startswith("  "):   # depth 0: one separating space
+            imports.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return imports
+
+def profile_startup():
+    """Measure import time per module and the time until the search window is drawn."""
+    spawned = time.time()
+    child = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__)],
+                           env=dict(os.environ, **{STARTUP_PROFILE_ENV: "1"}),
+                           capture_output=True, text=True, timeout=300)
+    marks = None
+    for line in child.stdout.splitlines():
+        if line.startswith(STARTUP_MARKER):
+            marks = json.loads(line[len(STARTUP_MARKER):])
+    if marks is None:
+        print("❌ The app exited before its first window was drawn:")
+        print(child.stderr[-2000:])
+        return None
+
+    imports = sorted(_parse_importtime(child.stderr), key=lambda entry: -entry[2])
+    profile = {
+        "recorded_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "interpreter_s": round(marks["process_start"] - spawned, 3),
+        "app_imports_s": round(marks["imports_done"] - marks["process_start"], 3),
+        "first_window_s": round(marks["first_window"] - spawned, 3),
+        "top_imports": [{"module": name, "self_ms": round(own, 1), "cumulative_ms": round(total, 1)}
+                        for name, own, total in imports[:STARTUP_TOP_IMPORTS]],
+    }
+    print(f"Time to first window: {profile['first_window_s'] * 1000:8.0f} ms")
+    print(f"  Python startup:     {profile['interpreter_s'] * 1000:8.0f} ms")
+    print(f"  App imports:        {profile['app_imports_s'] * 1000:8.0f} ms")
+    print(f"\n{'module':40s} {'self ms':>9s} {'total ms':>9s}")
+    for entry in profile["top_imports"]:
+        print(f"{entry['module']:40s} {entry['self_ms']:9.1f} {entry['cumulative_ms']:9.1f}")
+    with open(STARTUP_PROFILE_LOG, "a", encoding="utf-8") as f:
+        f.write(json.dumps(profile) + "\n")
+    print(f"\n✅ Recorded in {STARTUP_PROFILE_LOG}")
+    return profile
+
+def fetch_regression_fits(airline_code):
+    """
+    Runs on a worker thread: per-day delay statistics are aggregated in the
+    database and the 3-month / 1-year / 5-year trends are solved together
+    (see regression.py). Returns [Fit or None, ...], or None if the airline
+    has no data.
+    """
+    stats = regression.fetch_daily_stats(airline_code)
+    if len(stats.dates) == 0:
+        return None
+    return regression.fit_windows(stats)
+
+
+def plot_regression_fits(chart, fits, airline_code):
+    """
+    Draw the 3-month / 1-year / 5-year fits on the chart's three axes, reusing
+    the artists of the previous airline (see charts.py).
+    """
+    import decimate
+    for ax, fit in zip(chart.axes, fits):
+        if fit is None:
+            ax.set_visible(False)
+            continue
+        ax.set_visible(True)
+        # One point per day (mean delay) — the fit itself uses every flight
+        fit_x = np.array([fit.dates[0], fit.dates[-1]])
+        label = f'Regression (R² = {fit.r2:.2f})'
+        if ax in chart.artists:
+            scatter, line = chart.artists[ax]
+            scatter.set_data(fit.dates, fit.means)
+            line.set_data(decimate.to_plot_x(fit_x), regression.predict(fit, fit_x))
+            line.set_label(label)
+            ax.get_legend().get_texts()[1].set_text(label)
+        else:
+            scatter = decimate.DensityScatter(ax, fit.dates, fit.means, alpha=0.4, label='Actual (daily mean)')
+            (line,) = ax.plot(decimate.to_plot_x(fit_x), regression.predict(fit, fit_x), color='red', label=label)
+            chart.artists[ax] = (scatter, line)
+            ax.set_xlabel("Date")
+            ax.set_ylabel("Arrival Delay (min)")
+            ax.legend()
+            ax.grid(True)
+            ax.tick_params(axis='x', labelrotation=30)
+        ax.set_title(f"{fit.title} — {airline_code}")
+        chart.fit(ax, scatter.x, scatter.y)
+    chart.refresh()
+
+
+def _open_regression_window():
     win = Toplevel()
-    win.title(f"Delay Regression: {airline_code}")
     win.geometry("1200x900")
     win.configure(bg='white')
 
-    try:
-        conn = pyodbc.connect(
-            "DRIVER={ODBC Driver 18 for SQL Server};"
-            "SERVER=127.0.0.1,1433;"
-            "DATABASE=Airline_Reporting_Carrier;"
-            "UID=sa;"
-            "PWD=Hunter3322!;"
-            "Encrypt=no;"
-            "TrustServerCertificate=yes;"
-        )
-        cursor = conn.cursor()
-        query = """
-        SELECT FlightDate, ArrDelayMinutes
-        FROM ops.Flights f
-        LEFT JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID
-        WHERE ra.ReportingAirline = ?
-          AND ArrDelayMinutes IS NOT NULL
-        ORDER BY FlightDate
-        """
-        cursor.execute(query, (airline_code,))
-        rows = cursor.fetchall()
-        conn.close()
+    loading = LoadingIndicator(win, bg='white').pack(pady=5)
+    status = tk.Label(win, text="", bg='white', fg='red')
+    status.pack()
+    chart = charts.Chart(win, nrows=3, figsize=(11, 10), fill='both', expand=True)
 
-        if not rows:
-            tk.Label(win, text="No data found.", bg='white', fg='red').pack()
-            return
+    def show(airline_code, fits=None):
+        """Fetch and fit `airline_code`, or draw `fits` already computed for it (leaderboard)."""
+        win.title(f"Delay Regression: {airline_code}")
+        status.config(text=f"Loading {airline_code} delays…", fg='black')
 
-        df = pd.DataFrame([(row.FlightDate, row.ArrDelayMinutes) for row in rows], columns=["FlightDate", "ArrDelayMinutes"])
-        df["FlightDate"] = pd.to_datetime(df["FlightDate"])
-        df = df.dropna()
+        def on_success(fits):
+            if chart.released:   # evicted: the window shows the note instead
+                status.config(text="")
+                return
+            if fits is None:
+                status.config(text=f"No data found for {airline_code}.", fg='red')
+                return
+            status.config(text="")
+            plot_regression_fits(chart, fits, airline_code)
 
-        now = pd.to_datetime("2020-03-31")  # Assuming max date from your database
+        def on_error(e):
+            print("❌ Error in regression:", e)
+            status.config(text="Error loading data", fg='red')
 
-        def plot_subset(title, subset_df):
-            if len(subset_df) < 2:
-                print(f"Not enough data for {title}")
-                return
+        # One window for every airline: a newer pick supersedes the running fit.
+        # Fits from the leaderboard go through the same key, so an older fetch cannot overwrite them
+        fetch = (lambda code: fits) if fits is not None else fetch_regression_fits
+        background.submit(fetch, airline_code, key=("regression", str(win)),
+                          owner=win, busy=loading, on_success=on_success, on_error=on_error,
+                          timeout=REGRESSION_TIMEOUT)
 
-            X = subset_df["FlightDate"].map(pd.Timestamp.toordinal).values.reshape(-1, 1)
-            y = subset_df["ArrDelayMinutes"].values
-            model = LinearRegression().fit(X, y)
-            y_pred = model.predict(X)
-            r2 = r2_score(y, y_pred)
+    return win, chart, show
 
-            fig, ax = plt.subplots(figsize=(7, 4))
-            ax.scatter(subset_df["FlightDate"], y, alpha=0.4, label='Actual')
-            ax.plot(subset_df["FlightDate"], y_pred, color='red', label=f'Regression (R² = {r2:.2f})')
-            ax.set_title(f"{title} — {airline_code}")
-            ax.set_xlabel("Date")
-            ax.set_ylabel("Arrival Delay (min)")
-            ax.legend()
-            ax.grid(True)
-            fig.autofmt_xdate()
-            FigureCanvasTkAgg(fig, master=win).get_tk_widget().pack(pady=5)
 
-        # Subsets
-        plot_subset("📉 Last 3 Months", df[df["FlightDate"] >= now - pd.DateOffset(months=3)])
-        plot_subset("📉 Last 1 Year", df[df["FlightDate"] >= now - pd.DateOffset(years=1)])
-        plot_subset("📉 Last 5 Years", df[df["FlightDate"] >= now - pd.DateOffset(years=5)])
+def show_regression_for_airline(airline_code, fits=None):
+    charts.reuse("regression", _open_regression_window)(airline_code, fits)
 
-    except Exception as e:
-        print("❌ Error in regression:", e)
-        tk.Label(win, text="Error loading data", bg='white', fg='red').pack()
 
+# Cache lifetimes (seconds): the data only changes when a new load lands
+DIMENSION_LIST_TTL = 3600
+COMPARISON_TTL = 600
 
 def query_avg_arrival_delay_by_date():
     try:
-        conn = pyodbc.connect(
-            "DRIVER={ODBC Driver 18 for SQL Server};"
-            "SERVER=127.0.0.1,1433;"
-            "DATABASE=Airline_Reporting_Carrier;"
-            "UID=sa;"
-            "PWD=Hunter3322!;"
-            "Encrypt=no;"
-            "TrustServerCertificate=yes;"
-        )
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT FlightDate, AVG(ArrDelayMinutes) AS AvgArrivalDelay
-            FROM ops.Flights
-            GROUP BY FlightDate
-            ORDER BY FlightDate;
-        """)
-        rows = cursor.fetchall()
-        conn.close()
-        return [row.FlightDate for row in rows], [row.AvgArrivalDelay for row in rows]
+        metrics = daily_metrics.query_daily_metrics()
+        return metrics.dates, metrics["AvgArrivalDelay"]
     except Exception as e:
         print("❌ Error querying avg arrival delay:", e)
         return [], []
 
 def query_total_flights_by_date():
     try:
-        conn = pyodbc.connect(
-            "DRIVER={ODBC Driver 18 for SQL Server};"
-            "SERVER=127.0.0.1,1433;"
-            "DATABASE=Airline_Reporting_Carrier;"
-            "UID=sa;"
-            "PWD=Hunter3322!;"
-            "Encrypt=no;"
-            "TrustServerCertificate=yes;"
-        )
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT FlightDate, COUNT(*) AS TotalFlights
-            FROM ops.Flights
-            GROUP BY FlightDate
-            ORDER BY FlightDate;
-        """)
-        rows = cursor.fetchall()
-        conn.close()
-        return [row.FlightDate for row in rows], [row.TotalFlights for row in rows]
+        metrics = daily_metrics.query_daily_metrics()
+        return metrics.dates, metrics["TotalFlights"]
     except Exception as e:
         print("❌ Error querying total flights:", e)
         return [], []
 
-def show_plots_in_compare_window(parent_window):
+def _open_daily_plots_window(parent_window):
     plot_win = Toplevel(parent_window)
     plot_win.title("Flight Delay Visualizations")
     plot_win.geometry("1000x800")
     plot_win.configure(bg='white')
 
-    dates1, avg_delays = query_avg_arrival_delay_by_date()
-    dates2, total_flights = query_total_flights_by_date()
-
-    fig1, ax1 = plt.subplots(figsize=(8, 4))
-    ax1.plot(dates1, avg_delays, color="blue")
-    ax1.set_title("Average Arrival Delay Over Time")
-    ax1.set_xlabel("Date")
-    ax1.set_ylabel("Avg Delay (minutes)")
-    ax1.grid(True)
-    fig1.autofmt_xdate()
-    FigureCanvasTkAgg(fig1, master=plot_win).get_tk_widget().pack(pady=20)
-
-    fig2, ax2 = plt.subplots(figsize=(8, 4))
-    ax2.plot(dates2, total_flights, color="green")
-    ax2.set_title("Total Number of Flights Per Day")
-    ax2.set_xlabel("Date")
-    ax2.set_ylabel("Total Flights")
-    ax2.grid(True)
-    fig2.autofmt_xdate()
-    FigureCanvasTkAgg(fig2, master=plot_win).get_tk_widget().pack(pady=20)
+    loading = LoadingIndicator(plot_win, text="Loading daily series…", bg='white').pack(pady=5)
+    chart = charts.Chart(plot_win, nrows=2, figsize=(8, 8), fill='both', expand=True, pady=10)
+    ax1, ax2 = chart.axes
+
+    def draw(metrics):
+        from decimate import DecimatedLine
+        if chart.released:
+            return
+        # Both charts come from the same single-scan daily metrics
+        series = ((ax1, "AvgArrivalDelay", "blue"), (ax2, "TotalFlights", "green"))
+        if chart.artists:
+            for ax, column, _ in series:
+                chart.artists[ax].set_data(metrics.dates, metrics[column])
+        else:
+            for ax, column, color in series:
+                chart.artists[ax] = DecimatedLine(ax, metrics.dates, metrics[column], color=color)
+                ax.grid(True)
+                ax.tick_params(axis='x', labelrotation=30)
+            ax1.set_title("Average Arrival Delay Over Time")
+            ax1.set_xlabel("Date")
+            ax1.set_ylabel("Avg Delay (minutes)")
+            ax2.set_title("Total Number of Flights Per Day")
+            ax2.set_xlabel("Date")
+            ax2.set_ylabel("Total Flights")
+        for ax, _, _ in series:
+            chart.fit(ax, chart.artists[ax].x, chart.artists[ax].y)
+        chart.refresh()
+
+    def on_error(e):
+        print("❌ Error querying daily metrics:", e)
+        tk.Label(plot_win, text="Error loading data", bg='white', fg='red').pack()
+
+    def show():
+        background.submit(daily_metrics.query_daily_metrics, key=("daily_series", str(plot_win)),
+                          owner=plot_win, busy=loading, on_success=draw, on_error=on_error,
+                          timeout=SERIES_TIMEOUT)
+
+    return plot_win, chart, show
+
+
+def show_plots_in_compare_window(parent_window):
+    # The series are the same for every comparison: one window, refreshed when reopened
+    charts.reuse("daily_series", lambda: _open_daily_plots_window(parent_window))()
 
 #Queries to find distnict airlines
-def get_distinct_airlines():
-    try:
-        conn = pyodbc.connect(
-            "DRIVER={ODBC Driver 18 for SQL Server};"
-            "SERVER=127.0.0.1,1433;"
-            "DATABASE=Airline_Reporting_Carrier;"
-            "UID=sa;"
-            "PWD=Hunter3322!;"
-            "Encrypt=no;"
-            "TrustServerCertificate=yes;"
-        )
+@cache.cached(ttl=DIMENSION_LIST_TTL)
+def _fetch_distinct_airlines():
+    with db.connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT ReportingAirline FROM meta.ReportingAirline")
-        result = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return result
+        return [row[0] for row in cursor.fetchall()]
+
+def get_distinct_airlines():
+    try:
+        return _fetch_distinct_airlines()
     except Exception as e:
         print("❌ Error fetching airlines:", e)
         return []
 
 #Queries to find distnict city
+@cache.cached(ttl=DIMENSION_LIST_TTL)
+def _fetch_distinct_cities():
+    # Full-history lists come from the on-disk cache until the data changes
+    columns = disk_cache.fetch_columns("SELECT DISTINCT OriginCityName FROM ops.Origin")
+    return columns["OriginCityName"].tolist()
+
 def get_distinct_cities():
     try:
-        conn = pyodbc.connect( 
-            "DRIVER={ODBC Driver 18 for SQL Server};"
-            "SERVER=127.0.0.1,1433;"
-            "DATABASE=Airline_Reporting_Carrier;"
-            "UID=sa;"
-            "PWD=Hunter3322!;"
-            "Encrypt=no;"
-            "TrustServerCertificate=yes;" )  # same as above
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT OriginCityName FROM ops.Origin")
-        result = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return result
+        return _fetch_distinct_cities()
     except Exception as e:
         print("❌ Error fetching cities:", e)
         return []
 
 #Queries to find distnict date
+@cache.cached(ttl=DIMENSION_LIST_TTL)
+def _fetch_distinct_dates():
+    columns = disk_cache.fetch_columns("SELECT DISTINCT FlightDate FROM ops.Flights ORDER BY FlightDate DESC",
+                                       dtypes={"FlightDate": "datetime64[D]"})
+    return columns["FlightDate"].tolist()   # datetime.date values
+
 def get_distinct_dates():
     try:
-        conn = pyodbc.connect( 
-            "DRIVER={ODBC Driver 18 for SQL Server};"
-            "SERVER=127.0.0.1,1433;"
-            "DATABASE=Airline_Reporting_Carrier;"
-            "UID=sa;"
-            "PWD=Hunter3322!;"
-            "Encrypt=no;"
-            "TrustServerCertificate=yes;" )  # same as above
-        cursor = conn.cursor()
-        query = """
-        SELECT DISTINCT FlightDate 
-        FROM ops.Flights 
-        ORDER BY FlightDate DESC"""
-        cursor.execute("SELECT DISTINCT FlightDate FROM ops.Flights ORDER BY FlightDate DESC")
-        result = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return result
+        return _fetch_distinct_dates()
     except Exception as e:
         print("❌ Error fetching dates:", e)
         return []
 
+# Type-ahead sources: the index loads the whole list once; until it is ready
+# each keystroke is answered by a prefix query that can seek on an index
+FLIGHT_NUMBER_DIGITS = 4
+
+def _fetch_cities_with_prefix(prefix, limit, context=None):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT DISTINCT OriginCityName FROM ops.Origin
+            WHERE {db.get_backend().prefix_match("OriginCityName")}
+            ORDER BY OriginCityName
+        """, (typeahead.like_prefix(prefix),))
+        return [row[0] for row in cursor.fetchmany(limit)]
+
+def _fetch_dates_with_prefix(prefix, limit, context=None):
+    bounds = typeahead.date_prefix_range(prefix)
+    if bounds is None:
+        return []
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        # The range seeks on FlightDate; the exact prefix (e.g. "2019-03-1") is matched on the ISO text
+        cursor.execute("""
+            SELECT DISTINCT FlightDate FROM ops.Flights
+            WHERE FlightDate BETWEEN ? AND ? AND CAST(FlightDate AS VARCHAR(10)) LIKE ?
+            ORDER BY FlightDate DESC
+        """, (*bounds, typeahead.like_prefix(prefix)))
+        return [str(row[0]) for row in cursor.fetchmany(limit)]
+
+def _fetch_flight_numbers(airline):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT DISTINCT f.FlightNumberReportingAirline
+            FROM ops.Flights f
+            JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID
+            WHERE ra.ReportingAirline = ?
+        """, (airline,))
+        return [row[0] for row in cursor.fetchall()]
+
+def _fetch_flight_numbers_with_prefix(prefix, limit, airline):
+    ranges = typeahead.int_prefix_ranges(prefix, FLIGHT_NUMBER_DIGITS)
+    if not ranges:
+        return []
+    between = " OR ".join("f.FlightNumberReportingAirline BETWEEN ? AND ?" for _ in ranges)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT DISTINCT f.FlightNumberReportingAirline
+            FROM ops.Flights f
+            JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID
+            WHERE ra.ReportingAirline = ? AND ({between})
+            ORDER BY f.FlightNumberReportingAirline
+        """, (airline, *[bound for r in ranges for bound in r]))
+        return [row[0] for row in cursor.fetchmany(limit)]
+
+city_source = typeahead.Source(lambda context: _fetch_distinct_cities(), _fetch_cities_with_prefix)
+date_source = typeahead.Source(lambda context: [str(d) for d in _fetch_distinct_dates()],
+                               _fetch_dates_with_prefix, descending=True)
+flight_number_source = typeahead.Source(_fetch_flight_numbers, _fetch_flight_numbers_with_prefix)
+
 #calculating avg delay
-def calculate_avg_delay(airline=None, city=None, date=None):
-    try:
-        conn = pyodbc.connect(
-            "DRIVER={ODBC Driver 18 for SQL Server};"
-            "SERVER=127.0.0.1,1433;"
-            "DATABASE=Airline_Reporting_Carrier;"
-            "UID=sa;"
-            "PWD=Hunter3322!;"
-            "Encrypt=no;"
-            "TrustServerCertificate=yes;"
-        )
+@cache.cached(ttl=COMPARISON_TTL)
+def _fetch_avg_delay(airline, city, date):
+    with db.connection() as conn:
         cursor = conn.cursor()
 
-        query = """
-        SELECT 
-            AVG(f.DepDelayMinutes) AS AvgDelay,
-            COUNT(*) AS TotalFlights,
-            COUNT(DISTINCT f.OriginAirportSeqID) AS AirportTraffic
-        FROM ops.Flights f
-        LEFT JOIN ops.Origin o ON f.OriginAirportSeqID = o.OriginAirportSeqID
-        LEFT JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID
+        # Shared with compare_batch.py so batch results match this call exactly
+        query = f"""
+        SELECT {compare_batch.COMPARISON_AGGREGATES}
+        {compare_batch.COMPARISON_FROM}
         WHERE 1=1
         """
         params = []
@@ -257,21 +394,44 @@ def calculate_avg_delay(airline=None, city=None, date=None):
             query += " AND o.OriginCityName = ?"
             params.append(city)
         if date:
-            query += " AND f.FlightDate = ?"
-            params.append(date)
+            date_sql, date_params = db.get_backend().flight_date_filter("f", date)
+            query += f" AND {date_sql}"
+            params.extend(date_params)
 
         cursor.execute(query, tuple(params))
         row = cursor.fetchone()
-        conn.close()
-
-        if row:
-            return {
-                "AvgDelay": row.AvgDelay,
-                "TotalFlights": row.TotalFlights,
-                "AirportTraffic": row.AirportTraffic
-            }
-        else:
-            return None
+
+    if row:
+        return {
+            "AvgDelay": row.AvgDelay,
+            "TotalFlights": row.TotalFlights,
+            "AirportTraffic": row.AirportTraffic
+        }
+    else:
+        return None
+
+# After new flights land, drop only the cached results they can change
+@incremental.on_refresh
+def _invalidate_after_load(change):
+    _fetch_distinct_dates.invalidate()
+    date_source.clear()
+    flight_number_source.clear()
+    if change.reloaded:
+        # ingest.py may also have added airlines and airports
+        _fetch_distinct_airlines.invalidate()
+        _fetch_distinct_cities.invalidate()
+        city_source.clear()
+    since = str(change.start)
+    # key = (name, (airline, city, date), kwargs); date is None for "all dates"
+    cache.default_cache.invalidate(
+        lambda key: key[0] == _fetch_avg_delay.cache_name and (key[1][2] is None or key[1][2] >= since))
+    schedule.default_index.clear()
+    cube.default_cube.clear()
+
+def calculate_avg_delay(airline=None, city=None, date=None):
+    try:
+        # "" from an untouched combobox means the same as no filter
+        return _fetch_avg_delay(airline or None, city or None, str(date) if date else None)
     except Exception as e:
         print("❌ Error calculating avg delay:", e)
         return None
@@ -279,33 +439,10 @@ def calculate_avg_delay(airline=None, city=None, date=None):
 
 #Matching the departure time with the flight number
 def get_matching_departure_times(full_flight_number):
+    """Scheduled departure times of a flight such as 'DL 1191' (loads it into the schedule index)."""
     try:
-        conn = pyodbc.connect(
-            "DRIVER={ODBC Driver 18 for SQL Server};"
-            "SERVER=127.0.0.1,1433;"
-            "DATABASE=Airline_Reporting_Carrier;"
-            "UID=sa;"
-            "PWD=Hunter3322!;"
-            "Encrypt=no;"
-            "TrustServerCertificate=yes;"
-        )
-        cursor = conn.cursor()
-
-        # Split airline code and flight number
         code, number = full_flight_number.split()
-
-        query = """
-        SELECT DISTINCT f.CRSDepTime
-        FROM ops.Flights f
-        LEFT JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID
-        WHERE f.FlightNumberReportingAirline = ?
-          AND ra.ReportingAirline = ?
-        ORDER BY f.CRSDepTime;
-        """
-        cursor.execute(query, (number, code))
-        times = [str(row.CRSDepTime) for row in cursor.fetchall()]  # Ensure string format
-        conn.close()
-        return times
+        return [str(t) for t in schedule.default_index.load(code, number)]
     except Exception as e:
         print("❌ Error fetching CRSDepTimes:", e)
         return []
@@ -313,80 +450,22 @@ def get_matching_departure_times(full_flight_number):
 # Searching Flight Info
 def search_flight_info(full_flight_number, crs_time_str):
     """
-    Queries SQL Server for a flight using the format 'DL 1191' and CRSDepTime = 'HH:MM:SS'
-    Returns flight details (origin, destination, arrival, status) as a dictionary
+    The most recent leg of a flight such as 'DL 1191' at CRSDepTime 'HH:MM:SS'
+    (origin, destination, arrival, status) as a dictionary, from the schedule index
     """
-    print(f"🔍 Searching for {full_flight_number} @ {crs_time_str}")
     try:
-        conn = pyodbc.connect(
-            "DRIVER={ODBC Driver 18 for SQL Server};"
-            "SERVER=127.0.0.1,1433;"
-            "DATABASE=Airline_Reporting_Carrier;"
-            "UID=sa;"
-            "PWD=Hunter3322!;"
-            "Encrypt=no;"
-            "TrustServerCertificate=yes;"
-        )
-
-        cursor = conn.cursor()
-
-        # Split the airline and number
         code, number = full_flight_number.split()
-
-        query = """
-        SELECT 
-            ra.ReportingAirline + ' ' + CAST(f.FlightNumberReportingAirline AS VARCHAR) AS FullFlightNumber,
-            f.FlightDate,
-            o.OriginStateName AS Origin,
-            d.DestStateName AS Destination,
-            f.ArrTime AS ScheduledArrival,
-            CASE 
-                WHEN f.DepDelayMinutes IS NULL OR f.DepDelayMinutes <= 15 THEN 'On-time'
-                ELSE 'Delayed'
-            END AS Status
-        FROM ops.Flights f
-        LEFT JOIN ops.Origin o ON f.OriginAirportSeqID = o.OriginAirportSeqID
-        LEFT JOIN ops.Destination d ON f.DestAirportSeqID = d.DestAirportSeqID
-        LEFT JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID
-        WHERE 
-            ra.ReportingAirline = ?
-            AND f.FlightNumberReportingAirline = ?
-            AND CONVERT(VARCHAR(8), f.CRSDepTime, 108) = ?
-        """
-
-        cursor.execute(query, (code, number, crs_time_str))
-        result = cursor.fetchone()
-        conn.close()
-
-        if result:
-            print("✅ Query succeeded. Data:", result)
-            return {
-                "FlightNumber": result.FullFlightNumber,
-                "FlightDate": result.FlightDate,
-                "Origin": result.Origin,
-                "Destination": result.Destination,
-                "ScheduledArrival": result.ScheduledArrival,
-                "Status": result.Status
-            }
-        else:
-            print("Query executed, but no matching row found.")
-            return None
-
+        if not schedule.default_index.is_loaded(code, number):
+            schedule.default_index.load(code, number)
+        legs = schedule.default_index.lookup(code, number, crs_time_str)
+        return legs[0] if legs else None
     except Exception as e:
-        print("❌ SQL query failed:", e)
+        print("❌ Error searching flight:", e)
         return None
 
 # 1) Main Search Window
-def main():
-    search_win = tk.Tk()
-    search_win.title("Flight Lookup")
-    search_win.geometry("750x500")
-    search_win.configure(bg='#ffcccc')
-
-    tk.Label(search_win, text="Select Airline:",fg = 'black', bg='#ffcccc').pack(pady=5)
-
-    #NEW: Define airline code → full name dictionary
-    airlines = {
+# Airline code → full name
+AIRLINE_NAMES = {
     "9E": "Endeavor Air",
     "AA": "American Airlines",
     "AQ": "Aloha Airlines",
@@ -416,7 +495,49 @@ def main():
     "XE": "ExpressJet Airlines",
     "YV": "Mesa Airlines",
     "YX": "Midwest Airlines"
-    }
+}
+
+def main():
+    imports_done = time.time()
+    search_win = tk.Tk()
+    search_win.title("Flight Lookup")
+    search_win.geometry("750x500")
+    search_win.configure(bg='#ffcccc')
+    background.init(search_win)
+
+    # Poll for new loads; aggregates and caches are updated incrementally
+    refresh_task = None
+
+    def check_for_new_data():
+        nonlocal refresh_task
+        # A check still running (slow load, busy server) is left alone rather than superseded
+        if refresh_task is None or refresh_task.finished:
+            refresh_task = background.submit(incremental.refresh, key="incremental_refresh", owner=search_win,
+                                             on_error=lambda e: print("❌ Error checking for new data:", e),
+                                             timeout=REGRESSION_TIMEOUT)
+        search_win.after(REFRESH_CHECK_MS, check_for_new_data)
+
+    # Once the window is on screen: pre-load plotting modules, start polling
+    def after_first_paint():
+        if os.environ.get(STARTUP_PROFILE_ENV):
+            print(STARTUP_MARKER + json.dumps({"process_start": _PROCESS_START, "imports_done": imports_done,
+                                               "first_window": time.time()}), flush=True)
+            search_win.destroy()
+            return
+        background.submit(prewarm, key="prewarm", owner=search_win,
+                          on_error=lambda e: print("❌ Error pre-loading modules:", e))
+        check_for_new_data()
+
+    def on_map(event):
+        if event.widget is search_win:
+            search_win.unbind("<Map>")
+            search_win.after_idle(after_first_paint)   # runs after the first redraw
+
+    search_win.bind("<Map>", on_map)
+
+    tk.Label(search_win, text="Select Airline:",fg = 'black', bg='#ffcccc').pack(pady=5)
+
+    airlines = AIRLINE_NAMES
 
     #NEW: Create dropdown list with "DL (Delta Air Lines)" format
     dropdown_display = [f"{code} ({name})" for code, name in airlines.items()]
@@ -428,7 +549,11 @@ def main():
     airline_dropdown.pack(pady=5)
 
     tk.Label(search_win, text="Enter Flight Number:",fg = 'black', bg='#ffcccc').pack(pady=5)
-    flight_entry = tk.Entry(search_win, font=("Helvetica", 14))
+    # Suggests the selected airline's flight numbers; picking one loads its times
+    flight_entry = typeahead.TypeAheadEntry(search_win, flight_number_source,
+                                            on_select=lambda number: number and load_times(),
+                                            context=lambda: airline_display_var.get().split()[0],
+                                            font=("Helvetica", 14))
     flight_entry.pack(pady=5)
 
     # Time selection dropdown and search button (initially hidden)
@@ -451,26 +576,40 @@ def main():
 
         print(f"Loading time for: {full_flight_number}")
 
-        times = get_matching_departure_times(full_flight_number)
-        print(f"Found times for {full_flight_number}:", times)
-
-        if times:
-            time_combo['values'] = times
-            time_combo.current(0)
-            time_combo.pack(pady=5)
-
-            # Show Search button once time is selected
-            def on_time_selected(event=None):
-                if time_var.get() and "No matches" not in time_var.get():
-                    search_button.config(state='normal')
-                    search_button.pack(pady=5)
+        def show_times(times):
+            print(f"Found times for {full_flight_number}:", times)
+
+            if times:
+                time_combo['values'] = times
+                time_combo.current(0)
+                time_combo.pack(pady=5)
+
+                # Show Search button once time is selected
+                def on_time_selected(event=None):
+                    if time_var.get() and "No matches" not in time_var.get():
+                        search_button.config(state='normal')
+                        search_button.pack(pady=5)
+
+                time_combo.bind("<<ComboboxSelected>>", on_time_selected)
+            else:
+                time_combo['values'] = ["No matches"]
+                time_combo.current(0)
+                time_combo.pack(pady=5)
+                search_button.pack_forget()
+
+        def load_schedule():
+            # One round trip: every leg of the flight goes into the schedule index
+            return [str(t) for t in schedule.default_index.load(code, number)]
+
+        if not number.isdigit():
+            messagebox.showerror("Input Error", "Please enter a numeric flight number.")
+            return
 
-            time_combo.bind("<<ComboboxSelected>>", on_time_selected)
-        else:
-            time_combo['values'] = ["No matches"]
-            time_combo.current(0)
-            time_combo.pack(pady=5)
-            search_button.pack_forget()
+        # A newer "Load Times" click supersedes one still running
+        background.submit(load_schedule, key="load_times",
+                          owner=search_win, busy=loading, on_success=show_times,
+                          on_error=lambda e: messagebox.showerror("Query Error", str(e)),
+                          timeout=LOOKUP_TIMEOUT)
     
     tk.Button(search_win, text="Load Times", command=load_times).pack(pady=5)
 
@@ -479,17 +618,32 @@ def main():
         number = flight_entry.get().strip()
         crs_time = time_var.get()
 
-        if not number or not crs_time or "No matches" in crs_time:
+        if not number.isdigit() or not crs_time or "No matches" in crs_time:
             messagebox.showerror("Input Error", "Please enter valid flight details and select a time.")
             return
 
         full_flight_number = f"{code} {number}"
-        data = search_flight_info(full_flight_number, crs_time)
 
-        if data:
-            open_info_window(data)  # ✅ This function opens the info window using result
-        else:
-            messagebox.showerror("Not Found", f"No flight found for {full_flight_number} at {crs_time}.")
+        def show_legs(legs):
+            if legs:
+                open_info_window(legs[0], legs)  # ✅ This function opens the info window using result
+            else:
+                messagebox.showerror("Not Found", f"No flight found for {full_flight_number} at {crs_time}.")
+
+        if schedule.default_index.is_loaded(code, number):
+            # Served from the schedule index built by Load Times — no database round trip
+            show_legs(schedule.default_index.lookup(code, number, crs_time))
+            return
+
+        # New data cleared the index since Load Times: reload this flight on a worker
+        def reload_and_lookup():
+            schedule.default_index.load(code, number)
+            return schedule.default_index.lookup(code, number, crs_time)
+
+        background.submit(reload_and_lookup, key="flight_search", owner=search_win, busy=loading,
+                          on_success=show_legs,
+                          on_error=lambda e: messagebox.showerror("Query Error", str(e)),
+                          timeout=LOOKUP_TIMEOUT)
     
 
     #UPDATED: Pass extracted airline code + flight number to open_info_window
@@ -507,10 +661,25 @@ def main():
               command=open_forecast_window
              ).pack(pady=5)
 
+    tk.Button(search_win, text="Delay Propagation",
+              command=open_propagation_window
+             ).pack(pady=5)
+
+    tk.Button(search_win, text="Delay Trend Leaderboard",
+              command=open_leaderboard_window
+             ).pack(pady=5)
+
+    tk.Button(search_win, text="Diagnostics",
+              command=open_diagnostics_window
+             ).pack(pady=5)
+
+    loading = LoadingIndicator(search_win, bg='#ffcccc').pack(pady=5)
+
     search_win.mainloop()
 
 # 2) Flight Info Window
-def open_info_window(data):
+def open_info_window(data, legs=None):
+    """Show one flight. `legs` (all dates the flight ran at this time) adds a date picker."""
     if not data:
         messagebox.showerror("Error", "No flight data to show.")
         return
@@ -523,17 +692,19 @@ def open_info_window(data):
     content = tk.Frame(info_win, bg='#ffcccc')
     content.pack(padx=20, pady=20)
 
-    labels = [
-        ("Flight Number", "✈️", data['FlightNumber']),
-        ("Date of Takeoff", "📅", data['FlightDate'].strftime('%Y-%m-%d')),
-        ("Origin", "📍", data['Origin']),
-        ("Destination", "📍", data['Destination']),
-        ("Scheduled Arrival", "⏰", data['ScheduledArrival'].strftime('%H:%M')),
-        ("Status", "⚠️", data['Status'])
-    ]
-   
-
-    for i, (field, emoji, value) in enumerate(labels):
+    def field_values(leg):
+        arrival = leg['ScheduledArrival']
+        return [
+            ("Flight Number", "✈️", leg['FlightNumber']),
+            ("Date of Takeoff", "📅", leg['FlightDate'].strftime('%Y-%m-%d')),
+            ("Origin", "📍", leg['Origin']),
+            ("Destination", "📍", leg['Destination']),
+            ("Scheduled Arrival", "⏰", arrival.strftime('%H:%M') if arrival else "N/A"),
+            ("Status", "⚠️", leg['Status'])
+        ]
+
+    value_labels = {}
+    for i, (field, emoji, value) in enumerate(field_values(data)):
         print("Rendering:", field, value)
         # Emoji (col 0)
         tk.Label(content, text=emoji, bg='#ffcccc', font=("Courier", 14)).grid(
@@ -544,19 +715,35 @@ def open_info_window(data):
             row=i, column=1, sticky='w', padx=5)
 
         # Value (col 2)
-        fg_color = (
-            "green" if field == "Status" and value == "On-time"
-            else "red" if field == "Status"
-            else "black")
-
-        tk.Label(content, text=value, bg='#ffcccc', font=("Courier", 12), fg=fg_color).grid(
-            row=i, column=2, sticky='w', padx=5)
+        value_labels[field] = tk.Label(content, text=value, bg='#ffcccc', font=("Courier", 12))
+        value_labels[field].grid(row=i, column=2, sticky='w', padx=5)
+
+    def show_leg(leg):
+        for field, _, value in field_values(leg):
+            fg_color = (
+                "green" if field == "Status" and value == "On-time"
+                else "red" if field == "Status"
+                else "black")
+            value_labels[field].config(text=value, fg=fg_color)
+
+    show_leg(data)
+
+    if legs and len(legs) > 1:
+        # Every date this flight ran at the selected time
+        info_win.geometry("500x360")
+        tk.Label(info_win, text=f"Operated on {len(legs)} dates:", fg='black', bg='#ffcccc').pack()
+        date_var = tk.StringVar()
+        date_picker = ttk.Combobox(info_win, textvariable=date_var, state="readonly",
+                                   values=[leg['FlightDate'].strftime('%Y-%m-%d') for leg in legs])
+        date_picker.current(legs.index(data))
+        date_picker.pack(pady=5)
+        date_picker.bind("<<ComboboxSelected>>", lambda event: show_leg(legs[date_picker.current()]))
 
 # 3) Comparison Window
 def open_compare_window():
     cmp_win = Toplevel()
     cmp_win.title("Compare with Other Flights")
-    cmp_win.geometry("600x400")
+    cmp_win.geometry("700x600")
     cmp_win.configure(bg='#ffcccc')
 
     # --- Dropdowns ---
@@ -565,24 +752,57 @@ def open_compare_window():
     airline_combo = ttk.Combobox(cmp_win, textvariable=airline_var, state="readonly")
     airline_combo.pack(pady=5)
 
+    # Cities and dates are too many for a dropdown: type to search, pick to compare
     tk.Label(cmp_win, text="Select City:",fg = 'black', bg='#ffcccc').pack()
-    city_var = tk.StringVar()
-    city_combo = ttk.Combobox(cmp_win, textvariable=city_var, state="readonly")
-    city_combo.pack(pady=5)
-
-    tk.Label(cmp_win, text="Select Date:",fg = 'black', bg='#ffcccc').pack()
-    date_var = tk.StringVar()
-    date_combo = ttk.Combobox(cmp_win, textvariable=date_var, state="readonly")
-    date_combo.pack(pady=5)
+    city_entry = typeahead.TypeAheadEntry(cmp_win, city_source, on_select=lambda value: run_comparison())
+    city_entry.pack(pady=5)
 
-    # Populate dropdowns
-    airline_combo['values'] = get_distinct_airlines()
-    city_combo['values'] = get_distinct_cities()
-    date_combo['values'] = get_distinct_dates()
+    tk.Label(cmp_win, text="Select Date (YYYY-MM-DD):",fg = 'black', bg='#ffcccc').pack()
+    date_entry = typeahead.TypeAheadEntry(cmp_win, date_source, on_select=lambda value: run_comparison())
+    date_entry.pack(pady=5)
 
     # --- Results display ---
     results_label = tk.Label(cmp_win, text="", fg='black', bg='#ffcccc', font=("Helvetica", 12), justify="left")
     results_label.pack(pady=10)
+    loading = LoadingIndicator(cmp_win, bg='#ffcccc').pack(before=results_label, pady=5)
+
+    # Populate dropdowns in the background so the window opens immediately
+    def populate(combo, fetch):
+        def fill(values):
+            combo['values'] = values
+        background.submit(fetch, owner=cmp_win, busy=loading, on_success=fill, timeout=SERIES_TIMEOUT)
+
+    populate(airline_combo, get_distinct_airlines)
+
+    # Load the cube once; after that every filter is answered from memory
+    cube_label = tk.Label(cmp_win, text="Loading comparison cube…", fg='black', bg='#ffcccc')
+    cube_label.pack(after=results_label)
+
+    def cube_ready(loaded):
+        cube_label.config(text=f"Cube: {loaded.describe()}")
+
+    def cube_failed(e):
+        cube_label.config(text=f"Cube unavailable, querying the database ({e})")
+
+    background.submit(cube.default_cube.get, key="comparison_cube", owner=cmp_win, busy=loading,
+                      on_success=cube_ready, on_error=cube_failed, timeout=CUBE_TIMEOUT)
+
+    # Delay percentiles and histogram for the same filter, from merged sketches
+    dist_label = tk.Label(cmp_win, text="", fg='black', bg='#ffcccc', font=("Courier", 10), justify="left")
+    dist_label.pack(after=results_label)
+    background.submit(distribution.default_store.load, key="distribution_load", owner=cmp_win,
+                      on_error=lambda e: print("❌ Error loading delay distributions:", e), timeout=CUBE_TIMEOUT)
+
+    def show_distribution(summary):
+        lines = []
+        for column, title in (("DepDelayMinutes", "Departure"), ("ArrDelayMinutes", "Arrival")):
+            dist = summary[column]
+            if not dist.flights:
+                continue
+            lines.append(f"{title} delay: " + "  ".join(f"p{round(q * 100)} {v:g} min"
+                                                       for q, v in dist.quantiles.items()))
+            lines.append("  " + " | ".join(f"{label}: {share:.0%}" for label, share in dist.histogram))
+        dist_label.config(text="\n".join(lines))
 
     tk.Button(cmp_win, text="Show Visualizations", command=lambda: show_plots_in_compare_window(cmp_win)).pack(pady=10)
 
@@ -592,91 +812,468 @@ def open_compare_window():
     # --- Query button ---
     def run_comparison():
         airline = airline_var.get()
-        city = city_var.get()
-        date = date_var.get()
-
-        result = calculate_avg_delay(airline=airline, city=city, date=date)
-
-        if result:
-            avg_delay = f"{result['AvgDelay']:.2f} mins" if result['AvgDelay'] else "N/A"
-            results = (
-                f"✈️ Average Delay: {avg_delay}\n"
-                f"🛫 Total Flights: {result['TotalFlights']}\n"
-                f"🏙️ Airport Traffic Count: {result['AirportTraffic']}"
-            )
-            results_label.config(text=results)
-        else:
-            results_label.config(text="No matching data found or an error occurred.")
+        city = city_entry.get()
+        date = date_entry.get()
+
+        def show_result(result):
+            if result:
+                avg_delay = f"{result['AvgDelay']:.2f} mins" if result['AvgDelay'] else "N/A"
+                results = (
+                    f"✈️ Average Delay: {avg_delay}\n"
+                    f"🛫 Total Flights: {result['TotalFlights']}\n"
+                    f"🏙️ Airport Traffic Count: {result['AirportTraffic']}"
+                )
+                results_label.config(text=results)
+            else:
+                results_label.config(text="No matching data found or an error occurred.")
+
+        def show_error(e):
+            results_label.config(text=f"Query failed: {e}")
+
+        background.submit(distribution.default_store.summary, airline or None, city or None, date or None,
+                          key=("distribution", str(cmp_win)), owner=cmp_win, on_success=show_distribution,
+                          on_error=lambda e: dist_label.config(text=f"Distribution unavailable: {e}"),
+                          timeout=CUBE_TIMEOUT)
+
+        loaded = cube.default_cube.peek()
+        result = loaded.answer(airline or None, city or None, date or None) if loaded else None
+        if result is not None:
+            show_result(result)
+            return
+
+        # One comparison per window: a newer selection supersedes the running one
+        background.submit(calculate_avg_delay, airline=airline, city=city, date=date,
+                          key=("compare", str(cmp_win)), owner=cmp_win, busy=loading,
+                          on_success=show_result, on_error=show_error, timeout=SERIES_TIMEOUT)
 
     tk.Button(cmp_win, text="Run Comparison", command=run_comparison).pack(pady=10)
 
+    # Re-run as soon as any filter changes
+    airline_combo.bind("<<ComboboxSelected>>", lambda event: run_comparison())
+
+# Delay Propagation Window: late-aircraft vs own-cause delay from tail-number rotations
+PROPAGATION_COLUMNS = (("legs", "Legs", 80), ("linked", "Linked", 60), ("delay", "Delay min", 90),
+                       ("late", "Late AC min", 90), ("share", "Late AC %", 70), ("own", "Own min", 90),
+                       ("propagated", "Hit legs", 70), ("absorbed", "Absorbed %", 80), ("turn", "Avg turn", 70))
+
+
+def open_propagation_window():
+    prop_win = Toplevel()
+    prop_win.title("Delay Propagation by Tail Number")
+    prop_win.geometry("1000x650")
+    prop_win.configure(bg='white')
+
+    controls = tk.Frame(prop_win, bg='white')
+    controls.pack(pady=5)
+    tk.Label(controls, text="From (YYYY-MM-DD):", bg='white', fg='black').pack(side='left')
+    first_var = tk.StringVar()
+    tk.Entry(controls, textvariable=first_var, width=12).pack(side='left', padx=5)
+    tk.Label(controls, text="To:", bg='white', fg='black').pack(side='left')
+    last_var = tk.StringVar()
+    tk.Entry(controls, textvariable=last_var, width=12).pack(side='left', padx=5)
+    tk.Button(controls, text="Analyze", command=lambda: analyze()).pack(side='left', padx=5)
+
+    summary_label = tk.Label(prop_win, text="", bg='white', fg='black', justify='left', anchor='w')
+    summary_label.pack(fill='x', padx=10)
+    loading = LoadingIndicator(prop_win, bg='white').pack(pady=5)
+
+    def make_tree(title):
+        tk.Label(prop_win, text=title, bg='white', fg='black', anchor='w').pack(fill='x', padx=10)
+        tree = ttk.Treeview(prop_win, columns=[c for c, _, _ in PROPAGATION_COLUMNS], height=10)
+        tree.heading("#0", text="Name")
+        tree.column("#0", width=220)
+        for col, heading, width in PROPAGATION_COLUMNS:
+            tree.heading(col, text=heading)
+            tree.column(col, width=width, anchor='e')
+        tree.pack(fill='both', expand=True, padx=10, pady=(0, 5))
+        return tree
+
+    airline_tree = make_tree("Airlines (most late-aircraft minutes first)")
+    airport_tree = make_tree("Departure airports")
+
+    def percent(value):
+        return f"{value:.0%}" if value is not None else "-"
+
+    def fill(tree, rows):
+        tree.delete(*tree.get_children())
+        for m in rows:
+            tree.insert("", "end", text=m.Name, values=(
+                f"{m.Legs:,}", percent(m.Linked / m.Legs if m.Legs else None), f"{m.DelayMinutes:,.0f}",
+                f"{m.LateAircraftMinutes:,.0f}", percent(m.LateAircraftShare), f"{m.OwnMinutes:,.0f}",
+                f"{m.PropagatedLegs:,}", percent(m.AbsorptionRate),
+                f"{m.AvgTurn:.0f} min" if m.AvgTurn is not None else "-"))
+
+    def show(result):
+        total = result.total
+        summary_label.config(text=(
+            f"{total.Legs:,} legs {result.first} to {result.last}: {percent(total.LateAircraftShare)} of departure "
+            f"delay came in with the aircraft, {percent(total.AbsorptionRate)} of inbound delay was absorbed "
+            f"by turn slack ({result.chunks} chunks, {result.seconds:.1f}s)"))
+        fill(airline_tree, result.airlines)
+        fill(airport_tree, result.airports)
+
+    def show_error(e):
+        summary_label.config(text=f"Analysis failed: {e}")
+
+    def analyze():
+        try:
+            first, last = db.to_date(first_var.get()), db.to_date(last_var.get())
+        except ValueError:
+            messagebox.showerror("Invalid Date", "Enter both dates as YYYY-MM-DD.", parent=prop_win)
+            return
+        # A newer range supersedes the running analysis
+        summary_label.config(text=f"Analysing rotations {first} to {last}…")
+        background.submit(rotation.analyze, first, last, key=("propagation", str(prop_win)), owner=prop_win,
+                          busy=loading, on_success=show, on_error=show_error, timeout=ROTATION_TIMEOUT)
+
+    # Default to the latest year of data
+    def fill_dates(watermark):
+        if watermark.last_date is not None and not last_var.get():
+            last_var.set(str(watermark.last_date))
+            first_var.set(str(watermark.last_date - datetime.timedelta(days=364)))
+
+    background.submit(incremental.recent_watermark, owner=prop_win, busy=loading,
+                      on_success=fill_dates, timeout=LOOKUP_TIMEOUT)
+
+# Delay Trend Leaderboard: every airline's regression windows side by side, sortable
+LEADERBOARD_STATS = (("trend", "Trend/yr", 75), ("r2", "R²", 55), ("n", "Flights", 85))
+
+
+def open_leaderboard_window():
+    board_win = Toplevel()
+    board_win.title("Delay Trend Leaderboard")
+    board_win.geometry("1050x600")
+    board_win.configure(bg='white')
+
+    summary_label = tk.Label(board_win, text="Fitting every airline…", bg='white', fg='black', anchor='w')
+    summary_label.pack(fill='x', padx=10, pady=(5, 0))
+    tk.Label(board_win, text="Trend/yr: change in mean arrival delay, minutes per year. "
+                             "Click a heading to sort, double-click an airline for its chart.",
+             bg='white', fg='gray', anchor='w').pack(fill='x', padx=10)
+    loading = LoadingIndicator(board_win, bg='white').pack(pady=5)
+
+    windows = [leaderboard.window_label(title) for title, _ in regression.WINDOWS]
+    columns = [f"{w}:{stat}" for w in range(len(windows)) for stat, _, _ in LEADERBOARD_STATS]
+    tree = ttk.Treeview(board_win, columns=columns, height=20)
+    tree.heading("#0", text="Airline", command=lambda: sort_by("#0"))
+    tree.column("#0", width=230)
+    for w, label in enumerate(windows):
+        for stat, heading, width in LEADERBOARD_STATS:
+            col = f"{w}:{stat}"
+            tree.heading(col, text=f"{label.replace('Last ', '')} {heading}", command=lambda c=col: sort_by(c))
+            tree.column(col, width=width, anchor='e')
+    tree.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+
+    fits_by_airline = {}
+    sort_keys = {}          # item id -> {column: value to sort on}
+    sort_state = {"column": None, "descending": False}
+
+    def sort_by(col):
+        descending = not sort_state["descending"] if sort_state["column"] == col else col != "#0"
+        sort_state.update(column=col, descending=descending)
+        present = [i for i in tree.get_children() if sort_keys[i][col] is not None]
+        missing = [i for i in tree.get_children() if sort_keys[i][col] is None]
+        present.sort(key=lambda i: sort_keys[i][col], reverse=descending)
+        for position, item in enumerate(present + missing):   # airlines without the window stay last
+            tree.move(item, "", position)
+
+    def show(result):
+        fits, entries = result
+        fits_by_airline.update(fits)
+        tree.delete(*tree.get_children())
+        sort_keys.clear()
+        for code in sorted(fits):
+            name = f"{code} ({AIRLINE_NAMES[code]})" if code in AIRLINE_NAMES else code
+            keys, values = {"#0": code}, []
+            for w, fit in enumerate(fits[code]):
+                keys[f"{w}:trend"] = fit.slope * leaderboard.DAYS_PER_YEAR if fit else None
+                keys[f"{w}:r2"] = fit.r2 if fit else None
+                keys[f"{w}:n"] = fit.n if fit else None
+                values += ([f"{keys[f'{w}:trend']:+.2f}", f"{fit.r2:.3f}", f"{fit.n:,}"] if fit
+                           else ["-", "-", "-"])
+            item = tree.insert("", "end", text=name, values=values)
+            sort_keys[item] = keys
+        summary_label.config(text=f"{len(fits)} airlines, {len(entries)} fits to {regression.REGRESSION_END}")
+        sort_by(f"{min(1, len(windows) - 1)}:trend")   # worsening fastest over the year first
+
+    def open_chart(event):
+        item = tree.identify_row(event.y)
+        if item:
+            code = sort_keys[item]["#0"]
+            show_regression_for_airline(code, fits_by_airline[code])
+
+    def show_error(e):
+        print("❌ Error computing the leaderboard:", e)
+        summary_label.config(text=f"Leaderboard failed: {e}")
+
+    tree.bind("<Double-1>", open_chart)
+    background.submit(leaderboard.compute, key="leaderboard", owner=board_win, busy=loading,
+                      on_success=show, on_error=show_error, timeout=LEADERBOARD_TIMEOUT)
+
+# Diagnostics Window: per-query latency, rows and the slow-query log
+DIAGNOSTICS_REFRESH_MS = 2000
+
+def open_diagnostics_window():
+    diag_win = Toplevel()
+    diag_win.title("Query Diagnostics")
+    diag_win.geometry("1100x600")
+    diag_win.configure(bg='white')
+
+    pool_label = tk.Label(diag_win, text="", bg='white', fg='black', anchor='w')
+    pool_label.pack(fill='x', padx=10, pady=5)
+
+    columns = ("calls", "errors", "p50", "p95", "max", "connect", "execute", "fetch", "rows", "bytes", "histogram")
+    tree = ttk.Treeview(diag_win, columns=columns, height=12)
+    tree.heading("#0", text="Query")
+    tree.column("#0", width=300)
+    for col in columns:
+        tree.heading(col, text=col.capitalize())
+        tree.column(col, width=260 if col == "histogram" else 70, anchor='e' if col != "histogram" else 'w')
+    tree.pack(fill='both', expand=True, padx=10)
+
+    tk.Label(diag_win, text=f"Slow queries (≥ {telemetry.recorder.slow_query_ms:g} ms):",
+             bg='white', fg='black', anchor='w').pack(fill='x', padx=10, pady=(10, 0))
+    slow_text = tk.Text(diag_win, height=8, wrap='none')
+    slow_text.pack(fill='both', padx=10, pady=5)
+
+    def refresh():
+        if not diag_win.winfo_exists():
+            return
+        pool = db.pool_metrics()
+        disk = disk_cache.stats()
+        plots = charts.stats()
+        pool_label.config(text=f"Pool: {pool['active']} active / {pool['idle']} idle (max {pool['max_size']}), "
+                               f"avg wait {pool['wait_time_avg'] * 1000:.1f} ms, {pool['timeouts']} timeouts   "
+                               f"Disk cache: {disk['hits']} hits / {disk['misses']} misses, "
+                               f"{disk['bytes'] / 2**20:.1f} of {disk['max_bytes'] / 2**20:.0f} MB   "
+                               f"Charts: {plots['live']} of {plots['max_live']} live, "
+                               f"{plots['blits']} blits / {plots['full_draws']} full draws")
+        tree.delete(*tree.get_children())
+        for label, s in sorted(telemetry.recorder.snapshot().items(), key=lambda item: -item[1]["p50_ms"]):
+            histogram = " ".join(f"≤{bound:g}:{count}" for bound, count in s["histogram"] if count)
+            tree.insert("", "end", text=label, values=(
+                s["calls"], s["errors"], f"{s['p50_ms']:.1f}", f"{s['p95_ms']:.1f}", f"{s['max_ms']:.1f}",
+                f"{s['avg_connect_ms']:.1f}", f"{s['avg_execute_ms']:.1f}", f"{s['avg_fetch_ms']:.1f}",
+                s["rows"], s["bytes"], histogram))
+        slow_text.delete("1.0", "end")
+        for entry in reversed(telemetry.recorder.slow_queries()):
+            slow_text.insert("end", f"{entry['at']}  {entry['total_ms']:8.1f} ms  {entry['label']}  "
+                                    f"{entry['params']}  {entry['sql']}\n")
+        diag_win.after(DIAGNOSTICS_REFRESH_MS, refresh)
+
+    def save_report():
+        path = filedialog.asksaveasfilename(parent=diag_win, defaultextension=".txt",
+                                            initialfile="query_report.txt")
+        if path:
+            telemetry.dump_report(path)
+
+    buttons = tk.Frame(diag_win, bg='white')
+    buttons.pack(pady=5)
+    tk.Button(buttons, text="Save Report", command=save_report).pack(side='left', padx=5)
+    tk.Button(buttons, text="Reset", command=telemetry.recorder.reset).pack(side='left', padx=5)
+
+    refresh()
+
 # 4) Forecast Window with dynamic month list
-API_BASE = "http://localhost:5000/api"   # adjust as needed
+API_BASE = os.environ.get("AIRLINE_FORECAST_API", "http://localhost:5000/api")
+FORECAST_TIMEOUT = 10
+
+# One keep-alive session for every forecast call, plus the last response per
+# URL so fresh answers (Cache-Control) skip the network and stale ones are
+# revalidated with If-None-Match
+_http_session = None
+_http_lock = threading.Lock()
+_http_cache = {}   # (path, params) -> (etag, fresh_until, data)
+
+def http_session():
+    import requests
+    global _http_session
+    with _http_lock:
+        if _http_session is None:
+            _http_session = requests.Session()
+            _http_session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        return _http_session
+
+_local_service = None
+_local_service_lock = threading.Lock()
+
+def _start_local_forecast_service():
+    """Start the forecast service in-process if API_BASE points at this machine and nothing answers."""
+    global _local_service
+    import forecast_service
+    url = urlsplit(API_BASE)
+    if url.hostname not in ("localhost", "127.0.0.1"):
+        return False
+    # Several windows may find the service missing at once; only the first starts it
+    with _local_service_lock:
+        if _local_service is None:
+            print("Forecast service not running; starting it locally")
+            _local_service = forecast_service.start_in_thread("127.0.0.1", url.port or 80)
+    return True
+
+def _get_json(path, params=None):
+    import requests
+    key = (path, tuple(sorted((params or {}).items())))
+    cached = _http_cache.get(key)
+    if cached and cached[1] > time.monotonic():
+        return cached[2]
+
+    headers = {"If-None-Match": cached[0]} if cached and cached[0] else {}
+    url = f"{API_BASE}{path}"
+    try:
+        resp = http_session().get(url, params=params, headers=headers, timeout=FORECAST_TIMEOUT)
+    except requests.ConnectionError:
+        if not _start_local_forecast_service():
+            raise
+        resp = http_session().get(url, params=params, headers=headers, timeout=FORECAST_TIMEOUT)
+
+    if resp.status_code == 304 and cached:
+        data = cached[2]
+    else:
+        resp.raise_for_status()
+        data = resp.json()
+    max_age = re.search(r"max-age=(\d+)", resp.headers.get("Cache-Control", ""))
+    _http_cache[key] = (resp.headers.get("ETag"),
+                        time.monotonic() + (int(max_age.group(1)) if max_age else 0), data)
+    return data
 
 def fetch_available_months():
     """
-    Stub: GET /api/months
+    GET /api/months
     Returns JSON array of strings, e.g. ["Jan 2025","Feb 2025",...]
     """
-    resp = requests.get(f"{API_BASE}/months")
-    resp.raise_for_status()
-    return resp.json()
+    return _get_json("/months")
 
 def fetch_delay_data(year_month_str):
     """
-    Stub: GET /api/delays?month=Jan%202025
+    GET /api/delays?month=Jan%202025
     Returns JSON of { days: [...], delays: [...] }
     """
-    resp = requests.get(f"{API_BASE}/delays", params={"month": year_month_str})
-    resp.raise_for_status()
-    return resp.json()
+    return _get_json("/delays", {"month": year_month_str})
+
+def fetch_forecast_series():
+    """
+    GET /api/forecast/series
+    Returns JSON array of series names, e.g. ["All flights","Airline: DL","City: Atlanta",...]
+    """
+    return _get_json("/forecast/series")
+
+def fetch_forecast(series):
+    """
+    GET /api/forecast?series=Airline%3A%20DL
+    Returns JSON of { dates: [...], delays: [...], rmse: ..., through: "YYYY-MM-DD" }
+    """
+    return _get_json("/forecast", {"series": series})
 
 def open_forecast_window():
     fc_win = Toplevel()
     fc_win.title("Arrival-Delay Forecast")
-    fc_win.geometry("700x500")
+    fc_win.geometry("800x800")
     fc_win.configure(bg='white')
 
-    # 1) Fetch the months list dynamically
-    try:
-        months = fetch_available_months()  
-    except Exception as e:
-        messagebox.showerror("Data Error", f"Could not load months:\n{e}")
-        fc_win.destroy()
-        return
+    loading = LoadingIndicator(fc_win, text="Loading forecasts…", bg='white').pack(pady=10)
+
+    controls = tk.Frame(fc_win, bg='white')
+    controls.pack(pady=5)
+    series_var = tk.StringVar()
+    series_selector = ttk.Combobox(controls, textvariable=series_var, state="readonly", width=30)
+    month_var = tk.StringVar()
+    month_selector = ttk.Combobox(controls, textvariable=month_var, state="readonly")
 
-    month_var = tk.StringVar(value=months[0])
-    selector = ttk.Combobox(
-        fc_win, textvariable=month_var, values=months, state="readonly"
-    )
-    selector.pack(pady=10)
+    # Top: next 30 days predicted by the precomputed models; bottom: one month of history
+    chart = charts.Chart(fc_win, nrows=2, figsize=(7, 7), toolbar=False, fill='both', expand=True)
+    fc_ax, hist_ax = chart.axes
 
-    # 2) Matplotlib setup
-    fig, ax = plt.subplots(figsize=(6, 4))
-    canvas = FigureCanvasTkAgg(fig, master=fc_win)
-    canvas.get_tk_widget().pack(fill='both', expand=True)
+    def plot_forecast(event=None):
+        sel = series_var.get()
 
-    # 3) Plot callback that asks the back end for data
+        def draw(data):
+            from decimate import to_plot_x
+            if chart.released:
+                return
+            x = to_plot_x(np.array(data["dates"], dtype="datetime64[D]"))
+            delays = np.array(data["delays"])
+            low, high = np.maximum(delays - data["rmse"], 0), delays + data["rmse"]
+            # The line is updated in place; the error band is a polygon, so it is replaced
+            if "forecast" in chart.artists:
+                line, band = chart.artists["forecast"]
+                line.set_data(x, delays)
+                band.remove()
+            else:
+                (line,) = fc_ax.plot(x, delays, marker='o', color='tab:orange', label='Forecast')
+                fc_ax.xaxis_date()
+                fc_ax.set_ylabel("Predicted Delay (min)")
+                fc_ax.grid(True)
+                fc_ax.tick_params(axis='x', labelrotation=30)
+            band = fc_ax.fill_between(x, low, high, color='tab:orange', alpha=0.2,
+                                      label='± typical daily error', animated=True)
+            chart.artists["forecast"] = (line, band)
+            if fc_ax.get_legend() is None:
+                fc_ax.legend()
+            fc_ax.set_title(f"Next {len(x)} Days — {sel} (data through {data['through']})")
+            chart.fit(fc_ax, x, np.concatenate([low, high]) if len(x) else [])
+            chart.refresh()
+
+        def on_error(e):
+            messagebox.showerror("Data Error", f"Could not load forecast for {sel}:\n{e}")
+
+        background.submit(fetch_forecast, sel, key=("forecast_series", str(fc_win)), owner=fc_win,
+                          busy=loading, on_success=draw, on_error=on_error, timeout=LOOKUP_TIMEOUT)
+
+    # Plot callback that asks the back end for one month of history
     def plot_selected_month(event=None):
         sel = month_var.get()
-        try:
-            data = fetch_delay_data(sel)
-        except Exception as e:
+
+        def draw(data):
+            if chart.released:
+                return
+            days, delays = data["days"], data["delays"]
+            if "history" in chart.artists:
+                chart.artists["history"].set_data(days, delays)
+            else:
+                (chart.artists["history"],) = hist_ax.plot(days, delays, marker='o')
+                hist_ax.set_xlabel("Day of Month")
+                hist_ax.set_ylabel("Delay (min)")
+                hist_ax.grid(True)
+            hist_ax.set_title(f"Arrival Delays — {sel}")
+            chart.fit(hist_ax, days, delays)
+            chart.refresh()
+
+        def on_error(e):
             messagebox.showerror("Data Error", f"Could not load data for {sel}:\n{e}")
-            return
 
-        days, delays = data["days"], data["delays"]
-        ax.clear()
-        ax.plot(days, delays, marker='o')
-        ax.set_title(f"Arrival Delays — {sel}")
-        ax.set_xlabel("Day of Month")
-        ax.set_ylabel("Delay (min)")
-        ax.grid(True)
-        canvas.draw()
+        background.submit(fetch_delay_data, sel, key=("forecast_month", str(fc_win)), owner=fc_win,
+                          busy=loading, on_success=draw, on_error=on_error, timeout=LOOKUP_TIMEOUT)
+
+    def fill(selector, var, plot):
+        def on_success(values):
+            if not values:
+                return
+            selector['values'] = values
+            var.set(values[0])
+            selector.pack(side='left', padx=5)
+            selector.bind("<<ComboboxSelected>>", plot)
+            plot()
+        return on_success
+
+    def on_error(e):
+        messagebox.showerror("Data Error", f"Could not reach the forecast service:\n{e}")
 
-    plot_selected_month()
-    selector.bind("<<ComboboxSelected>>", plot_selected_month)
+    # Lists load in the background; the first call also starts a local service if needed
+    background.submit(fetch_forecast_series, owner=fc_win, busy=loading,
+                      on_success=fill(series_selector, series_var, plot_forecast), on_error=on_error,
+                      timeout=REGRESSION_TIMEOUT)
+    background.submit(fetch_available_months, owner=fc_win, busy=loading,
+                      on_success=fill(month_selector, month_var, plot_selected_month), on_error=on_error,
+                      timeout=REGRESSION_TIMEOUT)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Flight delay lookup, comparison and forecasts.")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help=f"report import times and time to the first window (appended to {STARTUP_PROFILE_LOG})")
+    args = parser.parse_args()
+    if args.profile_startup:
+        profile_startup()
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,204 @@
+"""
+Run database calls off the Tk main thread.
+
+Work is submitted to a thread pool; finished results are put on a queue that
+the Tk main thread drains with `after()` polling, so callbacks always run on
+the UI thread and never touch Tk from a worker.
+
+    background.init(root)
+    background.submit(get_matching_departure_times, "DL 1191",
+                      key="load_times", on_success=show_times, busy=indicator)
+
+- key:     a newer submission with the same key supersedes the older one
+           (cancelled if not started yet, its running query stopped otherwise)
+- timeout: seconds before the task is reported as failed with TimeoutError;
+           its running query is stopped (db.cancel_running) so the worker
+           and its pooled connection are freed
+- owner:   widget the result is for; dropped if the widget was destroyed
+- busy:    a LoadingIndicator shown while the task runs
+"""
+import queue
+import threading
+import time
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk
+
+import db
+
+MAX_WORKERS = 4
+POLL_MS = 50
+DEFAULT_TIMEOUT = 60
+
+
+class Task:
+    def __init__(self, key, on_success, on_error, owner, busy, timeout):
+        self.key = key
+        self.on_success = on_success
+        self.on_error = on_error
+        self.owner = owner
+        self.busy = busy
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.timeout = timeout
+        self.future = None
+        self.finished = False   # callbacks already delivered (or task abandoned)
+        self._thread = None     # ident of the worker running it, while it runs
+        self._thread_lock = threading.Lock()
+
+    def cancel(self):
+        """Abandon the task: no callback will run for it, and its running query is stopped."""
+        self._interrupt()
+        self._finish()
+
+    def _interrupt(self):
+        if self.future is not None:
+            self.future.cancel()
+        # Held while interrupting, so the worker cannot move on to another task's query meanwhile
+        with self._thread_lock:
+            if self._thread is not None:
+                db.cancel_running(self._thread)
+
+    def _run(self, fn, args, kwargs):
+        with self._thread_lock:
+            self._thread = threading.get_ident()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._thread_lock:
+                self._thread = None
+
+    def _finish(self):
+        if not self.finished:
+            self.finished = True
+            if self.busy is not None:
+                self.busy.stop()
+
+
+class BackgroundRunner:
+    def __init__(self, root, max_workers=MAX_WORKERS, poll_ms=POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._results = queue.Queue()
+        self._latest = {}      # key -> most recent Task
+        self._pending = set()  # tasks whose callbacks are still owed
+        self._poll()
+
+    def submit(self, fn, *args, key=None, on_success=None, on_error=None,
+               owner=None, busy=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+        task = Task(key, on_success, on_error, owner, busy, timeout)
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None and not previous.finished:
+                previous.cancel()
+            self._latest[key] = task
+        if busy is not None:
+            busy.start()
+
+        def work():
+            try:
+                self._results.put((task, True, task._run(fn, args, kwargs)))
+            except Exception as e:
+                self._results.put((task, False, e))
+
+        self._pending.add(task)
+        task.future = self._executor.submit(work)
+        return task
+
+    def _deliver(self, task, ok, value):
+        self._pending.discard(task)
+        if task.finished:
+            return
+        task._finish()
+        if task.owner is not None and not _exists(task.owner):
+            return
+        callback = task.on_success if ok else task.on_error
+        if callback is None:
+            if not ok:
+                print("❌ Background task failed:", value)
+            return
+        try:
+            callback(value)
+        except Exception as e:
+            print("❌ Error in background callback:", e)
+
+    def _poll(self):
+        while True:
+            try:
+                task, ok, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._deliver(task, ok, value)
+
+        now = time.monotonic()
+        for task in list(self._pending):
+            if task.finished:
+                self._pending.discard(task)
+            elif task.deadline is not None and now > task.deadline:
+                task._interrupt()
+                self._deliver(task, False, TimeoutError(f"Query took longer than {task.timeout}s"))
+
+        try:
+            self.root.after(self.poll_ms, self._poll)
+        except tk.TclError:
+            self.shutdown()   # root window is gone
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _exists(widget):
+    try:
+        return bool(widget.winfo_exists())
+    except tk.TclError:
+        return False
+
+
+class LoadingIndicator:
+    """'Loading…' label with an indeterminate progress bar, shown while any task is running."""
+
+    def __init__(self, parent, text="Loading…", bg=None):
+        self.frame = tk.Frame(parent, bg=bg) if bg else tk.Frame(parent)
+        label_opts = {"bg": bg} if bg else {}
+        tk.Label(self.frame, text=text, fg='black', **label_opts).pack(side="left", padx=5)
+        self.bar = ttk.Progressbar(self.frame, mode="indeterminate", length=120)
+        self.bar.pack(side="left")
+        self._count = 0
+        self._pack_opts = {"pady": 5}
+
+    def pack(self, **opts):
+        """Remember where to show the indicator; it stays hidden until start()."""
+        self._pack_opts = opts
+        return self
+
+    def start(self):
+        self._count += 1
+        if self._count == 1 and _exists(self.frame):
+            self.frame.pack(**self._pack_opts)
+            self.bar.start(15)
+
+    def stop(self):
+        self._count = max(0, self._count - 1)
+        if self._count == 0 and _exists(self.frame):
+            self.bar.stop()
+            self.frame.pack_forget()
+
+
+_runner = None
+
+
+def init(root, **opts):
+    global _runner
+    _runner = BackgroundRunner(root, **opts)
+    return _runner
+
+
+def submit(fn, *args, **kwargs):
+    if _runner is None:
+        raise RuntimeError("background.init(root) has not been called")
+    return _runner.submit(fn, *args, **kwargs)
+
+
+def pending():
+    """Tasks whose callbacks have not run yet (0 before init)."""
+    return len(_runner._pending) if _runner is not None else 0
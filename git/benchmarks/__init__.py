@@ -0,0 +1,9 @@
+"""
+Benchmarks for the app's query paths on synthetic data.
+
+    python -m benchmarks.generate --rows 1000000
+    python -m benchmarks.run --rows 1000000
+    python -m benchmarks.chart_memory --rows 1000000   # chart memory over a long session
+
+Run from the directory holding FinalDataBaseApplication.py.
+"""
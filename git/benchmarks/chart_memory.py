@@ -0,0 +1,109 @@
+"""
+Memory check for the chart windows: click through every airline's regression.
+
+    python -m benchmarks.chart_memory --rows 100000             # off-screen (Agg)
+    python -m benchmarks.chart_memory --rows 100000 --tk        # real Tk windows (needs a display)
+
+Each round shows the regression of every airline in one window, then closes
+it, the way a long session does. After each round it reports the process RSS,
+the live charts (charts.py) and the matplotlib figures still reachable. The
+first round loads the fits and imports matplotlib; RSS growing by more than
+--max-growth-mb from the end of the first round to the end of the last, or
+more live charts than charts.MAX_LIVE_FIGURES, fails the run.
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+
+import charts
+import db
+from benchmarks.generate import DATA_DIR, size_label
+from benchmarks.run import peak_rss_mb
+from duckdb_backend import DuckDBBackend
+
+
+def rss_mb():
+    """Current resident set size (peak RSS where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+
+def live_figures():
+    from matplotlib.figure import Figure
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, Figure))
+
+
+def round_offscreen(app, airlines, fits):
+    chart = charts.Chart(None, nrows=3, figsize=(11, 10))
+    for airline in airlines:
+        if fits[airline] is not None:
+            app.plot_regression_fits(chart, fits[airline], airline)
+    chart.release()   # the window closes
+
+
+def round_tk(app, airlines, root):
+    import background
+    for airline in airlines:
+        app.show_regression_for_airline(airline)
+        while background.pending():
+            root.update()
+            time.sleep(0.01)
+        root.update()
+    window = charts.reused_window("regression")
+    if window is not None:
+        window.destroy()
+    root.update()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="dataset size (selects benchmarks/data/<size>)")
+    parser.add_argument("--data", default=None, help="dataset directory (default: benchmarks/data/<size>)")
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--max-growth-mb", type=float, default=10.0)
+    parser.add_argument("--tk", action="store_true", help="drive the app's Tk windows instead of off-screen charts")
+    args = parser.parse_args()
+
+    data = args.data or os.path.join(DATA_DIR, size_label(args.rows))
+    if not os.path.isdir(os.path.join(data, "flights")):
+        sys.exit(f"No dataset at {data}; run: python -m benchmarks.generate --rows {args.rows}")
+    db.set_backend(DuckDBBackend(data))
+
+    import FinalDataBaseApplication as app
+    airlines = app.get_distinct_airlines()
+    if args.tk:
+        import tkinter as tk
+        import background
+        root = tk.Tk()
+        root.withdraw()
+        background.init(root)
+        run_round = lambda: round_tk(app, airlines, root)
+    else:
+        # Fits are computed once; the rounds measure the charts only
+        fits = {airline: app.fetch_regression_fits(airline) for airline in airlines}
+        run_round = lambda: round_offscreen(app, airlines, fits)
+
+    print(f"{len(airlines)} airlines per round, {'Tk windows' if args.tk else 'off-screen'}")
+    after_first = None
+    for n in range(1, args.rounds + 1):
+        start = time.perf_counter()
+        run_round()
+        gc.collect()
+        rss = rss_mb()
+        after_first = after_first if after_first is not None else rss
+        print(f"round {n}: {time.perf_counter() - start:5.1f}s  RSS {rss:7.1f} MB  "
+              f"live charts {charts.live_count()}  figures {live_figures()}")
+
+    s = charts.stats()
+    growth = rss - after_first
+    print(f"\nRSS growth after round 1: {growth:+.1f} MB; {s['created']} charts created, {s['released']} released, "
+          f"{s['blits']} blits / {s['full_draws']} full draws")
+    if growth > args.max_growth_mb or charts.live_count() > charts.MAX_LIVE_FIGURES:
+        print(f"❌ Chart memory is not reclaimed (limit {args.max_growth_mb:g} MB)")
+        sys.exit(1)
+    print("✅ Chart memory stays flat")
@@ -0,0 +1,248 @@
+"""
+Synthetic flight data in the DuckDB/Parquet layout (see duckdb_backend.py).
+
+Airlines, airports and the airline mix come from Airline_Normalization(3NF).csv;
+the per-flight fields (departure-time profile, delay rate and tail, cancellations,
+distances) are drawn from fixed distributions shaped like the BTS on-time data.
+Every month is generated from its own seeded NumPy stream, so a given
+(--rows, --seed) always produces the same files, and memory use is bounded by
+CHUNK_ROWS whatever the total size.
+
+    python -m benchmarks.generate --rows 100000        # -> benchmarks/data/100K
+    python -m benchmarks.generate --rows 100000000 --out /big/disk/100M
+"""
+import argparse
+import datetime
+import os
+import shutil
+import tempfile
+import time
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from duckdb_backend import convert_csv_to_parquet
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_CSV = os.path.join(os.path.dirname(HERE), "Airline_Normalization(3NF).csv")
+DATA_DIR = os.path.join(HERE, "data")
+
+FIRST_MONTH = datetime.date(2002, 1, 1)
+LAST_MONTH = datetime.date(2020, 3, 1)   # regression.REGRESSION_END is 2020-03-31
+CHUNK_ROWS = 1_000_000
+TAILS_PER_AIRLINE = 2000
+FLIGHT_NUMBERS = 7000
+
+# Scheduled departures by hour (05:00-23:00): morning bank, midday dip, evening bank
+HOUR_WEIGHTS = np.array([2, 6, 8, 8, 7, 6, 6, 6, 7, 7, 7, 7, 6, 6, 5, 4, 3, 2, 1], dtype=float)
+DELAYED_SHARE = 0.20        # flights departing late; the rest leave on time or early
+MEAN_LATE_MINUTES = 40.0    # exponential tail of departure delays
+CANCELLED_SHARE = 0.015
+DIVERTED_SHARE = 0.002
+
+
+def size_label(rows):
+    for unit, scale in (("M", 1_000_000), ("K", 1_000)):
+        if rows >= scale and rows % scale == 0:
+            return f"{rows // scale}{unit}"
+    return str(rows)
+
+
+def months():
+    day = FIRST_MONTH
+    while day <= LAST_MONTH:
+        yield day
+        day = datetime.date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def _days_in(month):
+    after = datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return (after - month).days
+
+
+def _nullable(values, null_mask):
+    return pd.arrays.IntegerArray(values.astype(np.int32), null_mask)
+
+
+def _flights_frame(rng, n, month, dims):
+    """n flights in `month` as integer columns; times are minutes after midnight."""
+    airline = rng.choice(len(dims["airline_ids"]), size=n, p=dims["airline_weights"])
+    origin = rng.integers(0, len(dims["origin_seqs"]), n)
+    dest = rng.integers(0, len(dims["dest_seqs"]), n)
+
+    crs_dep = (rng.choice(np.arange(5, 24), size=n, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum()) * 60
+               + rng.integers(0, 12, n) * 5)
+    distance = rng.integers(100, 2600, n)
+    crs_elapsed = distance // 8 + 30
+    taxi_out = rng.integers(5, 31, n)
+    taxi_in = rng.integers(3, 16, n)
+    air_time = np.maximum(crs_elapsed - 20 + rng.integers(-10, 11, n), 20)
+
+    late = rng.random(n) < DELAYED_SHARE
+    dep_delay = np.where(late, np.ceil(rng.exponential(MEAN_LATE_MINUTES, n)), -rng.integers(0, 10, n))
+    arr_delay = dep_delay + np.round(rng.normal(-5, 8, n))
+    cancelled = rng.random(n) < CANCELLED_SHARE
+    diverted = ~cancelled & (rng.random(n) < DIVERTED_SHARE)
+    no_dep, no_arr = cancelled, cancelled | diverted
+
+    dep = crs_dep + dep_delay
+    wheels_off = dep + taxi_out
+    wheels_on = wheels_off + air_time
+    arr = wheels_on + taxi_in
+    actual_elapsed = arr - dep
+
+    def delay_columns(delay, missing, prefix):
+        return {
+            f"{prefix}Delay": _nullable(delay, missing),
+            f"{prefix}DelayMinutes": _nullable(np.maximum(delay, 0), missing),
+            f"{prefix}Del15": _nullable(delay >= 15, missing),
+            f"{prefix}DelayGroups": _nullable(np.clip(np.floor(delay / 15), -2, 12), missing),
+        }
+
+    dep_cols = delay_columns(dep_delay, no_dep, "Dep")
+    arr_cols = delay_columns(arr_delay, no_arr, "Arr")
+    return pd.DataFrame({
+        "Day": rng.integers(0, _days_in(month), n),
+        "Tail": rng.integers(0, TAILS_PER_AIRLINE, n),
+        "CRSDep": crs_dep,
+        "FlightNumberReportingAirline": rng.integers(1, FLIGHT_NUMBERS, n).astype(np.int32),
+        "AirlineIdx": airline,
+        "Dep": _nullable(dep, no_dep),
+        "DepDelay": dep_cols["DepDelay"],
+        "DepDelayMinutes": dep_cols["DepDelayMinutes"],
+        "DepDel15": dep_cols["DepDel15"],
+        "DepartureDelayGroups": dep_cols["DepDelayGroups"],
+        "TaxiOut": _nullable(taxi_out, no_dep),
+        "WheelsOff": _nullable(wheels_off, no_dep),
+        "WheelsOn": _nullable(wheels_on, no_arr),
+        "TaxiIn": _nullable(taxi_in, no_arr),
+        "CRSArr": crs_dep + crs_elapsed,
+        "ArrDelay": arr_cols["ArrDelay"],
+        "ArrDelayMinutes": arr_cols["ArrDelayMinutes"],
+        "ArrDel15": arr_cols["ArrDel15"],
+        "ArrivalDelayGroups": arr_cols["ArrDelayGroups"],
+        "Cancelled": cancelled.astype(np.int8),
+        "Diverted": diverted.astype(np.int8),
+        "CRSElapsedTime": crs_elapsed.astype(np.int32),
+        "ActualElapsedTime": _nullable(actual_elapsed, no_arr),
+        "AirTime": _nullable(air_time, no_arr),
+        "Distance": distance.astype(np.int32),
+        "DistanceGroup": (distance // 250 + 1).astype(np.int32),
+        "OriginAirportSeqID": dims["origin_seqs"][origin],
+        "DestAirportSeqID": dims["dest_seqs"][dest],
+        "Arr": _nullable(arr, no_arr),
+    })
+
+
+def _as_time(column):
+    return f"make_time(CAST({column} // 60 % 24 AS BIGINT), CAST({column} % 60 AS BIGINT), 0)"
+
+
+# Same column names, order and types as convert_csv_to_parquet writes
+FLIGHTS_SELECT = f"""
+SELECT
+    CAST(? AS DATE) + CAST(c.Day AS INTEGER) AS FlightDate,
+    'N' || lpad(CAST(c.Tail AS VARCHAR), 4, '0') || a.ReportingAirline AS TailNumber,
+    {_as_time('c.CRSDep')} AS CRSDepTime,
+    c.FlightNumberReportingAirline,
+    a.ReportingAirline AS IATACodeReportingAirline,
+    {_as_time('c.Dep')} AS DepTime,
+    c.DepDelay, c.DepDelayMinutes, c.DepDel15, c.DepartureDelayGroups, c.TaxiOut,
+    {_as_time('c.WheelsOff')} AS WheelsOff,
+    {_as_time('c.WheelsOn')} AS WheelsOn,
+    c.TaxiIn,
+    {_as_time('c.CRSArr')} AS CRSArrTime,
+    c.ArrDelay, c.ArrDelayMinutes, c.ArrDel15, c.ArrivalDelayGroups,
+    CAST(c.Cancelled AS TINYINT) AS Cancelled, CAST(c.Diverted AS TINYINT) AS Diverted,
+    c.CRSElapsedTime, c.ActualElapsedTime, c.AirTime, c.Distance, c.DistanceGroup,
+    CAST(c.OriginAirportSeqID AS INTEGER) AS OriginAirportSeqID,
+    CAST(c.DestAirportSeqID AS INTEGER) AS DestAirportSeqID,
+    a.ReportingAirlineID,
+    {_as_time('c.Arr')} AS ArrTime
+FROM chunk c
+JOIN airlines a ON a.Idx = c.AirlineIdx
+"""
+
+
+def _load_dimensions(con, root):
+    """Copy the sample's dimension files into `root`; return the key arrays and airline mix."""
+    with tempfile.TemporaryDirectory() as tmp:
+        convert_csv_to_parquet(SAMPLE_CSV, tmp)
+        for name in ("origin", "destination", "reporting_airline"):
+            shutil.copy(os.path.join(tmp, f"{name}.parquet"), os.path.join(root, f"{name}.parquet"))
+        mix = dict(con.execute(f"""
+            SELECT ReportingAirlineID, COUNT(*)
+            FROM read_parquet('{os.path.join(tmp, "flights", "*", "*", "*.parquet")}')
+            GROUP BY ReportingAirlineID
+        """).fetchall())
+
+    airlines = con.execute(f"""
+        SELECT ReportingAirlineID, ReportingAirline
+        FROM read_parquet('{os.path.join(root, "reporting_airline.parquet")}')
+        ORDER BY ReportingAirlineID
+    """).fetchall()
+    con.execute("CREATE TEMP TABLE airlines (Idx INTEGER, ReportingAirlineID INTEGER, ReportingAirline VARCHAR)")
+    con.executemany("INSERT INTO airlines VALUES (?, ?, ?)",
+                    [(i, airline_id, code) for i, (airline_id, code) in enumerate(airlines)])
+
+    # Sample frequency, smoothed so carriers with one sample flight still fly
+    weights = np.array([mix.get(airline_id, 0) + 1 for airline_id, _ in airlines], dtype=float)
+
+    def seqs(name, column):
+        rows = con.execute(f"SELECT DISTINCT {column} FROM read_parquet('{os.path.join(root, name)}') "
+                           f"WHERE {column} IS NOT NULL ORDER BY 1").fetchall()
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    return {
+        "airline_ids": np.array([airline_id for airline_id, _ in airlines]),
+        "airline_weights": weights / weights.sum(),
+        "origin_seqs": seqs("origin.parquet", "OriginAirportSeqID"),
+        "dest_seqs": seqs("destination.parquet", "DestAirportSeqID"),
+    }
+
+
+def generate(rows, root, seed=0):
+    """Write `rows` synthetic flights (plus dimensions) under `root`. Returns rows written."""
+    if os.path.exists(os.path.join(root, "flights")):
+        shutil.rmtree(os.path.join(root, "flights"))
+    os.makedirs(root, exist_ok=True)
+    con = duckdb.connect(":memory:")
+    dims = _load_dimensions(con, root)
+
+    all_months = list(months())
+    days = np.array([_days_in(m) for m in all_months], dtype=float)
+    # Spread rows over months by length; rounding remainder goes to the last months
+    per_month = np.floor(rows * days / days.sum()).astype(np.int64)
+    per_month[len(per_month) - (rows - per_month.sum()):] += 1
+
+    written = 0
+    start = time.perf_counter()
+    for k, (month, n_month) in enumerate(zip(all_months, per_month)):
+        rng = np.random.default_rng([seed, k])
+        out_dir = os.path.join(root, "flights", f"Year={month.year}", f"Month={month.month}")
+        os.makedirs(out_dir, exist_ok=True)
+        for part, offset in enumerate(range(0, int(n_month), CHUNK_ROWS)):
+            n = min(CHUNK_ROWS, int(n_month) - offset)
+            chunk = _flights_frame(rng, n, month, dims)
+            con.register("chunk", chunk)
+            path = os.path.join(out_dir, f"data_{part}.parquet")
+            con.execute(f"COPY ({FLIGHTS_SELECT}) TO '{path}' (FORMAT PARQUET)", [month])
+            con.unregister("chunk")
+            written += n
+        if k % 24 == 0 or k == len(all_months) - 1:
+            rate = written / max(time.perf_counter() - start, 1e-9)
+            print(f"  {month:%Y-%m}: {written:,} rows ({rate:,.0f} rows/s)")
+    con.close()
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="output directory (default: benchmarks/data/<size>)")
+    args = parser.parse_args()
+    out = args.out or os.path.join(DATA_DIR, size_label(args.rows))
+    count = generate(args.rows, out, args.seed)
+    print(f"✅ Wrote {count:,} flights to {out}")
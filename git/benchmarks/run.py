@@ -0,0 +1,216 @@
+"""
+Time the app's query paths on a generated dataset and compare with the baseline.
+
+    python -m benchmarks.generate --rows 1000000
+    python -m benchmarks.run --rows 1000000                  # compare with baseline.json
+    python -m benchmarks.run --rows 1000000 --save-baseline  # record new numbers
+
+Each scenario runs once to warm up, then --repeats times with the result cache
+off. Reported per scenario:
+  p50/p95/p99   latency in ms
+  flights/s     dataset size / median latency (scan throughput)
+  result        rows (or keys) the call returned
+  peak RSS      process high-water mark after the scenario, in MB
+
+A scenario whose median is more than REGRESSION_FACTOR slower than the stored
+baseline for the same dataset size is reported as a regression and the run
+exits non-zero. Baselines are only comparable on the same machine; note it in
+the review when you refresh them.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+from itertools import product
+
+import numpy as np
+
+import cache
+import daily_metrics
+import db
+import regression
+import schedule
+from benchmarks.generate import DATA_DIR, size_label
+from duckdb_backend import DuckDBBackend
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+REGRESSION_FACTOR = 1.25
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:   # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10   # bytes on macOS, KiB on Linux
+
+
+def pick_parameters():
+    """A busy airline, one of its cities and dates, and one scheduled flight of it."""
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT ra.ReportingAirline, o.OriginCityName, f.FlightDate,
+                   f.FlightNumberReportingAirline
+            FROM ops.Flights f
+            JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID
+            JOIN ops.Origin o ON f.OriginAirportSeqID = o.OriginAirportSeqID
+            WHERE ra.ReportingAirline = (
+                SELECT ra2.ReportingAirline
+                FROM ops.Flights f2
+                JOIN meta.ReportingAirline ra2 ON f2.ReportingAirlineID = ra2.ReportingAirlineID
+                GROUP BY ra2.ReportingAirline
+                ORDER BY COUNT(*) DESC
+                LIMIT 1)
+            ORDER BY f.FlightDate DESC
+            LIMIT 1
+        """)
+        row = cursor.fetchone()
+    return {
+        "airline": row[0],
+        "city": row[1],
+        "date": str(row[2]),
+        "flight": f"{row[0]} {row[3]}",
+    }
+
+
+def scenarios(p):
+    """
+    name -> zero-argument callable. Cached query functions are called uncached so
+    errors surface; incremental views re-read the database while the cache is off.
+    """
+    # Imported here: the module builds Tk/matplotlib state on import
+    import FinalDataBaseApplication as app
+
+    cases = {
+        "distinct_airlines": app._fetch_distinct_airlines.uncached,
+        "distinct_cities": app._fetch_distinct_cities.uncached,
+        "distinct_dates": app._fetch_distinct_dates.uncached,
+    }
+    for airline, city, date in product((None, p["airline"]), (None, p["city"]), (None, p["date"])):
+        name = "avg_delay_" + ("_".join(label for label, value in
+                                        (("airline", airline), ("city", city), ("date", date)) if value) or "all")
+        cases[name] = (lambda a=airline, c=city, d=date: app._fetch_avg_delay.uncached(a, c, d))
+    cases.update({
+        "schedule_load": lambda: schedule.ScheduleIndex().load(*p["flight"].split()),
+        "regression_data": lambda: regression.fit_windows(regression.fetch_daily_stats(p["airline"])),
+        "daily_series": daily_metrics.query_daily_metrics,
+    })
+    return cases
+
+
+def _result_size(result):
+    if result is None:
+        return 0
+    try:
+        return len(result)
+    except TypeError:
+        return 1
+
+
+def run(cases, repeats, dataset_rows):
+    results = {}
+    print(f"{'scenario':34s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'flights/s':>13s} {'result':>8s} {'RSS MB':>8s}")
+    for name, call in cases.items():
+        with contextlib.redirect_stdout(io.StringIO()):   # the app prints on every lookup
+            result = call()
+            samples = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                call()
+                samples.append(time.perf_counter() - start)
+        p50, p95, p99 = np.percentile(np.array(samples) * 1000, [50, 95, 99])
+        rss = peak_rss_mb()
+        results[name] = {
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "flights_per_s": round(dataset_rows / (p50 / 1000)) if p50 else None,
+            "result_rows": _result_size(result),
+            "peak_rss_mb": round(rss, 1) if rss is not None else None,
+            "runs": repeats,
+        }
+        r = results[name]
+        print(f"{name:34s} {p50:8.2f}ms {p95:8.2f}ms {p99:8.2f}ms {r['flights_per_s'] or 0:13,d} "
+              f"{r['result_rows']:8d} {r['peak_rss_mb'] or 0:8.1f}"
+              + ("   ⚠️ empty result" if not r["result_rows"] else ""))
+    return results
+
+
+def load_baselines():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def compare(baseline, results):
+    """Print the change in median per scenario; returns the names that regressed."""
+    regressed = []
+    print(f"\n{'scenario':34s} {'baseline':>10s} {'now':>10s} {'change':>8s}")
+    for name, now in results.items():
+        if name not in baseline["scenarios"]:
+            continue
+        before = baseline["scenarios"][name]["p50_ms"]
+        ratio = now["p50_ms"] / before if before else float("inf")
+        flag = ""
+        if ratio > REGRESSION_FACTOR:
+            regressed.append(name)
+            flag = "   ❌ regression"
+        print(f"{name:34s} {before:8.2f}ms {now['p50_ms']:8.2f}ms {ratio - 1:+7.0%}{flag}")
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="dataset size (selects benchmarks/data/<size>)")
+    parser.add_argument("--data", default=None, help="dataset directory (default: benchmarks/data/<size>)")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    label = size_label(args.rows)
+    data = args.data or os.path.join(DATA_DIR, label)
+    if not os.path.isdir(os.path.join(data, "flights")):
+        sys.exit(f"No dataset at {data}; run: python -m benchmarks.generate --rows {args.rows}")
+
+    cache.default_cache.enabled = False   # every run must reach the database
+    db.set_backend(DuckDBBackend(data))
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM ops.Flights")
+        dataset_rows = cursor.fetchone()[0]
+
+    params = pick_parameters()
+    print(f"{dataset_rows:,} flights in {data}; parameters: {params}\n")
+    results = run(scenarios(params), args.repeats, dataset_rows)
+
+    baselines = load_baselines()
+    if args.save_baseline:
+        baselines[label] = {
+            "machine": f"{platform.machine()} {platform.processor() or platform.system()}, "
+                       f"{os.cpu_count()} CPUs, Python {platform.python_version()}",
+            "parameters": params,
+            "scenarios": results,
+        }
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\n✅ Baseline for {label} saved to {BASELINE_PATH}")
+    elif label in baselines:
+        regressed = compare(baselines[label], results)
+        if regressed:
+            print(f"\n❌ {len(regressed)} scenario(s) slower than baseline by more than "
+                  f"{REGRESSION_FACTOR - 1:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+        print("\n✅ No regressions against the baseline")
+    else:
+        print(f"\nNo baseline for {label}; record one with --save-baseline")
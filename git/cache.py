@@ -0,0 +1,172 @@
+"""
+In-memory result cache for the query functions.
+
+    @cache.cached(ttl=3600)
+    def _fetch_distinct_airlines():
+        ...
+
+Entries are keyed on (function, arguments), evicted least-recently-used once
+the cache holds `maxsize` entries, and expire after the decorating function's
+TTL. Concurrent calls with the same key share one execution (single-flight):
+the first caller runs the query, the others wait for its result.
+
+Only returned values are cached; an exception is passed to every waiting
+caller and the next call tries again. A call still running when its entry is
+invalidated answers its own callers but is not stored, and later callers start
+a new one. Lists, dicts and sets are handed out as shallow copies, so a caller
+that changes its result does not change the cache.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+DEFAULT_MAXSIZE = 256
+
+
+class _Flight:
+    """A call in progress that other callers with the same key can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.stale = False   # invalidated while running: do not store the result
+
+
+def _copy(value):
+    """What a caller gets: its own copy of a list / dict / set, the cached object otherwise."""
+    if isinstance(value, (list, dict, set)):
+        return type(value)(value)
+    return value
+
+
+class ResultCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, expires_at), LRU order
+        self._inflight = {}             # key -> _Flight
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0, "shared": 0})
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_call(self, key, ttl, call):
+        name = key[0]
+        if not self.enabled:
+            return call()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self._stats[name]["hits"] += 1
+                    return _copy(value)
+                del self._entries[key]
+                self.expirations += 1
+
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self._stats[name]["shared"] += 1
+                leader = False
+            else:
+                flight = self._inflight[key] = _Flight()
+                self._stats[name]["misses"] += 1
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _copy(flight.value)
+
+        try:
+            flight.value = call()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                if not flight.stale:
+                    expires_at = None if ttl is None else time.monotonic() + ttl
+                    self._entries[key] = (flight.value, expires_at)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            return _copy(flight.value)
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            flight.done.set()
+
+    def invalidate(self, predicate=None):
+        """Drop entries whose key matches `predicate(key)` (all entries if None) and calls running for them."""
+        with self._lock:
+            keys = [k for k in self._entries if predicate is None or predicate(k)]
+            for k in keys:
+                del self._entries[k]
+            for k in [k for k in self._inflight if predicate is None or predicate(k)]:
+                self._inflight.pop(k).stale = True
+        return len(keys)
+
+    def stats(self):
+        with self._lock:
+            per_function = {name: dict(s) for name, s in self._stats.items()}
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": sum(s["hits"] for s in per_function.values()),
+                "misses": sum(s["misses"] for s in per_function.values()),
+                "shared": sum(s["shared"] for s in per_function.values()),
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "functions": per_function,
+            }
+
+
+default_cache = ResultCache()
+
+
+def _make_key(name, args, kwargs):
+    return (name, args, tuple(sorted(kwargs.items())))
+
+
+def cached(ttl=None, cache=None):
+    """Cache a function's results in `cache` (the shared default) for `ttl` seconds."""
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            store = cache or default_cache
+            key = _make_key(name, args, kwargs)
+            return store.get_or_call(key, ttl, lambda: func(*args, **kwargs))
+
+        def invalidate(*args, **kwargs):
+            store = cache or default_cache
+            if args or kwargs:
+                key = _make_key(name, args, kwargs)
+                return store.invalidate(lambda k: k == key)
+            return store.invalidate(lambda k: k[0] == name)
+
+        wrapper.cache_name = name
+        wrapper.invalidate = invalidate
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
+
+
+def stats():
+    """Hit/miss counters of the shared cache, overall and per function."""
+    return default_cache.stats()
+
+
+def clear():
+    return default_cache.invalidate()
@@ -0,0 +1,186 @@
+"""
+Capture actual execution plans and timings for the app's queries.
+
+Runs each query function in FinalDataBaseApplication against SQL Server and
+stores, under plans/<label>/:
+  - <scenario>.sqlplan   actual plan (open in SSMS / Azure Data Studio)
+  - timings.json         wall-clock latency over several runs per scenario
+
+Typical use around the physical-design migrations:
+
+    python capture_plans.py capture before
+    python migrate.py
+    python capture_plans.py capture after
+    python capture_plans.py compare before after
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import cache
+import daily_metrics
+import db
+import schedule
+import FinalDataBaseApplication as app
+
+PLANS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plans")
+
+
+def scenarios(airline, flight_number, city, date):
+    """name -> zero-argument callable running one app query."""
+    return {
+        "distinct_airlines": app.get_distinct_airlines,
+        "distinct_cities": app.get_distinct_cities,
+        "distinct_dates": app.get_distinct_dates,
+        "daily_metrics": daily_metrics.query_daily_metrics,
+        "avg_delay_all": lambda: app.calculate_avg_delay(),
+        "avg_delay_airline": lambda: app.calculate_avg_delay(airline=airline),
+        "avg_delay_airline_city_date": lambda: app.calculate_avg_delay(airline=airline, city=city, date=date),
+        "schedule_load": lambda: schedule.ScheduleIndex().load(*flight_number.split()),
+    }
+
+
+class _CapturingCursor:
+    """
+    Runs each statement with STATISTICS XML on and keeps the showplan result set.
+    The plan follows the statement's rows, so they are read up front and served
+    from memory (fetchone / fetchmany / fetchall), with the statement's description.
+    """
+
+    def __init__(self, cursor, plans):
+        self._cursor = cursor
+        self._plans = plans
+        self._rows = []
+        self._next = 0   # position of the next row to hand out
+        self.description = None
+
+    def execute(self, sql, params=()):
+        self._cursor.execute("SET STATISTICS XML ON")
+        self._cursor.execute(sql, params)
+        self.description = self._cursor.description
+        self._rows = self._cursor.fetchall() if self.description is not None else []
+        self._next = 0
+        while self._cursor.nextset():
+            for row in self._cursor.fetchall():
+                if str(row[0]).startswith("<ShowPlanXML"):
+                    self._plans.append(row[0])
+        self._cursor.execute("SET STATISTICS XML OFF")
+        return self
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size=None):
+        size = self._cursor.arraysize if size is None else size
+        rows = self._rows[self._next:self._next + size]
+        self._next += len(rows)
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(len(self._rows))
+
+    def __getattr__(self, name):
+        # Anything else (arraysize, rowcount, close, ...) is the wrapped cursor's; its
+        # other fetch methods are not, the rows have already been read from it
+        if name.startswith("fetch"):
+            raise AttributeError(name)
+        return getattr(self._cursor, name)
+
+
+class _CapturingConnection:
+    def __init__(self, conn, plans):
+        self._conn = conn
+        self._plans = plans
+
+    def cursor(self):
+        return _CapturingCursor(self._conn.cursor(), self._plans)
+
+
+class CapturingBackend(db.SqlServerBackend):
+    def __init__(self):
+        super().__init__()
+        self.plans = []
+
+    @contextmanager
+    def connection(self):
+        with self.pool.connection() as conn:
+            yield _CapturingConnection(conn, self.plans)
+
+
+def capture(label, cases, repeats):
+    out_dir = os.path.join(PLANS_DIR, label)
+    os.makedirs(out_dir, exist_ok=True)
+    cache.default_cache.enabled = False   # every run must reach the database
+
+    # 1) timings on the normal backend, first run discarded as warm-up
+    timings = {}
+    for name, run in cases.items():
+        run()
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run()
+            samples.append(time.perf_counter() - start)
+        timings[name] = {
+            "median_ms": statistics.median(samples) * 1000,
+            "min_ms": min(samples) * 1000,
+            "max_ms": max(samples) * 1000,
+            "runs": repeats,
+        }
+        print(f"{name:32s} {timings[name]['median_ms']:10.1f} ms")
+
+    with open(os.path.join(out_dir, "timings.json"), "w") as f:
+        json.dump(timings, f, indent=2)
+
+    # 2) one run per scenario with actual plans
+    backend = CapturingBackend()
+    db.set_backend(backend)
+    for name, run in cases.items():
+        backend.plans.clear()
+        run()
+        for i, plan in enumerate(backend.plans):
+            suffix = f"_{i}" if i else ""
+            with open(os.path.join(out_dir, f"{name}{suffix}.sqlplan"), "w", encoding="utf-8") as f:
+                f.write(plan)
+    print(f"✅ Plans and timings written to {out_dir}")
+
+
+def compare(before, after):
+    with open(os.path.join(PLANS_DIR, before, "timings.json")) as f:
+        old = json.load(f)
+    with open(os.path.join(PLANS_DIR, after, "timings.json")) as f:
+        new = json.load(f)
+    print(f"{'scenario':32s} {before:>12s} {after:>12s} {'speedup':>9s}")
+    for name in old:
+        if name not in new:
+            continue
+        a, b = old[name]["median_ms"], new[name]["median_ms"]
+        speedup = a / b if b else float("inf")
+        print(f"{name:32s} {a:10.1f}ms {b:10.1f}ms {speedup:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    cap = sub.add_parser("capture")
+    cap.add_argument("label")
+    cap.add_argument("--repeats", type=int, default=5)
+    cap.add_argument("--airline", default="DL")
+    cap.add_argument("--flight", default="DL 1191")
+    cap.add_argument("--city", default="Atlanta")
+    cap.add_argument("--date", default="2019-06-11")
+
+    cmp = sub.add_parser("compare")
+    cmp.add_argument("before")
+    cmp.add_argument("after")
+
+    args = parser.parse_args()
+    if args.command == "capture":
+        capture(args.label, scenarios(args.airline, args.flight, args.city, args.date), args.repeats)
+    else:
+        compare(args.before, args.after)
@@ -0,0 +1,215 @@
+"""
+Figure lifecycle for the app's chart windows.
+
+    chart = charts.Chart(win, nrows=2, figsize=(8, 6), fill='both', expand=True)
+    (line,) = chart.axes[0].plot(x, y, animated=True)
+    ...
+    line.set_data(new_x, new_y)
+    chart.fit(chart.axes[0], new_x, new_y)
+    chart.refresh()          # blit when only the data changed, full redraw otherwise
+
+    show = charts.reuse("regression", open_regression_window)   # one window, reused
+
+Charts are matplotlib.figure.Figure objects on their own canvas, never pyplot
+figures, so no global figure manager holds on to them: a chart is released
+(figure cleared, canvas destroyed) when its window closes.
+
+Windows update their artists in place (set_data / set_offsets) instead of
+rebuilding axes. The data artists, titles and legends are animated: a full
+draw renders everything else once and keeps a copy of it, and later updates
+that leave every axis range unchanged only restore that copy and redraw the
+animated artists (blitting). `fit` keeps an axis range while new data still
+fills most of it, so similar series (airline after airline) take the blit
+path.
+
+At most MAX_LIVE_FIGURES charts exist at once (AIRLINE_MAX_FIGURES); opening
+one more releases the least recently updated one and leaves a note in its
+place.
+"""
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_LIVE_FIGURES = int(os.environ.get("AIRLINE_MAX_FIGURES", 8))
+# An axis range is kept while new data spans at least this share of it
+KEEP_LIMITS_FILL = 0.5
+MARGIN = 0.05
+
+_live = OrderedDict()   # id -> Chart, least recently updated first
+_reused = {}            # key -> (window, chart, handle)
+_stats = {"created": 0, "released": 0, "evicted": 0, "full_draws": 0, "blits": 0}
+
+
+class Chart:
+    """
+    One figure with its canvas (and toolbar) packed into `master`; `master=None`
+    gives an off-screen Agg canvas (scripts, memory tests).
+    """
+
+    def __init__(self, master, nrows=1, ncols=1, figsize=(8, 4), toolbar=True, **pack_opts):
+        from matplotlib.figure import Figure
+        self.figure = Figure(figsize=figsize, layout="constrained")
+        self.axes = list(self.figure.subplots(nrows, ncols, squeeze=False).ravel())
+        self.artists = {}   # for callers: whatever they update in place on the next refresh
+        self.frame = None
+        if master is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.canvas = FigureCanvasAgg(self.figure)
+        else:
+            import tkinter as tk
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+            self.frame = tk.Frame(master, bg='white')
+            self.canvas = FigureCanvasTkAgg(self.figure, master=self.frame)
+            if toolbar:
+                bar = NavigationToolbar2Tk(self.canvas, self.frame, pack_toolbar=False)
+                bar.update()
+                bar.pack(side='bottom', fill='x')
+            self.canvas.get_tk_widget().pack(fill='both', expand=True)
+            self.frame.pack(**pack_opts)
+            # The frame goes when its window closes: release the figure with it
+            self.frame.bind("<Destroy>", self._on_destroy)
+        self._background = None
+        self._drawn_limits = None
+        self._draw_cid = self.canvas.mpl_connect("draw_event", self._on_draw)
+        _register(self)
+
+    @property
+    def released(self):
+        return self.figure is None
+
+    # --- drawing ---
+    def _animated(self):
+        artists = []
+        for ax in self.axes:
+            if not ax.get_visible():
+                continue
+            artists += list(ax.collections) + list(ax.lines) + [ax.title]
+            if ax.get_legend() is not None:
+                artists.append(ax.get_legend())
+        return artists
+
+    def _limits(self):
+        return tuple((ax.get_visible(), ax.get_xlim(), ax.get_ylim()) for ax in self.axes)
+
+    def _on_draw(self, event):
+        # A full draw left out the animated artists: keep it, then add them on top
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._drawn_limits = self._limits()
+        for artist in self._animated():
+            self.figure.draw_artist(artist)
+
+    def refresh(self):
+        """Show the current artists: blit when the axes are unchanged since the last full draw."""
+        if self.released:
+            return
+        _live.move_to_end(id(self))
+        newly_animated = False
+        for artist in self._animated():
+            if not artist.get_animated():
+                artist.set_animated(True)
+                newly_animated = True
+        if (self._background is None or newly_animated or self._limits() != self._drawn_limits
+                or not self.canvas.supports_blit):
+            _stats["full_draws"] += 1
+            self.canvas.draw_idle()
+            return
+        _stats["blits"] += 1
+        self.canvas.restore_region(self._background)
+        for artist in self._animated():
+            self.figure.draw_artist(artist)
+        self.canvas.blit(self.figure.bbox)
+
+    def fit(self, ax, x, y):
+        """Axis ranges for (x, y): kept while the data fits and fills them, else reset with a margin."""
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        for values, get, set_ in ((x, ax.get_xlim, ax.set_xlim), (y, ax.get_ylim, ax.set_ylim)):
+            values = values[np.isfinite(values)]
+            if len(values) == 0:
+                continue
+            lo, hi = float(values.min()), float(values.max())
+            current_lo, current_hi = get()
+            span = current_hi - current_lo
+            if current_lo <= lo and hi <= current_hi and span > 0 and (hi - lo) >= KEEP_LIMITS_FILL * span:
+                continue
+            set_(*_nice_range(lo, hi))
+
+    # --- lifecycle ---
+    def _on_destroy(self, event):
+        if event.widget is self.frame:
+            self.release()
+
+    def release(self, note=None):
+        """Free the figure and its canvas; `note` is left in the window when it stays open."""
+        if self.released:
+            return
+        _live.pop(id(self), None)
+        _stats["released"] += 1
+        self.canvas.mpl_disconnect(self._draw_cid)
+        self.figure.clear()
+        self.artists.clear()
+        self._background = None
+        self.figure = self.axes = None
+        if note and self.frame is not None and self.frame.winfo_exists():
+            # Evicted while its window stays open: swap the canvas for the note
+            import tkinter as tk
+            for child in self.frame.winfo_children():
+                child.destroy()
+            tk.Label(self.frame, text=note, bg='white', fg='gray').pack(pady=20)
+        self.canvas = None
+
+
+def _nice_range(lo, hi):
+    """(lo, hi) widened by MARGIN and rounded out to a round step, so similar data fits again."""
+    pad = (hi - lo) * MARGIN or max(abs(lo) * MARGIN, 1.0)
+    lo, hi = lo - pad, hi + pad
+    step = 10.0 ** np.floor(np.log10(hi - lo)) / 2
+    return float(np.floor(lo / step) * step), float(np.ceil(hi / step) * step)
+
+
+def _register(chart):
+    _stats["created"] += 1
+    _live[id(chart)] = chart
+    while len(_live) > MAX_LIVE_FIGURES:
+        oldest = next(iter(_live.values()))
+        _stats["evicted"] += 1
+        oldest.release(note=f"Chart closed to keep at most {MAX_LIVE_FIGURES} open; reopen this window to see it.")
+
+
+def reuse(key, create):
+    """
+    The handle of the window opened for `key` if it is still open with its
+    chart (raised to the front), else `create()` -> (window, chart, handle)
+    and its handle. A window whose chart was evicted is closed and replaced.
+    """
+    window, chart, handle = _reused.get(key, (None, None, None))
+    try:
+        if window is not None and window.winfo_exists():
+            if not chart.released:
+                window.deiconify()
+                window.lift()
+                return handle
+            window.destroy()
+    except Exception:
+        pass
+    window, chart, handle = create()
+    _reused[key] = (window, chart, handle)
+    return handle
+
+
+def reused_window(key):
+    """The window open for `key` (see reuse), or None."""
+    window = _reused.get(key, (None, None, None))[0]
+    try:
+        return window if window is not None and window.winfo_exists() else None
+    except Exception:
+        return None
+
+
+def live_count():
+    return len(_live)
+
+
+def stats():
+    """Counters of this process: charts created, released, evicted, full draws and blits."""
+    return dict(_stats, live=len(_live), max_live=MAX_LIVE_FIGURES)
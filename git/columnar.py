@@ -0,0 +1,104 @@
+"""
+Fetch query results straight into typed NumPy columns.
+
+    cols = columnar.fetch_columns(sql, params,
+                                  dtypes={"FlightDate": "datetime64[D]", "ArrDelayMinutes": "float32"})
+    cols["FlightDate"], cols["ArrDelayMinutes"]
+
+Rows are read in `fetchmany` batches and each batch is converted to one typed
+array per column, so at most one batch of driver Row objects is alive at a
+time. Backends with a native columnar path (DuckDB) skip Row objects entirely.
+
+`iter_column_batches` yields the per-batch columns instead, for callers that
+aggregate as they go without holding the full result.
+
+Columns without an entry in `dtypes` keep NumPy's inferred type. NULLs become
+NaN / NaT, so give nullable numeric columns a float dtype.
+"""
+import numpy as np
+
+import db
+
+BATCH_SIZE = 50_000
+
+
+def _is_null(value):
+    # None from pyodbc; NaN or pandas' NA in the object columns of DuckDB's native path
+    return value is None or (isinstance(value, float) and value != value) or type(value).__name__ == "NAType"
+
+
+def _has_null(values):
+    if isinstance(values, np.ma.MaskedArray):
+        return bool(np.ma.getmaskarray(values).any())
+    if isinstance(values, np.ndarray) and values.dtype.kind in "fc":
+        return bool(np.isnan(values).any())   # DuckDB hands integer columns with NULLs over as float
+    if isinstance(values, np.ndarray) and values.dtype.kind != "O":
+        return False
+    return any(_is_null(v) for v in values)
+
+
+def _to_array(values, dtype):
+    if dtype is None:
+        return np.array(values)
+    dtype = np.dtype(dtype)
+    if dtype.kind in "iub" and _has_null(values):
+        raise ValueError(f"NULL in a column requested as {dtype}; use a float dtype instead")
+    if isinstance(values, np.ma.MaskedArray):
+        if dtype.kind in "fc":
+            return values.astype(dtype).filled(np.nan)
+        if dtype.kind in "mM":
+            return values.astype(dtype).filled(np.datetime64("NaT"))
+        values = values.filled()
+    if isinstance(values, np.ndarray):
+        return values.astype(dtype, copy=False)
+    return np.array(values, dtype=dtype)
+
+
+def _cast(columns, dtypes):
+    return {name: _to_array(values, dtypes.get(name)) for name, values in columns.items()}
+
+
+def _batches(cursor, names, dtypes, batch_size):
+    native = getattr(cursor, "fetch_numpy_batches", None)
+    if native is not None:
+        for batch in native(batch_size):
+            yield _cast(batch, dtypes)
+        return
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        columns = {name: [row[i] for row in rows] for i, name in enumerate(names)}
+        del rows
+        yield _cast(columns, dtypes)
+
+
+def iter_column_batches(sql, params=(), dtypes=None, batch_size=BATCH_SIZE):
+    """Yield {column: ndarray} for each batch of up to `batch_size` rows."""
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, tuple(params))
+        names = [col[0] for col in cursor.description]
+        yield from _batches(cursor, names, dtypes or {}, batch_size)
+
+
+def fetch_columns(sql, params=(), dtypes=None, batch_size=BATCH_SIZE):
+    """The whole result as {column: ndarray}."""
+    dtypes = dtypes or {}
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, tuple(params))
+        names = [col[0] for col in cursor.description]
+        chunks = {name: [] for name in names}
+        for batch in _batches(cursor, names, dtypes, batch_size):
+            for name, values in batch.items():
+                chunks[name].append(values)
+
+    columns = {}
+    for name, parts in chunks.items():
+        if not parts:
+            columns[name] = np.array([], dtype=dtypes.get(name, np.float64))
+        else:
+            columns[name] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+    return columns
@@ -0,0 +1,218 @@
+"""
+Run the Compare window's calculation for many airline × city × date filters at once.
+
+    python compare_batch.py --airlines DL AA --cities Atlanta Boston "*" --dates 2020-03-01 --out compare.csv
+    python compare_batch.py --filters filters.csv --out compare.parquet
+
+A filter is (airline, city, date); an empty value means "any", as in the
+Compare window. `--airlines/--cities/--dates` take the cross product ("*" in a
+list adds "any" for that field); `--filters` reads a CSV with Airline, City
+and Date columns.
+
+All filters are answered by one GROUPING SETS query, with one grouping set
+per combination of fields that is filtered on, instead of one
+calculate_avg_delay call (connection + full join) each. The query uses
+COMPARISON_AGGREGATES over COMPARISON_FROM, the same expressions and joins as
+the window, so every row equals the per-call result, including the
+COUNT(DISTINCT OriginAirportSeqID) airport traffic. A filter that matches no
+flights gets an empty AvgDelay and zero counts, as a single call would.
+
+Results come back in the order the filters were given and are written in
+batches to CSV, or to Parquet when pyarrow is installed.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import namedtuple
+from itertools import islice, product
+
+import db
+
+# AVG over an INT column truncates on SQL Server; the cube returns the exact mean
+COMPARISON_AGGREGATES = """
+    AVG(CAST(f.DepDelayMinutes AS DOUBLE PRECISION)) AS AvgDelay,
+    COUNT(*) AS TotalFlights,
+    COUNT(DISTINCT f.OriginAirportSeqID) AS AirportTraffic"""
+
+COMPARISON_FROM = """
+FROM ops.Flights f
+LEFT JOIN ops.Origin o ON f.OriginAirportSeqID = o.OriginAirportSeqID
+LEFT JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID"""
+
+ANY = "*"
+FETCH_BATCH = 10_000
+WRITE_BATCH = 10_000
+# Fields with more distinct values than this are not pre-filtered with IN
+# (SQL Server allows 2100 parameters per statement)
+MAX_IN_VALUES = 1000
+
+Filter = namedtuple("Filter", ["airline", "city", "date"])
+Result = namedtuple("Result", ["Airline", "City", "Date", "AvgDelay", "TotalFlights", "AirportTraffic"])
+
+# Filter field -> grouped column and its alias in the result
+GROUP_COLUMNS = [("ra.ReportingAirline", "Airline"),
+                 ("o.OriginCityName", "City"),
+                 ("f.FlightDate", "FlightDate")]
+
+
+def normalize(airline=None, city=None, date=None):
+    """A Filter with "", None and "*" meaning "any" and dates as YYYY-MM-DD."""
+    def value(v):
+        v = v.strip() if isinstance(v, str) else v
+        return None if v in (None, "", ANY) else v
+    date = value(date)
+    return Filter(value(airline), value(city), str(db.to_date(date)) if date is not None else None)
+
+
+def cross_product(airlines=None, cities=None, dates=None):
+    return [normalize(a, c, d) for a, c, d in product(airlines or [None], cities or [None], dates or [None])]
+
+
+def read_filters(path):
+    """Filters from a CSV with Airline, City and Date columns (any may be missing)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    fields = lambda row: {name.strip().lower(): value for name, value in row.items() if name}
+    return [normalize(r.get("airline"), r.get("city"), r.get("date")) for r in map(fields, rows)]
+
+
+def _pattern(f):
+    return tuple(v is not None for v in f)
+
+
+def build_query(filters):
+    """(sql, params, indexes of the grouped fields) with one grouping set per pattern of filtered fields."""
+    patterns = sorted({_pattern(f) for f in filters})
+    used = [i for i in range(len(GROUP_COLUMNS)) if any(p[i] for p in patterns)]
+
+    select = []
+    for i in used:
+        column, alias = GROUP_COLUMNS[i]
+        select += [f"{column} AS {alias}", f"GROUPING({column}) AS Grouped{alias}"]
+    grouping_sets = ", ".join(
+        "(" + ", ".join(GROUP_COLUMNS[i][0] for i in used if p[i]) + ")" for p in patterns)
+
+    # A field every filter restricts only needs its requested values read
+    where, params = [], []
+    for i, (column, _) in enumerate(GROUP_COLUMNS):
+        values = {f[i] for f in filters}
+        if None in values or len(values) > MAX_IN_VALUES:
+            continue
+        if column == "f.FlightDate":
+            sql, date_params = db.get_backend().flight_date_in("f", values)
+            where.append(sql)
+            params.extend(date_params)
+        else:
+            where.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(sorted(values))
+
+    sql = (f"SELECT {', '.join(select + [COMPARISON_AGGREGATES.strip()])}"
+           f"{COMPARISON_FROM}\n"
+           + (f"WHERE {' AND '.join(where)}\n" if where else "")
+           + f"GROUP BY GROUPING SETS ({grouping_sets})")
+    return sql, params, used
+
+
+def compare(filters):
+    """
+    One Result per filter, in order. The grouped query streams through and only
+    the groups some filter asked for are kept.
+    """
+    filters = list(filters)
+    if not filters:
+        return []
+    sql, params, used = build_query(filters)
+    wanted = set(filters)
+
+    found = {}
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, tuple(params))
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH)
+            if not rows:
+                break
+            for row in rows:
+                key = [None, None, None]
+                for n, i in enumerate(used):
+                    value, grouped = row[2 * n], row[2 * n + 1]
+                    if not grouped:
+                        if value is None:
+                            break   # flights without an airline/city match no filter
+                        key[i] = str(db.to_date(value)) if i == 2 else value
+                else:
+                    key = Filter(*key)
+                    if key in wanted:
+                        found[key] = tuple(row[2 * len(used):])
+
+    return [Result(f.airline or "", f.city or "", f.date or "", *found.get(f, (None, 0, 0)))
+            for f in filters]
+
+
+def _batches(rows, size=WRITE_BATCH):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def write_csv(results, path):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(Result._fields)
+        for batch in _batches(results):
+            writer.writerows(["" if v is None else v for v in row] for row in batch)
+    os.replace(tmp, path)
+
+
+def write_parquet(results, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow); use a .csv path instead")
+    schema = pa.schema([("Airline", pa.string()), ("City", pa.string()), ("Date", pa.string()),
+                        ("AvgDelay", pa.float64()), ("TotalFlights", pa.int64()), ("AirportTraffic", pa.int64())])
+    tmp = f"{path}.tmp{os.getpid()}"
+    with pq.ParquetWriter(tmp, schema) as writer:
+        for batch in _batches(results):
+            columns = list(zip(*batch))
+            columns[3] = [None if v is None else float(v) for v in columns[3]]
+            writer.write_table(pa.Table.from_arrays([pa.array(c, t.type) for c, t in zip(columns, schema)],
+                                                    schema=schema))
+    os.replace(tmp, path)
+
+
+def write(results, path):
+    if path.lower().endswith(".parquet"):
+        write_parquet(results, path)
+    else:
+        write_csv(results, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filters", help="CSV of filters (Airline, City, Date columns)")
+    parser.add_argument("--airlines", nargs="*", help=f"airline codes; {ANY!r} for any airline")
+    parser.add_argument("--cities", nargs="*", help=f"origin cities; {ANY!r} for any city")
+    parser.add_argument("--dates", nargs="*", help=f"flight dates (YYYY-MM-DD); {ANY!r} for any date")
+    parser.add_argument("--out", required=True, help="output file, .csv or .parquet")
+    args = parser.parse_args()
+
+    if args.filters:
+        filters = read_filters(args.filters)
+    elif args.airlines or args.cities or args.dates:
+        filters = cross_product(args.airlines, args.cities, args.dates)
+    else:
+        sys.exit("Give --filters or at least one of --airlines/--cities/--dates")
+
+    start = time.perf_counter()
+    try:
+        results = compare(filters)
+        write(results, args.out)
+    except Exception as e:
+        print("❌ Error running batch comparison:", e)
+        sys.exit(1)
+    print(f"✅ {len(results)} comparisons written to {args.out} in {time.perf_counter() - start:.1f}s")
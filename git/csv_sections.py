@@ -0,0 +1,79 @@
+"""
+Reader for `Airline_Normalization(3NF).csv`.
+
+The file is a spreadsheet export with the normalized tables laid out as
+blocks: blocks are separated by blank rows, and tables inside one block sit
+side by side, separated by an empty column. Each table is identified by its
+first column (FlightDate, DestAirportSeqID, OriginAirportSeqID, ...).
+"""
+import csv
+
+# first header cell -> table name
+TABLES = {
+    "FlightDate": "flights",
+    "CRSDepTime": "departure",
+    "ArrTime": "arrival",
+    "OriginAirportSeqID": "origin",
+    "DestAirportSeqID": "destination",
+    "DOT_ID_Reporting_Airline": "reporting_airline",
+}
+
+
+def _column_groups(header):
+    """[(start, stop), ...] spans of consecutive non-empty header cells."""
+    groups, start = [], None
+    for i, cell in enumerate(header + [""]):
+        if cell.strip() and start is None:
+            start = i
+        elif not cell.strip() and start is not None:
+            groups.append((start, i))
+            start = None
+    return groups
+
+
+def is_sectioned(header):
+    """
+    Whether a header row is this layout: its columns do not form one run from
+    the first cell (a leading empty column, or tables side by side). A BTS
+    drop's header only ends with an empty cell.
+    """
+    groups = _column_groups(header)
+    return len(groups) > 1 or (len(groups) == 1 and groups[0][0] > 0)
+
+
+def read_sections(csv_path):
+    """Return {table_name: (columns, rows)} for every table in the file."""
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        lines = list(csv.reader(f))
+
+    tables = {}
+    i = 0
+    while i < len(lines):
+        if not any(cell.strip() for cell in lines[i]):
+            i += 1
+            continue
+        header = lines[i]
+        block_end = i + 1
+        while block_end < len(lines) and any(cell.strip() for cell in lines[block_end]):
+            block_end += 1
+
+        for start, stop in _column_groups(header):
+            columns = [c.strip() for c in header[start:stop]]
+            name = TABLES.get(columns[0], columns[0])
+            rows = []
+            for line in lines[i + 1:block_end]:
+                values = (line + [""] * stop)[start:stop]
+                if any(v.strip() for v in values):
+                    rows.append(values)
+            tables[name] = (columns, rows)
+        i = block_end
+    return tables
+
+
+def write_section(tables, name, out_path):
+    """Write one table as a plain CSV (header + rows)."""
+    columns, rows = tables[name]
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(rows)
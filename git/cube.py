@@ -0,0 +1,264 @@
+"""
+In-memory cube behind the Compare window: airline × origin city × date.
+
+    cube = cube.default_cube.get()       # loads once (one scan of ops.Flights)
+    cube.answer("DL", "Atlanta", "2020-03-01")
+    cube.answer()                        # all flights
+    print(cube.describe())
+
+Every cell holds the flight count, the number and sum of non-NULL departure
+delays, and a bitmap of the origin airports seen. Airlines, cities and days
+are dense integer codes, so any filter (each field one value or "all") is a
+slice of the arrays:
+
+    AvgDelay       = Σ DelaySum / Σ DelayCount    (= AVG(DepDelayMinutes))
+    TotalFlights   = Σ Flights                    (= COUNT(*))
+    AirportTraffic = Σ over cities of popcount(OR of the slice's bitmaps)
+                                                  (= COUNT(DISTINCT OriginAirportSeqID))
+
+An airport belongs to one city, so each city only needs bits for its own
+airports; the bitmaps are exact, not estimates.
+
+The dense arrays take airlines × cities × days × (16 + 8·W) bytes, W being
+the 64-bit words per bitmap. If that exceeds CUBE_BUDGET_MB the date axis is
+coarsened to months, then dropped; a cube that still does not fit is refused
+(CubeTooLarge). A cube that cannot answer a filter (a single day on a
+monthly cube) returns None and the caller queries the database instead.
+"""
+import datetime
+import os
+import threading
+import time
+
+import numpy as np
+
+import columnar
+import db
+
+CUBE_BUDGET_MB = float(os.environ.get("AIRLINE_CUBE_BUDGET_MB", 512))
+
+# Finest first; the first grain whose arrays fit the budget is used
+GRAINS = ("day", "month", "all")
+
+CELLS_QUERY = """
+SELECT f.ReportingAirlineID, f.OriginAirportSeqID, f.FlightDate,
+       COUNT(*) AS Flights,
+       COUNT(f.DepDelayMinutes) AS DelayCount,
+       SUM(CAST(f.DepDelayMinutes AS DOUBLE PRECISION)) AS DelaySum
+FROM ops.Flights f
+GROUP BY f.ReportingAirlineID, f.OriginAirportSeqID, f.FlightDate
+"""
+
+
+class CubeTooLarge(Exception):
+    pass
+
+
+def _popcount(words):
+    """Set bits in a uint64 array, summed."""
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(np.ascontiguousarray(words).view(np.uint8)).sum())
+
+
+def _codes(keys, key_codes, values, missing):
+    """Map IDs through sorted `keys` -> `key_codes`; NULL (NaN) or unknown IDs -> `missing`."""
+    values = np.asarray(values, dtype=np.float64)
+    ids = np.where(np.isnan(values), -1, values).astype(np.int64)
+    codes = np.full(len(ids), missing, dtype=np.int64)
+    if len(keys):
+        pos = np.minimum(np.searchsorted(keys, ids), len(keys) - 1)
+        hit = keys[pos] == ids
+        codes[hit] = key_codes[pos[hit]]
+    return codes
+
+
+def _bucket_count(grain, first_day, days):
+    if grain == "day":
+        return max(days, 1)
+    if grain == "month":
+        last = first_day + datetime.timedelta(days=max(days - 1, 0))
+        return (last.year - first_day.year) * 12 + last.month - first_day.month + 1
+    return 1
+
+
+class Cube:
+    def __init__(self, airlines, cities, first_day, days, grain, words):
+        self.airlines = {name: i for i, name in enumerate(airlines)}
+        self.cities = {name: i for i, name in enumerate(cities)}
+        self.first_day = first_day
+        self.grain = grain
+        # One extra airline/city code for flights whose ID has no dimension row:
+        # they count towards "all" but match no named filter
+        shape = (len(airlines) + 1, len(cities) + 1, _bucket_count(grain, first_day, days))
+        self.flights = np.zeros(shape, dtype=np.int32)
+        self.delay_count = np.zeros(shape, dtype=np.int32)
+        self.delay_sum = np.zeros(shape, dtype=np.float64)
+        self.airports = np.zeros(shape + (words,), dtype=np.uint64)
+        self.load_seconds = None
+
+    def _bucket(self, day_offsets):
+        """Date bucket for days counted from first_day (ndarray or int)."""
+        if self.grain == "day":
+            return day_offsets
+        if self.grain == "month":
+            first = np.datetime64(self.first_day, "M")
+            dates = np.datetime64(self.first_day, "D") + day_offsets
+            return (np.asarray(dates).astype("datetime64[M]") - first).astype(np.int64)
+        return np.zeros_like(day_offsets)
+
+    @property
+    def nbytes(self):
+        return self.flights.nbytes + self.delay_count.nbytes + self.delay_sum.nbytes + self.airports.nbytes
+
+    def describe(self):
+        a, c, d, w = self.airports.shape
+        return (f"{a - 1} airlines × {c - 1} cities × {d:,} {self.grain if self.grain != 'all' else 'total'}"
+                f"{'s' if self.grain != 'all' else ''}, {self.nbytes / 2**20:.1f} MB")
+
+    def answer(self, airline=None, city=None, date=None):
+        """calculate_avg_delay's result from the arrays, or None if this cube cannot answer it."""
+        if date is not None:
+            if self.grain != "day":
+                return None
+            try:
+                offset = (db.to_date(date) - self.first_day).days
+            except ValueError:
+                return None
+            if not 0 <= offset < self.flights.shape[2]:
+                return {"AvgDelay": None, "TotalFlights": 0, "AirportTraffic": 0}
+            d = slice(offset, offset + 1)
+        else:
+            d = slice(None)
+        selection = []
+        for value, codes in ((airline, self.airlines), (city, self.cities)):
+            if value is None:
+                selection.append(slice(None))
+            elif value in codes:
+                selection.append(slice(codes[value], codes[value] + 1))
+            else:
+                return {"AvgDelay": None, "TotalFlights": 0, "AirportTraffic": 0}
+        cell = (selection[0], selection[1], d)
+
+        delay_count = int(self.delay_count[cell].sum())
+        return {
+            "AvgDelay": float(self.delay_sum[cell].sum()) / delay_count if delay_count else None,
+            "TotalFlights": int(self.flights[cell].sum()),
+            # OR over airlines and dates, then count per city
+            "AirportTraffic": _popcount(np.bitwise_or.reduce(self.airports[cell], axis=(0, 2))),
+        }
+
+
+def _estimate_bytes(airlines, cities, buckets, words):
+    return (airlines + 1) * (cities + 1) * buckets * (16 + 8 * words)
+
+
+def build(budget_mb=CUBE_BUDGET_MB):
+    start = time.perf_counter()
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT ReportingAirlineID, ReportingAirline FROM meta.ReportingAirline")
+        airline_rows = cursor.fetchall()
+        cursor.execute("SELECT OriginAirportSeqID, OriginCityName FROM ops.Origin")
+        airport_rows = cursor.fetchall()
+        cursor.execute("SELECT MIN(FlightDate), MAX(FlightDate) FROM ops.Flights")
+        first, last = cursor.fetchone()
+
+    airlines = sorted({row[1] for row in airline_rows if row[1] is not None})
+    cities = sorted({row[1] for row in airport_rows if row[1] is not None})
+    airline_code = {name: i for i, name in enumerate(airlines)}
+    city_code = {name: i for i, name in enumerate(cities)}
+
+    # Sorted ID -> code arrays for vectorized lookups
+    airline_rows = sorted((int(r[0]), airline_code.get(r[1], len(airlines))) for r in airline_rows)
+    airline_ids = np.array([r[0] for r in airline_rows], dtype=np.int64)
+    airline_codes = np.array([r[1] for r in airline_rows], dtype=np.int64)
+
+    airport_rows = sorted((int(r[0]), city_code.get(r[1], len(cities))) for r in airport_rows)
+    airport_ids = np.array([r[0] for r in airport_rows], dtype=np.int64)
+    airport_city = np.array([r[1] for r in airport_rows], dtype=np.int64)
+    airport_bit = np.zeros(len(airport_rows), dtype=np.int64)   # position within its city
+    per_city = {}
+    for i, c in enumerate(airport_city):
+        airport_bit[i] = per_city.get(c, 0)
+        per_city[c] = airport_bit[i] + 1
+    words = max(1, -(-max(per_city.values(), default=1) // 64))
+
+    first_day = db.to_date(first) if first is not None else datetime.date.today()
+    days = (db.to_date(last) - first_day).days + 1 if last is not None else 1
+
+    budget = budget_mb * 2**20
+    for grain in GRAINS:
+        estimate = _estimate_bytes(len(airlines), len(cities), _bucket_count(grain, first_day, days), words)
+        if estimate <= budget:
+            break
+    else:
+        raise CubeTooLarge(f"comparison cube needs {estimate / 2**20:,.0f} MB even without dates "
+                           f"(budget {budget_mb:g} MB, AIRLINE_CUBE_BUDGET_MB)")
+    cube = Cube(airlines, cities, first_day, days, grain, words)
+
+    # Airports missing from ops.Origin share the "no city" slot with the ones whose city is
+    # NULL: their bits follow those
+    no_city = len(cities)
+    unknown_bits = {}
+    for batch in columnar.iter_column_batches(CELLS_QUERY, dtypes={
+            "ReportingAirlineID": np.float64, "OriginAirportSeqID": np.float64,
+            "FlightDate": "datetime64[D]", "Flights": np.int64,
+            "DelayCount": np.int64, "DelaySum": np.float64}):
+        a = _codes(airline_ids, airline_codes, batch["ReportingAirlineID"], len(airlines))
+        airport = batch["OriginAirportSeqID"]
+        index = _codes(airport_ids, np.arange(len(airport_ids)), airport, -1)
+        c = np.where(index >= 0, airport_city[np.maximum(index, 0)], no_city)
+        d = cube._bucket((batch["FlightDate"] - np.datetime64(first_day, "D")).astype(np.int64))
+        cell = (a, c, d)
+        np.add.at(cube.flights, cell, batch["Flights"])
+        np.add.at(cube.delay_count, cell, batch["DelayCount"])
+        np.add.at(cube.delay_sum, cell, np.nan_to_num(batch["DelaySum"]))
+
+        bit = np.where(index >= 0, airport_bit[np.maximum(index, 0)], -1)
+        orphan = (index < 0) & ~np.isnan(airport)
+        for i in np.flatnonzero(orphan):
+            bit[i] = unknown_bits.setdefault(int(airport[i]), per_city.get(no_city, 0) + len(unknown_bits))
+        if per_city.get(no_city, 0) + len(unknown_bits) > 64 * cube.airports.shape[3]:
+            raise CubeTooLarge(f"{len(unknown_bits)} origin airports are missing from ops.Origin")
+        has_airport = bit >= 0
+        words_index, shift = bit[has_airport] // 64, (bit[has_airport] % 64).astype(np.uint64)
+        np.bitwise_or.at(cube.airports, (a[has_airport], c[has_airport], d[has_airport], words_index),
+                         np.left_shift(np.uint64(1), shift))
+
+    cube.load_seconds = time.perf_counter() - start
+    return cube
+
+
+class CubeHolder:
+    """The process-wide cube: built on first use, dropped when the data changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cube = None
+
+    def get(self):
+        with self._lock:
+            if self._cube is None:
+                self._cube = build()
+                print(f"✅ Comparison cube: {self._cube.describe()} in {self._cube.load_seconds:.1f}s")
+            return self._cube
+
+    def peek(self):
+        """The cube if it is already built, else None."""
+        return self._cube
+
+    def clear(self):
+        with self._lock:
+            self._cube = None
+
+
+default_cube = CubeHolder()
+
+
+if __name__ == "__main__":
+    cube = build()
+    print(f"{cube.describe()}, built in {cube.load_seconds:.1f}s")
+    start = time.perf_counter()
+    result = cube.answer()
+    print(f"All flights: {result} in {(time.perf_counter() - start) * 1000:.1f} ms")
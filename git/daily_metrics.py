@@ -0,0 +1,81 @@
+"""
+Per-day flight metrics from a single GROUP BY FlightDate scan.
+
+Every chart that plots something per day draws from `query_daily_metrics()`.
+To add a metric, add an aggregate to DAILY_METRICS: it is computed in the
+same scan as the others, no new query needed.
+
+The result is kept in an incremental.DailyView: after a load only the new
+days are re-aggregated.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+import columnar
+import db
+import disk_cache
+import incremental
+
+Metric = namedtuple("Metric", ["sql", "dtype"])
+
+# name -> aggregate over ops.Flights f (one value per FlightDate)
+DAILY_METRICS = {
+    "AvgArrivalDelay": Metric("AVG(CAST(f.ArrDelayMinutes AS DOUBLE PRECISION))", np.float64),
+    "TotalFlights": Metric("COUNT(*)", np.int64),
+    # share of flights that arrived 15+ minutes late (cancelled/diverted have no ArrDel15)
+    "DelayedPct": Metric("100.0 * SUM(CASE WHEN f.ArrDel15 = 1 THEN 1 ELSE 0 END)"
+                         " / NULLIF(COUNT(f.ArrDel15), 0)", np.float64),
+    "Cancellations": Metric("SUM(CASE WHEN f.Cancelled = 1 THEN 1 ELSE 0 END)", np.int64),
+    "Diversions": Metric("SUM(CASE WHEN f.Diverted = 1 THEN 1 ELSE 0 END)", np.int64),
+}
+
+
+class DailyMetrics:
+    """Aligned arrays: `dates` (datetime64[D]) and one array per metric, same length."""
+
+    def __init__(self, dates, values):
+        self.dates = dates
+        self.values = values
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def __len__(self):
+        return len(self.dates)
+
+    def names(self):
+        return list(self.values)
+
+
+def build_query(metrics=DAILY_METRICS, where=None):
+    """The per-day scan, optionally restricted by a WHERE fragment on ops.Flights f."""
+    columns = ",\n    ".join(f"{metric.sql} AS {name}" for name, metric in metrics.items())
+    where = f"WHERE {where}\n" if where else ""
+    return f"""
+SELECT
+    f.FlightDate,
+    {columns}
+FROM ops.Flights f
+{where}GROUP BY f.FlightDate
+ORDER BY f.FlightDate
+"""
+
+
+def fetch_daily_metrics(start=None):
+    """{FlightDate, metric...} columns for every day (from the disk cache when current), or for FlightDate >= start."""
+    dtypes = {name: metric.dtype for name, metric in DAILY_METRICS.items()}
+    dtypes["FlightDate"] = "datetime64[D]"
+    if start is None:
+        return disk_cache.fetch_columns(build_query(), dtypes=dtypes)
+    date_sql, params = db.get_backend().flight_dates_since("f", start)
+    return columnar.fetch_columns(build_query(where=date_sql), params, dtypes=dtypes)
+
+
+daily_view = incremental.register(incremental.DailyView(fetch_daily_metrics))
+
+
+def query_daily_metrics():
+    """All DAILY_METRICS for every FlightDate, from one scan of ops.Flights (then kept current incrementally)."""
+    columns = daily_view.get()
+    return DailyMetrics(columns["FlightDate"], {name: columns[name] for name in DAILY_METRICS})
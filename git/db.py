@@ -0,0 +1,387 @@
+"""
+Shared data-access layer for the flight application.
+
+Every query function borrows a connection from one bounded, thread-safe pool
+instead of opening a fresh ODBC connection (TCP + login handshake) per query.
+
+Connections come from the active backend: SQL Server over ODBC in production,
+or an embedded DuckDB engine over Parquet partitions (see duckdb_backend.py),
+selected with the AIRLINE_BACKEND environment variable.
+"""
+import datetime
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import telemetry
+
+CONNECTION_STRING = (
+    "DRIVER={ODBC Driver 18 for SQL Server};"
+    "SERVER=127.0.0.1,1433;"
+    "DATABASE=Airline_Reporting_Carrier;"
+    "UID=sa;"
+    "PWD=Hunter3322!;"
+    "Encrypt=no;"
+    "TrustServerCertificate=yes;"
+)
+
+POOL_MAX_SIZE = 5            # connections open at once
+POOL_MAX_IDLE = 300          # seconds an unused connection may sit in the pool
+POOL_CHECK_AFTER = 30        # seconds idle before a connection is re-validated
+POOL_ACQUIRE_TIMEOUT = 30    # seconds to wait for a free connection
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the acquire timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of DB-API connections.
+
+    - at most `max_size` connections exist; borrowers block (up to `acquire_timeout`)
+    - connections idle longer than `max_idle` are closed instead of reused
+    - connections idle longer than `check_after` are health-checked before reuse,
+      and replaced by a new connection if the check fails
+    - a connection whose borrower raised is health-checked on return and dropped
+      if it is dead, so the next borrower reconnects
+    """
+
+    def __init__(self, connect, max_size=POOL_MAX_SIZE, max_idle=POOL_MAX_IDLE,
+                 check_after=POOL_CHECK_AFTER, acquire_timeout=POOL_ACQUIRE_TIMEOUT,
+                 health_check="SELECT 1"):
+        self._connect = connect
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.acquire_timeout = acquire_timeout
+        self.health_check = health_check
+
+        self._cond = threading.Condition()
+        self._idle = deque()   # (connection, returned_at), most recent on the right
+        self._active = 0
+        self._borrowed = {}    # thread ident -> connections that thread has borrowed
+        self._closed = False
+
+        self._stats = {
+            "created": 0,
+            "discarded": 0,
+            "health_check_failures": 0,
+            "acquisitions": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+        }
+
+    # --- helpers ---
+    def _is_alive(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.health_check)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._stats["discarded"] += 1
+
+    def _open(self):
+        conn = self._connect()
+        with self._cond:
+            self._stats["created"] += 1
+        return conn
+
+    # --- public API ---
+    def acquire(self):
+        start = time.perf_counter()
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+
+                # Reuse the most recently returned connection (warmest), dropping stale ones
+                now = time.monotonic()
+                while self._idle:
+                    conn, returned_at = self._idle.pop()
+                    idle_for = now - returned_at
+                    if idle_for > self.max_idle:
+                        self._discard(conn)
+                        continue
+                    self._active += 1
+                    break
+                else:
+                    conn = None
+
+                if conn is not None:
+                    break
+
+                if self._active < self.max_size:
+                    self._active += 1   # reserve the slot before connecting outside the lock
+                    idle_for = None
+                    break
+
+                waited = True
+                remaining = self.acquire_timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"No database connection free after {self.acquire_timeout}s")
+                self._cond.wait(remaining)
+
+            wait_time = time.perf_counter() - start
+            self._stats["acquisitions"] += 1
+            if waited:
+                self._stats["waits"] += 1
+            self._stats["wait_time_total"] += wait_time
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait_time)
+
+        try:
+            if conn is not None and idle_for > self.check_after and not self._is_alive(conn):
+                with self._cond:
+                    self._stats["health_check_failures"] += 1
+                    self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._open()
+        except Exception:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._borrowed.setdefault(threading.get_ident(), []).append(conn)
+        return conn
+
+    def _forget(self, conn):
+        for ident, conns in list(self._borrowed.items()):
+            if conn in conns:
+                conns.remove(conn)
+                if not conns:
+                    del self._borrowed[ident]
+                return
+
+    def release(self, conn, suspect=False):
+        """Return a connection. `suspect=True` means the borrower hit an error."""
+        alive = True
+        if suspect:
+            alive = self._is_alive(conn)
+        if alive:
+            try:
+                conn.rollback()   # never hand the next borrower an open transaction
+            except Exception:
+                alive = False
+
+        with self._cond:
+            self._forget(conn)
+            self._active -= 1
+            if not alive:
+                self._stats["health_check_failures"] += 1
+                self._discard(conn)
+            elif self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, suspect=True)
+            raise
+        else:
+            self.release(conn)
+
+    def cancel(self, thread_id):
+        """
+        Stop the statements running on the connections `thread_id` has borrowed.
+        The borrower's execute/fetch raises; its connection is health-checked on return.
+        """
+        with self._cond:
+            conns = list(self._borrowed.get(thread_id, ()))
+        for conn in conns:
+            try:
+                conn.cancel()
+            except Exception as e:
+                print("❌ Error cancelling a running query:", e)
+        return len(conns)
+
+    def metrics(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["active"] = self._active
+            stats["idle"] = len(self._idle)
+            stats["max_size"] = self.max_size
+            acquisitions = stats["acquisitions"]
+            stats["wait_time_avg"] = stats["wait_time_total"] / acquisitions if acquisitions else 0.0
+        return stats
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+
+def to_date(value):
+    """Combobox text / datetime / date -> datetime.date, for typed DATE parameters."""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def to_time(value):
+    """'HH:MM[:SS]' text -> datetime.time, for typed TIME parameters."""
+    if isinstance(value, datetime.time):
+        return value
+    return datetime.time.fromisoformat(str(value).strip())
+
+
+class _CancellableConnection:
+    """
+    pyodbc connection that remembers the cursors opened on it, so another
+    thread can stop a running statement: pyodbc cancels per cursor.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursors = []
+
+    def cursor(self):
+        cursor = self._conn.cursor()
+        self._cursors.append(cursor)
+        return cursor
+
+    def cancel(self):
+        for cursor in list(self._cursors):
+            cursor.cancel()
+
+    def rollback(self):
+        # Called by the pool on every return: the borrower's cursors are done with
+        self._cursors = []
+        self._conn.rollback()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class SqlServerBackend:
+    """The production backend: SQL Server over ODBC."""
+    name = "sqlserver"
+
+    def __init__(self, connection_string=CONNECTION_STRING):
+        import pyodbc
+        self.connection_string = connection_string
+        self.pool = ConnectionPool(lambda: _CancellableConnection(pyodbc.connect(connection_string)))
+
+    def connection(self):
+        return self.pool.connection()
+
+    def flight_date_filter(self, alias, date):
+        """SQL fragment + params restricting `alias`.FlightDate to one day."""
+        return f"{alias}.FlightDate = ?", [to_date(date)]
+
+    def flight_dates_since(self, alias, date):
+        """SQL fragment + params restricting `alias`.FlightDate to `date` and later."""
+        return f"{alias}.FlightDate >= ?", [to_date(date)]
+
+    def flight_date_in(self, alias, dates):
+        """SQL fragment + params restricting `alias`.FlightDate to a set of days."""
+        days = sorted({to_date(d) for d in dates})
+        return f"{alias}.FlightDate IN ({', '.join('?' * len(days))})", days
+
+    def flight_dates_between(self, alias, first, last):
+        """SQL fragment + params restricting `alias`.FlightDate to first..last (inclusive)."""
+        return f"{alias}.FlightDate BETWEEN ? AND ?", [to_date(first), to_date(last)]
+
+    def minute_of_day(self, column):
+        """SQL expression: minutes since midnight of a TIME column."""
+        return f"(DATEPART(HOUR, {column}) * 60 + DATEPART(MINUTE, {column}))"
+
+    def prefix_match(self, column):
+        """SQL fragment: `column` starts with the ? pattern (typeahead.like_prefix), ignoring case."""
+        # The database's default collation (*_CI_AS) already compares case-insensitively
+        return f"{column} LIKE ? ESCAPE '\\'"
+
+    def close(self):
+        self.pool.close()
+
+
+# Which backend the app talks to: "sqlserver" (default) or "duckdb"
+BACKEND = os.environ.get("AIRLINE_BACKEND", "sqlserver")
+PARQUET_DIR = os.environ.get(
+    "AIRLINE_PARQUET_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "parquet"))
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name=None):
+    name = name or BACKEND
+    if name == "sqlserver":
+        return SqlServerBackend()
+    if name == "duckdb":
+        from duckdb_backend import DuckDBBackend
+        return DuckDBBackend(PARQUET_DIR)
+    raise ValueError(f"Unknown backend: {name!r}")
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend()
+        return _backend
+
+
+def set_backend(backend):
+    """Swap the active backend (e.g. a DuckDBBackend over a test dataset)."""
+    global _backend
+    with _backend_lock:
+        old, _backend = _backend, backend
+    if old is not None and old is not backend:
+        old.close()
+
+
+def get_pool():
+    return get_backend().pool
+
+
+def connection():
+    """Borrow a pooled connection: `with db.connection() as conn: ...`"""
+    # Every statement on it is timed and counted (see telemetry.py)
+    return telemetry.instrumented(get_backend().connection)
+
+
+def cancel_running(thread_id):
+    """Interrupt whatever query `thread_id` is running (see ConnectionPool.cancel)."""
+    return get_pool().cancel(thread_id)
+
+
+def data_version():
+    """(flight count, latest FlightDate): changes whenever a load lands."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) AS Flights, MAX(FlightDate) AS LastDate FROM ops.Flights")
+        row = cursor.fetchone()
+    return int(row[0]), str(row[1])
+
+
+def pool_metrics():
+    """Wait time and active/idle counts of the shared pool, for monitoring."""
+    return get_pool().metrics()
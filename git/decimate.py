@@ -0,0 +1,181 @@
+"""
+Downsampling between query results and matplotlib.
+
+Large series are reduced to a point budget before they are drawn:
+  - lines use LTTB (Largest-Triangle-Three-Buckets), which keeps the visual
+    shape (peaks, dips) with a few thousand points
+  - scatters switch to a hexbin density plot when the visible points exceed
+    the budget
+
+Both re-decimate from the full data whenever the x-range changes (zoom/pan
+with the NavigationToolbar2Tk), so detail comes back as the user zooms in.
+"""
+import os
+
+import matplotlib.dates as mdates
+import numpy as np
+
+# Points drawn per series; override with AIRLINE_PLOT_POINTS
+POINT_BUDGET = int(os.environ.get("AIRLINE_PLOT_POINTS", "2000"))
+HEXBIN_GRIDSIZE = 60
+
+
+def to_plot_x(x):
+    """Dates / datetime64 -> matplotlib float dates; numbers pass through."""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.number):
+        return x.astype(np.float64)
+    return mdates.date2num(x.astype("datetime64[ns]") if np.issubdtype(x.dtype, np.datetime64)
+                           else x)
+
+
+def lttb(x, y, n_out):
+    """Indices of the `n_out` points LTTB keeps from (x, y); x must be sorted."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket edges for the n - 2 interior points, first and last are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax(x, y, n_out):
+    """Indices keeping the min and max of each of n_out/2 buckets (cheaper than LTTB)."""
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    buckets = max(1, n_out // 2)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    idx = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi > lo:
+            segment = y[lo:hi]
+            idx.extend(sorted({lo + int(np.argmin(segment)), lo + int(np.argmax(segment))}))
+    return np.asarray(idx, dtype=np.int64)
+
+
+def _visible(x, xlim, margin=1):
+    """Slice of sorted x inside xlim, padded by `margin` points so lines reach the edges."""
+    lo = max(int(np.searchsorted(x, xlim[0], side="left")) - margin, 0)
+    hi = min(int(np.searchsorted(x, xlim[1], side="right")) + margin, len(x))
+    return slice(lo, hi)
+
+
+class DecimatedLine:
+    """ax.plot() of a large series that redraws at most `budget` points for the visible range."""
+
+    def __init__(self, ax, x, y, budget=None, method=lttb, **plot_kwargs):
+        self.ax = ax
+        self.budget = budget or POINT_BUDGET
+        self.method = method
+        self._load(x, y)
+
+        idx = self.method(self.x, self.y, self.budget)
+        (self.line,) = ax.plot(self.x[idx], self.y[idx], **plot_kwargs)
+        if not np.issubdtype(np.asarray(x).dtype, np.number):
+            ax.xaxis_date()
+        ax.callbacks.connect("xlim_changed", lambda changed_ax: self.update())
+
+    def _load(self, x, y):
+        self.x = to_plot_x(x)
+        self.y = np.asarray(y, dtype=np.float64)
+        order = np.argsort(self.x, kind="stable")
+        self.x, self.y = self.x[order], self.y[order]
+        # LTTB cannot handle gaps (NaN from empty days); drop them once up front
+        ok = ~np.isnan(self.y)
+        self.x, self.y = self.x[ok], self.y[ok]
+
+    def _decimate(self):
+        window = _visible(self.x, self.ax.get_xlim())
+        x, y = self.x[window], self.y[window]
+        idx = self.method(x, y, self.budget)
+        self.line.set_data(x[idx], y[idx])
+
+    def set_data(self, x, y):
+        """Replace the series in place (same line artist); the caller redraws."""
+        self._load(x, y)
+        self._decimate()
+
+    def update(self):
+        self._decimate()
+        self.ax.figure.canvas.draw_idle()
+
+
+class DensityScatter:
+    """Scatter that becomes a hexbin density plot when more than `budget` points are visible."""
+
+    def __init__(self, ax, x, y, budget=None, gridsize=HEXBIN_GRIDSIZE, **scatter_kwargs):
+        self.ax = ax
+        self._load(x, y)
+        self.budget = budget or POINT_BUDGET
+        self.gridsize = gridsize
+        self.scatter_kwargs = scatter_kwargs
+        self.artist = None
+        self._hexbin = False
+        self._drawing = False
+
+        if not np.issubdtype(np.asarray(x).dtype, np.number):
+            ax.xaxis_date()
+        self._draw(slice(None))
+        ax.callbacks.connect("xlim_changed", lambda changed_ax: self.update())
+
+    def _load(self, x, y):
+        self.x = to_plot_x(x)
+        self.y = np.asarray(y, dtype=np.float64)
+        order = np.argsort(self.x, kind="stable")
+        self.x, self.y = self.x[order], self.y[order]
+
+    def _draw(self, window):
+        x, y = self.x[window], self.y[window]
+        if len(x) <= self.budget and self.artist is not None and not self._hexbin:
+            # Scatter stays a scatter: move its points, keep the artist
+            self.artist.set_offsets(np.column_stack([x, y]))
+            return
+        if self.artist is not None:
+            self.artist.remove()
+        self._hexbin = len(x) > self.budget
+        if not self._hexbin:
+            self.artist = self.ax.scatter(x, y, **self.scatter_kwargs)
+        else:
+            # Keep the view where it is: hexbin would otherwise autoscale the axes
+            xlim, ylim = self.ax.get_xlim(), self.ax.get_ylim()
+            label = self.scatter_kwargs.get("label")
+            self.artist = self.ax.hexbin(x, y, gridsize=self.gridsize, bins="log",
+                                         cmap="Blues", mincnt=1, label=label)
+            if self.ax.has_data() and window != slice(None):
+                self.ax.set_xlim(xlim, emit=False)
+                self.ax.set_ylim(ylim, emit=False)
+
+    def set_data(self, x, y):
+        """Replace the points in place (the scatter artist is kept unless hexbin is needed); the caller redraws."""
+        self._load(x, y)
+        self._drawing = True
+        try:
+            self._draw(_visible(self.x, self.ax.get_xlim(), margin=0))
+        finally:
+            self._drawing = False
+
+    def update(self):
+        if self._drawing:
+            return
+        self._drawing = True
+        try:
+            self._draw(_visible(self.x, self.ax.get_xlim(), margin=0))
+            self.ax.figure.canvas.draw_idle()
+        finally:
+            self._drawing = False
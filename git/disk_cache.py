@@ -0,0 +1,191 @@
+"""
+On-disk cache of full-history query results, shared by app instances and restarts.
+
+    columns = disk_cache.fetch_columns(sql, params, dtypes={...})   # same call as columnar.fetch_columns
+
+A result is stored as one uncompressed .npz file (one array per column) named
+after a hash of
+
+    the normalized SQL text, the parameters, the database it came from and
+    the data version (incremental watermark: latest FlightDate + LoadID)
+
+so a restart reads charts and lists from disk until a load changes the data
+version; entries of older versions are then never hit again and are evicted
+first.
+
+Files are written to a temporary name and renamed into place, so instances
+sharing the directory never see a partial file; a file that fails to load is
+treated as a miss and removed. Once the directory exceeds
+AIRLINE_DISK_CACHE_MB, files of other data versions and then the least
+recently used ones are deleted. Results with columns NumPy cannot store
+without pickling (e.g. text with NULLs) are not cached.
+
+With the in-memory cache disabled (benchmarks, plan capture) every call
+reads the database.
+"""
+import argparse
+import hashlib
+import os
+import re
+import uuid
+import zipfile
+
+import numpy as np
+
+import cache
+import columnar
+import db
+import incremental
+
+CACHE_DIR = os.environ.get(
+    "AIRLINE_DISK_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "result_cache"))
+MAX_BYTES = float(os.environ.get("AIRLINE_DISK_CACHE_MB", 256)) * 2**20
+
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+
+def _digest(*parts):
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def normalize_sql(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _source():
+    backend = db.get_backend()
+    return (backend.name, getattr(backend, "root", None) or getattr(backend, "connection_string", None))
+
+
+def data_version():
+    """Short digest of the database identity and its watermark (re-read at most every WATERMARK_TTL s)."""
+    return _digest(_source(), tuple(incremental.recent_watermark()))[:12]
+
+
+def _path(version, sql, params, dtypes):
+    key = _digest(normalize_sql(sql), [str(p) for p in params],
+                  sorted((name, str(np.dtype(t))) for name, t in (dtypes or {}).items()))
+    return os.path.join(CACHE_DIR, f"{version}_{key[:32]}.npz")
+
+
+def _read(path):
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            columns = {name: z[name] for name in z.files}
+        os.utime(path)   # mark as recently used for eviction
+        return columns
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, zipfile.BadZipFile) as e:
+        print("❌ Discarding unreadable cache file:", os.path.basename(path), e)
+        _stats["errors"] += 1
+        _remove(path)
+        return None
+
+
+def _storable(columns):
+    """The columns as plain NumPy arrays (text as fixed-width str), or None if any needs pickle."""
+    out = {}
+    for name, values in columns.items():
+        if values.dtype.hasobject:
+            if not all(isinstance(v, str) for v in values):
+                return None
+            values = values.astype(str)
+        out[name] = values
+    return out
+
+
+def _write(path, columns):
+    columns = _storable(columns)
+    if columns is None:
+        return False
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            np.savez(f, **columns)
+        os.replace(tmp, path)
+    finally:
+        _remove(tmp)
+    _stats["writes"] += 1
+    return True
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+
+def evict(max_bytes=MAX_BYTES, keep_version=None):
+    """Delete other versions' files, then least recently used ones, until under `max_bytes`."""
+    try:
+        entries = [entry for entry in os.scandir(CACHE_DIR) if entry.name.endswith(".npz")]
+    except FileNotFoundError:
+        return 0
+    files = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:   # removed by another instance
+            continue
+        stale = keep_version is not None and not entry.name.startswith(keep_version + "_")
+        files.append((not stale, stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, _, size, _ in files)
+    removed = 0
+    for _, _, size, path in sorted(files):   # stale first, then oldest use
+        if total <= max_bytes:
+            break
+        if _remove(path):
+            removed += 1
+        total -= size
+    _stats["evictions"] += removed
+    return removed
+
+
+def fetch_columns(sql, params=(), dtypes=None, batch_size=columnar.BATCH_SIZE):
+    """columnar.fetch_columns, answered from disk when this data version already ran it."""
+    if not cache.default_cache.enabled:
+        return columnar.fetch_columns(sql, params, dtypes, batch_size)
+    version = data_version()
+    path = _path(version, sql, params, dtypes)
+    columns = _read(path)
+    if columns is not None:
+        _stats["hits"] += 1
+        return columns
+    _stats["misses"] += 1
+    columns = columnar.fetch_columns(sql, params, dtypes, batch_size)
+    try:
+        if _write(path, columns):
+            evict(keep_version=version)
+    except OSError as e:
+        print("❌ Error writing result cache:", e)
+        _stats["errors"] += 1
+    return columns
+
+
+def stats():
+    """Hit/miss/write counters of this process, and the directory size."""
+    try:
+        size = sum(entry.stat().st_size for entry in os.scandir(CACHE_DIR) if entry.name.endswith(".npz"))
+    except OSError:
+        size = 0
+    return dict(_stats, bytes=size, max_bytes=int(MAX_BYTES))
+
+
+def clear():
+    """Delete every cached file."""
+    return evict(max_bytes=0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clear", action="store_true", help="delete every cached result")
+    args = parser.parse_args()
+    if args.clear:
+        print(f"Removed {clear()} cached results from {CACHE_DIR}")
+    else:
+        s = stats()
+        print(f"{CACHE_DIR}: {s['bytes'] / 2**20:.1f} MB of {s['max_bytes'] / 2**20:.0f} MB")
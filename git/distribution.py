@@ -0,0 +1,318 @@
+"""
+Delay percentiles and histograms for any Compare-window filter.
+
+    summary = distribution.default_store.summary(airline="DL", city="Atlanta")
+    summary["DepDelayMinutes"].quantiles   # {0.5: 0.0, 0.9: 38.0, 0.99: 151.5}
+    summary["DepDelayMinutes"].histogram   # [("0", 0.61), ("1-14", 0.19), ...]
+
+The store holds, for every (period, airline, origin airport) cell, a
+histogram of DepDelayMinutes and of ArrDelayMinutes over fixed buckets:
+
+    one bucket per whole minute below EXACT_LIMIT,
+    then log-spaced buckets [EXACT_LIMIT·γᵏ, EXACT_LIMIT·γᵏ⁺¹), γ = GAMMA,
+    delays of MAX_DELAY minutes or more share the last bucket.
+
+Each cell is one fixed-width row of bucket counts (CELL_BYTES). Histograms
+with the same buckets merge by adding counts, so a filter on airline and
+city (each one value or "all") is answered by summing the matching cells;
+nothing is re-read from ops.Flights. The bucketing is done in the database,
+one GROUPING SETS scan for both delay columns. A single-day filter is
+bucketed from that day's flights alone, in the database.
+
+The period is the finest grain of GRAINS whose cells fit
+DISTRIBUTION_BUDGET_MB (AIRLINE_DISTRIBUTION_BUDGET_MB), so the store's size
+follows airlines × airports × periods, not the number of flights; if even
+one cell per airline and airport does not fit, the store is refused
+(DistributionTooLarge). The cells live in an incremental.DailyView: after a
+load only the periods from the first changed day onwards are bucketed again.
+
+Error bound. Quantiles are nearest-rank (PERCENTILE_DISC), and the rank is
+exact. BTS delays are whole minutes; for those a quantile below EXACT_LIMIT
+is exact, and above it the estimate is the middle of the whole minutes in the
+bucket holding the true value (bucket edges rounded up to whole minutes), so
+it is within (GAMMA - 1) / 2 = 1% of it. A fractional delay is reported to
+the minute below EXACT_LIMIT and within (GAMMA - 1) / 2 + 1 / (2·EXACT_LIMIT)
+= 1.25% above it. A quantile in the open last bucket is its lower bound,
+MAX_DELAY minutes. HISTOGRAM_EDGES lie on whole-minute buckets, so the
+histogram shares are exact.
+"""
+import datetime
+import math
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+import columnar
+import db
+import disk_cache
+import incremental
+
+EXACT_LIMIT = 200         # minutes; delays below this keep their exact value
+GAMMA = 1.02              # log-bucket growth above EXACT_LIMIT
+MAX_DELAY = 10_000        # minutes; longer delays share the last bucket
+BUCKETS = EXACT_LIMIT + math.ceil(math.log(MAX_DELAY / EXACT_LIMIT) / math.log(GAMMA)) + 1
+
+DISTRIBUTION_BUDGET_MB = float(os.environ.get("AIRLINE_DISTRIBUTION_BUDGET_MB", 64))
+
+# Finest first; the first grain whose cells fit the budget is used
+GRAINS = ("month", "year", "all")
+
+QUANTILES = (0.5, 0.9, 0.99)
+# Operational bins, in minutes: [0, 1), [1, 15), ..., [180, ∞)
+HISTOGRAM_EDGES = (0, 1, 15, 30, 60, 120, 180)
+
+DELAY_COLUMNS = ("DepDelayMinutes", "ArrDelayMinutes")
+CELL_BYTES = len(DELAY_COLUMNS) * BUCKETS * np.dtype(np.int32).itemsize
+
+
+def _bucket_sql(column):
+    # LOG's base differs between SQL Server and DuckDB; the ratio does not depend on it
+    return (f"CASE WHEN f.{column} < {EXACT_LIMIT} THEN CAST(FLOOR(f.{column}) AS INT) "
+            f"ELSE {EXACT_LIMIT} + CAST(FLOOR(LOG(f.{column} / {EXACT_LIMIT}.0) / LOG({GAMMA})) AS INT) END")
+
+
+_DEP, _ARR = (_bucket_sql(column) for column in DELAY_COLUMNS)
+
+# Period columns of each grain: (SELECT list, GROUP BY list)
+_PERIOD_SQL = {
+    "month": ("YEAR(f.FlightDate) AS PeriodYear, MONTH(f.FlightDate) AS PeriodMonth, ",
+              "YEAR(f.FlightDate), MONTH(f.FlightDate), "),
+    "year": ("YEAR(f.FlightDate) AS PeriodYear, ", "YEAR(f.FlightDate), "),
+    "all": ("", ""),
+}
+
+# The cells of the finest grain; coarser grains' cell counts follow from them
+CELLS_QUERY = """
+SELECT YEAR(f.FlightDate) AS PeriodYear, MONTH(f.FlightDate) AS PeriodMonth,
+       f.ReportingAirlineID, f.OriginAirportSeqID
+FROM ops.Flights f
+GROUP BY YEAR(f.FlightDate), MONTH(f.FlightDate), f.ReportingAirlineID, f.OriginAirportSeqID
+"""
+
+# One row per (period, airline, origin airport, delay column, bucket).
+# IsArrival = GROUPING(dep bucket): 1 on the rows of the arrival grouping set.
+SKETCH_QUERY = f"""
+SELECT
+    {{period_select}}f.ReportingAirlineID, f.OriginAirportSeqID,
+    GROUPING({_DEP}) AS IsArrival,
+    COALESCE({_DEP}, {_ARR}) AS Bucket,
+    COUNT(*) AS Flights
+FROM ops.Flights f
+{{where}}GROUP BY GROUPING SETS (
+    ({{period_group}}f.ReportingAirlineID, f.OriginAirportSeqID, {_DEP}),
+    ({{period_group}}f.ReportingAirlineID, f.OriginAirportSeqID, {_ARR}))
+"""
+
+SKETCH_DTYPES = {"PeriodYear": np.int64, "PeriodMonth": np.int64, "ReportingAirlineID": np.float64,
+                 "OriginAirportSeqID": np.float64, "IsArrival": np.int8, "Bucket": np.float64,
+                 "Flights": np.int64}
+
+Distribution = namedtuple("Distribution", ["flights", "quantiles", "histogram"])
+
+
+class DistributionTooLarge(Exception):
+    pass
+
+
+def bucket_bounds():
+    """(lower, upper) whole-minute bounds of every bucket; a bucket holds lower <= delay < upper."""
+    k = np.arange(BUCKETS - EXACT_LIMIT + 1)
+    log_edges = np.ceil(EXACT_LIMIT * GAMMA ** k)
+    edges = np.concatenate([np.arange(EXACT_LIMIT), log_edges])
+    edges[-1] = np.inf
+    return edges[:-1], edges[1:]
+
+
+def quantiles(histogram, qs=QUANTILES):
+    """Nearest-rank quantiles of a merged bucket histogram (see the module docstring for the error bound)."""
+    total = histogram.sum()
+    if total == 0:
+        return {q: None for q in qs}
+    lower, upper = bucket_bounds()
+    cumulative = np.cumsum(histogram)
+    result = {}
+    for q in qs:
+        b = int(np.searchsorted(cumulative, max(math.ceil(q * total), 1)))
+        if b < EXACT_LIMIT:
+            result[q] = float(lower[b])
+        elif np.isinf(upper[b]):
+            result[q] = float(lower[b])   # open-ended last bucket: report its lower bound
+        else:
+            result[q] = (lower[b] + upper[b] - 1) / 2   # middle of the whole minutes in the bucket
+    return result
+
+
+def binned(histogram, edges=HISTOGRAM_EDGES):
+    """[(label, share of flights)] over `edges` (all below EXACT_LIMIT, so exact)."""
+    total = histogram.sum()
+    bins = []
+    for lo, hi in zip(edges, list(edges[1:]) + [None]):
+        count = histogram[lo:hi].sum()
+        label = (f"{lo}+" if hi is None else str(lo) if hi == lo + 1 else f"{lo}-{hi - 1}")
+        bins.append((label, float(count / total) if total else 0.0))
+    return bins
+
+
+def period_start(day, grain):
+    """First day of the `grain` period holding `day` (datetime.date.min for "all")."""
+    if grain == "month":
+        return datetime.date(day.year, day.month, 1)
+    if grain == "year":
+        return datetime.date(day.year, 1, 1)
+    return datetime.date.min
+
+
+def _periods(years, months, grain):
+    """datetime64[D] first day of each row's period."""
+    if grain == "all":
+        return np.zeros(len(years), dtype="datetime64[D]")
+    months = months - 1 if grain == "month" else np.zeros_like(years)
+    return ((years - 1970) * 12 + months).astype("datetime64[M]").astype("datetime64[D]")
+
+
+def _cell_keys(columns, grain):
+    return np.stack([_periods(columns["PeriodYear"], columns.get("PeriodMonth"), grain).astype(np.int64),
+                     np.nan_to_num(columns["ReportingAirlineID"], nan=-1).astype(np.int64),
+                     np.nan_to_num(columns["OriginAirportSeqID"], nan=-1).astype(np.int64)], axis=1)
+
+
+def choose_grain(budget_mb=DISTRIBUTION_BUDGET_MB):
+    """The finest grain whose cells fit the budget, and its cell count."""
+    cells = disk_cache.fetch_columns(CELLS_QUERY, dtypes={
+        "PeriodYear": np.int64, "PeriodMonth": np.int64,
+        "ReportingAirlineID": np.float64, "OriginAirportSeqID": np.float64})
+    budget = budget_mb * 2**20
+    for grain in GRAINS:
+        count = len(np.unique(_cell_keys(cells, grain), axis=0))
+        if count * CELL_BYTES <= budget:
+            return grain, count
+    raise DistributionTooLarge(f"delay histograms need {count * CELL_BYTES / 2**20:,.0f} MB even without dates "
+                               f"(budget {budget_mb:g} MB, AIRLINE_DISTRIBUTION_BUDGET_MB)")
+
+
+def _sketch_rows(grain, where="", params=(), cached=False):
+    period_select, period_group = _PERIOD_SQL[grain]
+    sql = SKETCH_QUERY.format(period_select=period_select, period_group=period_group, where=where)
+    dtypes = {name: dtype for name, dtype in SKETCH_DTYPES.items()
+              if not name.startswith("Period") or name in period_select}
+    if cached:
+        return disk_cache.fetch_columns(sql, dtypes=dtypes)
+    return columnar.fetch_columns(sql, params, dtypes)
+
+
+def to_cells(rows, grain):
+    """
+    Bucket rows -> {"Period", "ReportingAirlineID", "OriginAirportSeqID": one value per cell,
+    "Counts": int32 [cell, delay column, bucket]}, cells in Period order.
+    """
+    n = len(rows["Bucket"])
+    columns = {"PeriodYear": rows.get("PeriodYear", np.zeros(n, dtype=np.int64)),
+               "PeriodMonth": rows.get("PeriodMonth", np.ones(n, dtype=np.int64)),
+               "ReportingAirlineID": rows["ReportingAirlineID"], "OriginAirportSeqID": rows["OriginAirportSeqID"]}
+    keep = ~np.isnan(rows["Bucket"])   # flights without a delay value
+    keys = _cell_keys({name: values[keep] for name, values in columns.items()}, grain)
+    cells, cell = np.unique(keys, axis=0, return_inverse=True)   # sorted by period first
+    counts = np.zeros((len(cells), len(DELAY_COLUMNS), BUCKETS), dtype=np.int32)
+    np.add.at(counts, (cell.ravel(), rows["IsArrival"][keep].astype(np.intp),
+                       np.clip(rows["Bucket"][keep], 0, BUCKETS - 1).astype(np.intp)),
+              rows["Flights"][keep])
+    return {
+        "Period": cells[:, 0].astype("datetime64[D]"),
+        "ReportingAirlineID": cells[:, 1].astype(np.int32),
+        "OriginAirportSeqID": cells[:, 2],
+        "Counts": counts,
+    }
+
+
+class DistributionStore:
+    def __init__(self, budget_mb=DISTRIBUTION_BUDGET_MB):
+        self.budget_mb = budget_mb
+        self.grain = None   # chosen on each full read
+        self.view = incremental.register(incremental.DailyView(self._fetch_cells, date_column="Period",
+                                                               align=self._align))
+        self._lock = threading.Lock()
+        self._ids = None   # (airline name -> IDs, city name -> airport IDs)
+
+    def _fetch_cells(self, start=None):
+        """Every cell (the grain is chosen again), or the cells of the periods from `start` on."""
+        if start is None:
+            self.grain, _ = choose_grain(self.budget_mb)
+            return to_cells(_sketch_rows(self.grain, cached=True), self.grain)
+        date_sql, params = db.get_backend().flight_dates_since("f", start)
+        return to_cells(_sketch_rows(self.grain, f"WHERE {date_sql}\n", params), self.grain)
+
+    def _align(self, day):
+        return period_start(day, self.grain)
+
+    def _dimension_ids(self):
+        with self._lock:
+            if self._ids is None:
+                airlines, cities = {}, {}
+                with db.connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT ReportingAirlineID, ReportingAirline FROM meta.ReportingAirline")
+                    for airline_id, name in cursor.fetchall():
+                        airlines.setdefault(name, []).append(airline_id)
+                    cursor.execute("SELECT OriginAirportSeqID, OriginCityName FROM ops.Origin")
+                    for airport_id, name in cursor.fetchall():
+                        cities.setdefault(name, []).append(airport_id)
+                self._ids = ({k: np.array(v, dtype=np.int64) for k, v in airlines.items()},
+                             {k: np.array(v, dtype=np.int64) for k, v in cities.items()})
+            return self._ids
+
+    def clear_dimensions(self):
+        with self._lock:
+            self._ids = None
+
+    def load(self):
+        """Load the cells (first call scans ops.Flights); returns their size in bytes."""
+        return self.nbytes(self.view.get())
+
+    @staticmethod
+    def nbytes(columns):
+        return sum(values.nbytes for values in columns.values())
+
+    def histograms(self, airline=None, city=None, date=None):
+        """{delay column: merged bucket counts} for the filter ("" / None = all)."""
+        if date:
+            # Cells span whole periods: bucket that day's flights in the database
+            day = db.to_date(date)
+            date_sql, params = db.get_backend().flight_dates_between("f", day, day)
+            cells = to_cells(_sketch_rows("all", f"WHERE {date_sql}\n", params), "all")
+        else:
+            cells = self.view.get()
+        airline_ids, city_ids = self._dimension_ids()
+        mask = np.ones(len(cells["Counts"]), dtype=bool)
+        if airline:
+            mask &= np.isin(cells["ReportingAirlineID"], airline_ids.get(airline, []))
+        if city:
+            mask &= np.isin(cells["OriginAirportSeqID"], city_ids.get(city, []))
+        merged = cells["Counts"][mask].sum(axis=0, dtype=np.int64)
+        return dict(zip(DELAY_COLUMNS, merged))
+
+    def summary(self, airline=None, city=None, date=None):
+        """{delay column: Distribution(flights, quantiles, histogram)} for the filter."""
+        return {column: Distribution(int(h.sum()), quantiles(h), binned(h))
+                for column, h in self.histograms(airline, city, date).items()}
+
+
+default_store = DistributionStore()
+
+
+@incremental.on_refresh
+def _after_load(change):
+    if change.reloaded:   # new airlines or airports may have been added
+        default_store.clear_dimensions()
+
+
+if __name__ == "__main__":
+    import time
+    start = time.perf_counter()
+    size = default_store.load()
+    print(f"{len(default_store.view.get()['Counts']):,} cells per {default_store.grain}, "
+          f"{size / 2**20:.1f} MB, loaded in {time.perf_counter() - start:.1f}s")
+    for column, dist in default_store.summary().items():
+        print(f"{column}: {dist.flights:,} flights, "
+              + ", ".join(f"p{round(q * 100)} {v:g}" for q, v in dist.quantiles.items()))
@@ -0,0 +1,239 @@
+"""
+Embedded columnar backend: DuckDB over Parquet files.
+
+Flights are stored as Parquet partitioned by year/month of FlightDate
+(<root>/flights/Year=2009/Month=5/*.parquet) and exposed under the same names
+the SQL Server database uses (ops.Flights, ops.Origin, ops.Destination,
+meta.ReportingAirline), so the app's queries run unchanged. Date filters also
+constrain Year/Month so DuckDB only opens the matching partition.
+
+Convert the shipped sample data with:
+
+    python duckdb_backend.py "Airline_Normalization(3NF).csv" parquet
+"""
+import os
+import sys
+import tempfile
+from collections import namedtuple
+
+import duckdb
+
+import csv_sections
+from db import ConnectionPool, to_date
+
+
+class _Cursor:
+    """DB-API cursor whose rows allow attribute access (row.FlightDate), like pyodbc."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._row_type = None
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(sql, list(params))
+        names = [col[0] for col in self._cursor.description or []]
+        self._row_type = namedtuple("Row", names, rename=True) if names else None
+        return self
+
+    def _wrap(self, rows):
+        return [self._row_type(*row) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return None if row is None else self._row_type(*row)
+
+    def fetchmany(self, size=1000):
+        return self._wrap(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._wrap(self._cursor.fetchall())
+
+    def fetch_numpy_batches(self, batch_size):
+        """Columnar fast path for columnar.py: {column: ndarray} per batch, no Row objects."""
+        vectors = max(1, batch_size // 2048)   # DuckDB hands results out in 2048-row vectors
+        while True:
+            chunk = self._cursor.fetch_df_chunk(vectors)
+            if chunk.empty:
+                return
+            yield {name: chunk[name].to_numpy() for name in chunk.columns}
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return _Cursor(self._conn)
+
+    def cancel(self):
+        # Interrupts the statement running on this cursor of the shared database
+        self._conn.interrupt()
+
+    def rollback(self):
+        # The app only reads; there is never a transaction to roll back
+        pass
+
+    def close(self):
+        self._conn.close()
+
+
+class DuckDBBackend:
+    """Runs the app's queries on an embedded DuckDB database over Parquet."""
+    name = "duckdb"
+
+    def __init__(self, root):
+        self.root = root
+        self._db = duckdb.connect(":memory:")
+        self._create_views()
+        # Each pooled connection is a cursor on the same in-memory database
+        self.pool = ConnectionPool(lambda: _Connection(self._db.cursor()))
+
+    def _create_views(self):
+        flights = os.path.join(self.root, "flights", "*", "*", "*.parquet")
+        self._db.execute("CREATE SCHEMA IF NOT EXISTS ops")
+        self._db.execute("CREATE SCHEMA IF NOT EXISTS meta")
+        self._db.execute(
+            f"CREATE OR REPLACE VIEW ops.Flights AS "
+            f"SELECT * FROM read_parquet('{flights}', hive_partitioning = true)")
+        for view, name in [("ops.Origin", "origin"),
+                           ("ops.Destination", "destination"),
+                           ("meta.ReportingAirline", "reporting_airline")]:
+            path = os.path.join(self.root, f"{name}.parquet")
+            self._db.execute(f"CREATE OR REPLACE VIEW {view} AS SELECT * FROM read_parquet('{path}')")
+
+    def connection(self):
+        return self.pool.connection()
+
+    def flight_date_filter(self, alias, date):
+        # Year/Month are the hive partition keys; filtering on them prunes files
+        day = to_date(date)
+        return (f"{alias}.Year = ? AND {alias}.Month = ? AND {alias}.FlightDate = ?",
+                [day.year, day.month, day])
+
+    def flight_dates_since(self, alias, date):
+        day = to_date(date)
+        return f"{alias}.Year >= ? AND {alias}.FlightDate >= ?", [day.year, day]
+
+    def flight_date_in(self, alias, dates):
+        days = sorted({to_date(d) for d in dates})
+        years = sorted({day.year for day in days})
+        return (f"{alias}.Year IN ({', '.join('?' * len(years))}) "
+                f"AND {alias}.FlightDate IN ({', '.join('?' * len(days))})", years + days)
+
+    def flight_dates_between(self, alias, first, last):
+        first, last = to_date(first), to_date(last)
+        return (f"{alias}.Year BETWEEN ? AND ? AND {alias}.FlightDate BETWEEN ? AND ?",
+                [first.year, last.year, first, last])
+
+    def minute_of_day(self, column):
+        return f"(hour({column}) * 60 + minute({column}))"
+
+    def prefix_match(self, column):
+        # LIKE is case-sensitive in DuckDB; the type-ahead index is not
+        return f"{column} ILIKE ? ESCAPE '\\'"
+
+    def close(self):
+        self.pool.close()
+        self._db.close()
+
+
+def _hhmm_to_time(column):
+    """BTS 'hhmm' integers (2400 = midnight) to a TIME expression."""
+    value = f"TRY_CAST({column} AS BIGINT)"
+    return (f"CASE WHEN {value} IS NULL THEN NULL "
+            f"ELSE make_time({value} // 100 % 24, {value} % 100, 0) END")
+
+
+def convert_csv_to_parquet(csv_path, root):
+    """
+    Convert `Airline_Normalization(3NF).csv` into the Parquet layout
+    DuckDBBackend reads. Returns the number of flights written.
+    """
+    os.makedirs(root, exist_ok=True)
+    tables = csv_sections.read_sections(csv_path)
+    con = duckdb.connect(":memory:")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def load(name):
+            path = os.path.join(tmp, f"{name}.csv")
+            csv_sections.write_section(tables, name, path)
+            con.execute(f"CREATE TEMP TABLE src_{name} AS "
+                        f"SELECT * FROM read_csv('{path}', header = true, all_varchar = true)")
+
+        for name in ("flights", "origin", "destination", "reporting_airline"):
+            load(name)
+
+    def num(column, sql_type="INTEGER"):
+        return f"TRY_CAST({column} AS {sql_type}) AS {column}"
+
+    con.execute(f"""
+        CREATE TEMP TABLE flights AS
+        SELECT
+            CAST(strptime(FlightDate, '%m/%d/%Y') AS DATE) AS FlightDate,
+            Tail_Number AS TailNumber,
+            {_hhmm_to_time('CRSDepTime')} AS CRSDepTime,
+            TRY_CAST(Flight_Number_Reporting_Airline AS INTEGER) AS FlightNumberReportingAirline,
+            IATA_CODE_Reporting_Airline AS IATACodeReportingAirline,
+            {_hhmm_to_time('DepTime')} AS DepTime,
+            {num('DepDelay')}, {num('DepDelayMinutes')}, {num('DepDel15')},
+            {num('DepartureDelayGroups')}, {num('TaxiOut')},
+            {_hhmm_to_time('WheelsOff')} AS WheelsOff,
+            {_hhmm_to_time('WheelsOn')} AS WheelsOn,
+            {num('TaxiIn')},
+            {_hhmm_to_time('CRSArrTime')} AS CRSArrTime,
+            {num('ArrDelay')}, {num('ArrDelayMinutes')}, {num('ArrDel15')},
+            {num('ArrivalDelayGroups')},
+            {num('Cancelled', 'TINYINT')}, {num('Diverted', 'TINYINT')},
+            {num('CRSElapsedTime')}, {num('ActualElapsedTime')}, {num('AirTime')},
+            {num('Distance')}, {num('DistanceGroup')},
+            {num('OriginAirportSeqID')}, {num('DestAirportSeqID')},
+            TRY_CAST(DOT_ID_Reporting_Airline AS INTEGER) AS ReportingAirlineID,
+            {_hhmm_to_time('ArrTime')} AS ArrTime
+        FROM src_flights
+    """)
+
+    flights_dir = os.path.join(root, "flights")
+    con.execute(f"""
+        COPY (SELECT *, year(FlightDate) AS Year, month(FlightDate) AS Month FROM flights)
+        TO '{flights_dir}' (FORMAT PARQUET, PARTITION_BY (Year, Month), OVERWRITE_OR_IGNORE)
+    """)
+    con.execute(f"""
+        COPY (SELECT DISTINCT
+                  TRY_CAST(DOT_ID_Reporting_Airline AS INTEGER) AS ReportingAirlineID,
+                  Reporting_Airline AS ReportingAirline
+              FROM src_reporting_airline ORDER BY ReportingAirline)
+        TO '{os.path.join(root, "reporting_airline.parquet")}' (FORMAT PARQUET)
+    """)
+    for prefix, table in [("Origin", "origin"), ("Dest", "destination")]:
+        con.execute(f"""
+            COPY (SELECT DISTINCT
+                      {num(prefix + 'AirportSeqID')},
+                      {num(prefix + 'AirportID')},
+                      {num(prefix + 'CityMarketID')},
+                      {prefix},
+                      {prefix}CityName,
+                      {prefix}State,
+                      {num(prefix + 'StateFips')},
+                      {prefix}StateName,
+                      {num(prefix + 'Wac')}
+                  FROM src_{table})
+            TO '{os.path.join(root, f"{table}.parquet")}' (FORMAT PARQUET)
+        """)
+    rows = con.execute("SELECT COUNT(*) FROM flights").fetchone()[0]
+    con.close()
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python duckdb_backend.py <flights.csv> <parquet_dir>")
+        sys.exit(1)
+    count = convert_csv_to_parquet(sys.argv[1], sys.argv[2])
+    print(f"✅ Wrote {count} flights to {sys.argv[2]}")
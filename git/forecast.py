@@ -0,0 +1,287 @@
+"""
+Seasonal arrival-delay forecasts for every airline and origin city at once.
+
+Each series (all flights, each airline, each origin city) gets a weighted
+least-squares model of its daily mean ArrDelayMinutes on
+
+    intercept + trend + day-of-week + month-of-year + holiday + near-holiday
+
+fitted on the last TRAIN_YEARS of data, weighted by the day's flight count
+(so it matches fitting every flight). All series share the same calendar, so
+the design matrix is built once and every model is solved together:
+
+    A[s] = Xᵀ diag(w[s]) X        one (S × p²) matrix product
+    b[s] = Xᵀ (w[s] · y[s])       one (S × p) matrix product
+    β[s] = solve(A[s] + λI, b[s]) one batched solve
+
+The training data is one GROUPING SETS scan returning per-day counts and sums
+for all three levels. Models and the next FORECAST_DAYS of predictions are
+written to FORECAST_DIR, tagged with the data version they were fitted on;
+the forecast service serves the table and only retrains when the data changes.
+
+    python forecast.py            # retrain if the data changed, print a summary
+    python forecast.py --force    # retrain regardless
+"""
+import argparse
+import csv
+import datetime
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import columnar
+import db
+
+FORECAST_DIR = os.environ.get(
+    "AIRLINE_FORECAST_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "forecasts"))
+MODELS_FILE = "models.npz"
+TABLE_FILE = "forecast_table.csv"
+
+TRAIN_YEARS = 3
+FORECAST_DAYS = 30
+MIN_FLIGHTS = 100    # series with fewer flights in the training window get no model
+RIDGE = 1.0          # in flights: keeps seasons a series never flew in solvable
+NEAR_HOLIDAY_DAYS = 3
+
+ALL_FLIGHTS = "All flights"
+
+TRAINING_QUERY = """
+SELECT
+    CASE WHEN GROUPING(ra.ReportingAirline) = 0 THEN 'airline'
+         WHEN GROUPING(o.OriginCityName) = 0 THEN 'origin'
+         ELSE 'all' END AS Level,
+    COALESCE(ra.ReportingAirline, o.OriginCityName, '') AS Series,
+    f.FlightDate,
+    COUNT(f.ArrDelayMinutes) AS Flights,
+    SUM(CAST(f.ArrDelayMinutes AS DOUBLE PRECISION)) AS SumDelay
+FROM ops.Flights f
+JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID
+LEFT JOIN ops.Origin o ON f.OriginAirportSeqID = o.OriginAirportSeqID
+WHERE f.FlightDate >= ?
+  AND f.ArrDelayMinutes IS NOT NULL
+GROUP BY GROUPING SETS ((f.FlightDate), (f.FlightDate, ra.ReportingAirline), (f.FlightDate, o.OriginCityName))
+"""
+
+# One row per series. `coef` is (S, p); `rmse` is the weighted residual RMS in minutes.
+Models = namedtuple("Models", ["levels", "series", "coef", "rmse", "features",
+                               "version", "train_start", "train_end"])
+
+
+# --- calendar features ---
+def _nth_weekday(year, month, weekday, n):
+    """n-th (1-based; -1 = last) `weekday` (Mon=0) of the month."""
+    if n > 0:
+        first = datetime.date(year, month, 1)
+        return first + datetime.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    after = datetime.date(year + month // 12, month % 12 + 1, 1)
+    last = after - datetime.timedelta(days=1)
+    return last - datetime.timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def holidays(years):
+    """US federal holidays that move air travel, as datetime64[D]."""
+    days = []
+    for year in years:
+        days += [
+            datetime.date(year, 1, 1),
+            _nth_weekday(year, 5, 0, -1),   # Memorial Day
+            datetime.date(year, 7, 4),
+            _nth_weekday(year, 9, 0, 1),    # Labor Day
+            _nth_weekday(year, 11, 3, 4),   # Thanksgiving
+            datetime.date(year, 12, 25),
+        ]
+    return np.array(sorted(days), dtype="datetime64[D]")
+
+
+def design_matrix(dates, origin):
+    """(len(dates), p) features and their names. `origin` anchors the trend (years)."""
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    day_numbers = dates.astype(np.int64)
+    weekday = (day_numbers + 3) % 7                       # 1970-01-01 was a Thursday; Mon=0
+    month = dates.astype("datetime64[M]").astype(np.int64) % 12
+    years = range(int(str(dates.min())[:4]) - 1, int(str(dates.max())[:4]) + 2) if len(dates) else []
+    hol = holidays(years).astype(np.int64)
+    if len(hol):
+        idx = np.clip(np.searchsorted(hol, day_numbers), 1, len(hol) - 1)
+        distance = np.minimum(np.abs(day_numbers - hol[idx - 1]), np.abs(day_numbers - hol[idx]))
+    else:
+        distance = np.full(len(dates), np.iinfo(np.int64).max)
+
+    columns = [np.ones(len(dates)),
+               (day_numbers - np.datetime64(origin, "D").astype(np.int64)) / 365.25]
+    names = ["intercept", "trend"]
+    for d in range(1, 7):
+        columns.append((weekday == d).astype(float))
+        names.append(f"dow_{d}")
+    for m in range(1, 12):
+        columns.append((month == m).astype(float))
+        names.append(f"month_{m + 1}")
+    columns.append((distance == 0).astype(float))
+    columns.append(((distance > 0) & (distance <= NEAR_HOLIDAY_DAYS)).astype(float))
+    names += ["holiday", "near_holiday"]
+    return np.column_stack(columns), names
+
+
+# --- training ---
+def fetch_training_data(start):
+    return columnar.fetch_columns(TRAINING_QUERY, (db.to_date(start),), dtypes={
+        "FlightDate": "datetime64[D]",
+        "Flights": np.float64,
+        "SumDelay": np.float64,
+    })
+
+
+def fit(levels, series, dates, flights, sums, start, end):
+    """
+    Fit every series from long-format per-day rows. Returns (levels, series,
+    coef, rmse, feature names) for the series with at least MIN_FLIGHTS flights.
+    """
+    grid = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    keys = np.char.add(np.char.add(levels.astype(str), "\x1f"), series.astype(str))
+    unique, series_index = np.unique(keys, return_inverse=True)
+    day_index = (dates - grid[0]).astype(np.int64)
+    inside = (day_index >= 0) & (day_index < len(grid))
+
+    W = np.zeros((len(unique), len(grid)))     # flights per series per day
+    S = np.zeros_like(W)                        # sum of delays per series per day
+    np.add.at(W, (series_index[inside], day_index[inside]), flights[inside])
+    np.add.at(S, (series_index[inside], day_index[inside]), sums[inside])
+
+    keep = W.sum(axis=1) >= MIN_FLIGHTS
+    unique, W, S = unique[keep], W[keep], S[keep]
+
+    X, names = design_matrix(grid, grid[0])
+    p = X.shape[1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        Y = np.where(W > 0, S / W, 0.0)
+
+    A = (W @ (X[:, :, None] * X[:, None, :]).reshape(len(grid), p * p)).reshape(-1, p, p)
+    ridge = RIDGE * np.eye(p)
+    ridge[0, 0] = 0.0                           # never shrink the intercept
+    b = S @ X                                   # Σ w·y·x, since S = w·y
+    coef = np.linalg.solve(A + ridge, b[:, :, None])[:, :, 0]
+
+    residual = Y - coef @ X.T
+    rmse = np.sqrt((W * residual ** 2).sum(axis=1) / W.sum(axis=1))
+
+    if not len(unique):   # no series has MIN_FLIGHTS flights
+        return np.array([], dtype=str), np.array([], dtype=str), coef, rmse, names
+    split = np.char.partition(unique.astype(str), "\x1f")
+    return split[:, 0], split[:, 2], coef, rmse, names
+
+
+def predict(models, horizon=FORECAST_DAYS):
+    """(dates, (S, horizon) predicted mean arrival delay) for the days after train_end."""
+    if not len(models.series):
+        return np.array([], dtype="datetime64[D]"), np.zeros((0, 0))
+    end = np.datetime64(models.train_end, "D")
+    dates = np.arange(end + 1, end + 1 + horizon)
+    X, _ = design_matrix(dates, np.datetime64(models.train_start, "D"))
+    return dates, np.maximum(models.coef @ X.T, 0.0)
+
+
+def empty_models(version):
+    """Models with no series, for a Flights table that has no rows yet."""
+    _, names = design_matrix(np.array([], dtype="datetime64[D]"), np.datetime64("1970-01-01", "D"))
+    return Models(np.array([], dtype=str), np.array([], dtype=str), np.zeros((0, len(names))),
+                  np.zeros(0), names, version, "", "")
+
+
+def train(version=None):
+    """Fit every series on the last TRAIN_YEARS of data, save models and forecast table."""
+    version = version or db.data_version()
+    if version[0] == 0:
+        # MAX(FlightDate) of an empty table is NULL: there is no training window
+        models = empty_models(version)
+        save(models)
+        print("No flights loaded yet: saved an empty forecast (no delay models)")
+        return models
+    end = np.datetime64(version[1][:10], "D")
+    start = (end.astype("datetime64[M]") - 12 * TRAIN_YEARS + 1).astype("datetime64[D]")
+
+    begin = time.perf_counter()
+    data = fetch_training_data(str(start))
+    levels, series, coef, rmse, names = fit(data["Level"], data["Series"], data["FlightDate"],
+                                            data["Flights"], data["SumDelay"], start, end)
+    series = np.where(levels == "all", ALL_FLIGHTS, series)
+    models = Models(levels, series, coef, rmse, names, version, str(start), str(end))
+    save(models)
+    print(f"✅ Trained {len(series)} delay models ({start} to {end}) in {time.perf_counter() - begin:.1f}s")
+    return models
+
+
+# --- persistence ---
+def _atomic_path(path):
+    return f"{path}.tmp{os.getpid()}"
+
+
+def save(models, directory=FORECAST_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, MODELS_FILE)
+    tmp = _atomic_path(path) + ".npz"
+    np.savez(tmp, levels=models.levels, series=models.series, coef=models.coef, rmse=models.rmse,
+             features=np.array(models.features), version=np.array([str(v) for v in models.version]),
+             train_range=np.array([models.train_start, models.train_end]))
+    os.replace(tmp, path)
+
+    dates, values = predict(models)
+    path = os.path.join(directory, TABLE_FILE)
+    tmp = _atomic_path(path)
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Level", "Series", "ForecastDate", "PredictedArrDelay", "RMSE"])
+        for i in range(len(models.series)):
+            for day, value in zip(dates, values[i]):
+                writer.writerow([models.levels[i], models.series[i], str(day),
+                                 f"{value:.2f}", f"{models.rmse[i]:.2f}"])
+    os.replace(tmp, path)
+
+
+def load(directory=FORECAST_DIR):
+    """The saved Models, or None if nothing has been trained yet."""
+    path = os.path.join(directory, MODELS_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as z:
+        count, last_date = z["version"]
+        return Models(z["levels"], z["series"], z["coef"], z["rmse"], list(z["features"]),
+                      (int(count), str(last_date)), str(z["train_range"][0]), str(z["train_range"][1]))
+
+
+def load_table(directory=FORECAST_DIR):
+    """{(level, series): (dates, predicted delays, rmse)} from the precomputed table."""
+    table = {}
+    with open(os.path.join(directory, TABLE_FILE), newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            dates, values, _ = table.setdefault((row["Level"], row["Series"]), ([], [], float(row["RMSE"])))
+            dates.append(row["ForecastDate"])
+            values.append(float(row["PredictedArrDelay"]))
+    return table
+
+
+def ensure_current(version=None):
+    """Saved models if they were fitted on the current data, else freshly trained ones."""
+    version = version or db.data_version()
+    models = load()
+    if models is not None and models.version == version \
+            and os.path.exists(os.path.join(FORECAST_DIR, TABLE_FILE)):
+        return models
+    return train(version)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="retrain even if the data has not changed")
+    args = parser.parse_args()
+    models = train() if args.force else ensure_current()
+    if not len(models.series):
+        raise SystemExit(0)
+    dates, values = predict(models)
+    overall = np.flatnonzero(models.levels == "all")
+    print(f"{len(models.series)} models, fitted on {models.train_start} to {models.train_end}")
+    if len(overall):
+        i = overall[0]
+        print(f"{ALL_FLIGHTS}: next {len(dates)} days {values[i].min():.1f}-{values[i].max():.1f} min "
+              f"(RMSE {models.rmse[i]:.1f})")
@@ -0,0 +1,276 @@
+"""
+Local HTTP service behind the Forecast Delays window.
+
+    python forecast_service.py --port 5000
+
+    GET /api/months                  -> ["Jan 2002", ..., "Mar 2020"]
+    GET /api/delays?month=Mar%202020 -> {"days": [1, 2, ...], "delays": [12.3, ...]}
+    GET /api/forecast/series         -> ["All flights", "Airline: DL", "City: Atlanta", ...]
+    GET /api/forecast?series=Airline%3A%20DL
+                                     -> {"dates": [...], "delays": [...], "rmse": 4.2, "through": "2020-03-31"}
+
+Requests never touch ops.Flights. The service keeps a month × day aggregate
+(average arrival delay per day, from the single daily-metrics scan) with every
+response body already serialized. When the data changed since the watermark
+the aggregate was built at, only the months from the first changed day onwards
+are rebuilt. Forecasts come from the table forecast.py precomputes; models are
+only refitted when the data changed.
+Responses carry an ETag and Cache-Control, and If-None-Match is answered
+with 304.
+
+Built on asyncio streams (HTTP/1.1 with keep-alive); the aggregate is rebuilt
+on a worker thread so requests keep being served from the previous version.
+"""
+import argparse
+import asyncio
+import calendar
+import hashlib
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import daily_metrics
+import db
+import forecast
+import incremental
+
+DEFAULT_PORT = 5000
+REFRESH_CHECK_SECONDS = 60   # how often the watermark is polled for new data
+MAX_AGE = 60                 # Cache-Control max-age sent to clients
+KEEP_ALIVE_SECONDS = 30      # idle time before a client connection is closed
+
+SERIES_PREFIXES = {"all": "", "airline": "Airline: ", "origin": "City: "}
+
+
+def month_label(year, month):
+    return f"{calendar.month_abbr[month]} {year}"
+
+
+class _Body:
+    """A serialized JSON response and its ETag."""
+
+    def __init__(self, payload):
+        self.data = json.dumps(payload, separators=(",", ":")).encode()
+        self.etag = '"' + hashlib.sha1(self.data).hexdigest()[:20] + '"'
+
+
+class MonthDayAggregate:
+    """
+    Average arrival delay per day, grouped by month, ready to serve.
+    With `previous` and `since`, months before `since` are reused as they are
+    and only the later ones are rebuilt.
+    """
+
+    def __init__(self, metrics, previous=None, since=None):
+        dates = metrics.dates
+        delays = metrics["AvgArrivalDelay"]
+        self.delays = {}
+        self.month_starts = {}
+        if previous is not None and since is not None:
+            first = np.datetime64(since, "M")
+            for label, body in previous.delays.items():
+                if previous.month_starts[label] < first:
+                    self.delays[label] = body
+                    self.month_starts[label] = previous.month_starts[label]
+            keep = dates >= first.astype("datetime64[D]")
+            dates, delays = dates[keep], delays[keep]
+        if len(dates):
+            months = dates.astype("datetime64[M]")
+            days = (dates - months).astype(np.int64) + 1
+            # Split at month boundaries: dates are sorted, so each month is one run
+            starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+            for lo, hi in zip(starts, np.r_[starts[1:], len(dates)]):
+                year, month = (int(part) for part in str(months[lo]).split("-"))
+                label = month_label(year, month)
+                self.month_starts[label] = months[lo]
+                self.delays[label] = _Body({
+                    "days": days[lo:hi].tolist(),
+                    "delays": [None if np.isnan(v) else round(float(v), 2) for v in delays[lo:hi]],
+                })
+        # Most recent month first, the order the combobox shows them
+        self.months = _Body(list(reversed(self.delays)))
+
+
+class ForecastTable:
+    """Next-days predictions per series from forecast.py's table, ready to serve."""
+
+    def __init__(self, version, through, table):
+        self.version = version
+        self.forecasts = {}
+        for level in SERIES_PREFIXES:   # all flights, then airlines, then cities
+            for (row_level, series), (dates, delays, rmse) in sorted(table.items()):
+                if row_level == level:
+                    self.forecasts[SERIES_PREFIXES[level] + series] = _Body(
+                        {"dates": dates, "delays": delays, "rmse": rmse, "through": through})
+        self.series = _Body(list(self.forecasts))
+
+
+class ForecastService:
+    def __init__(self, refresh_check=REFRESH_CHECK_SECONDS):
+        self.refresh_check = refresh_check
+        self.aggregate = None
+        self.forecasts = None
+        self._watermark = None   # the data the aggregate was built from
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """Update the aggregate if the data changed. Returns True if it was updated."""
+        with self._refresh_lock:
+            # Compared against this aggregate's own watermark, and only the daily-metrics
+            # view is brought up to date: incremental.refresh() would also fire the app's
+            # on_refresh callbacks (its caches and indexes) from the service's poll
+            watermark = incremental.current_watermark()
+            change = (incremental.changed_since(self._watermark, watermark)
+                      if self._watermark is not None else None)
+            if not force and self.aggregate is not None and change is None:
+                return False
+            start = time.perf_counter()
+            since = change.start if change is not None and not force else None
+            daily_metrics.daily_view.refresh(watermark)
+            self.aggregate = MonthDayAggregate(daily_metrics.query_daily_metrics(),
+                                               previous=self.aggregate, since=since)
+            self._watermark = watermark
+            print(f"✅ Forecast aggregate {'updated from ' + str(since) if since else 'rebuilt'}: "
+                  f"{len(self.aggregate.delays)} months in {time.perf_counter() - start:.1f}s")
+            try:
+                version = db.data_version()
+                models = forecast.ensure_current(version)
+                self.forecasts = ForecastTable(version, models.train_end, forecast.load_table())
+            except Exception as e:
+                print("❌ Error loading delay forecasts:", e)
+            return True
+
+    async def _refresh_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.refresh_check)
+            try:
+                await loop.run_in_executor(None, self.refresh)
+            except Exception as e:
+                print("❌ Error refreshing forecast aggregate:", e)
+
+    # --- HTTP ---
+    def route(self, method, target, headers):
+        """(status, body or None, extra headers) for one request."""
+        if method != "GET":
+            return 405, _Body({"error": "method not allowed"}), {"Allow": "GET"}
+        aggregate = self.aggregate
+        if aggregate is None:
+            return 503, _Body({"error": "aggregate is still loading"}), {"Retry-After": "5"}
+
+        url = urlsplit(target)
+        if url.path == "/api/months":
+            body = aggregate.months
+        elif url.path.startswith("/api/forecast"):
+            if self.forecasts is None:
+                return 503, _Body({"error": "forecasts are not available"}), {"Retry-After": "30"}
+            if url.path == "/api/forecast/series":
+                body = self.forecasts.series
+            elif url.path == "/api/forecast":
+                series = parse_qs(url.query).get("series", [forecast.ALL_FLIGHTS])[0]
+                body = self.forecasts.forecasts.get(series)
+                if body is None:
+                    return 404, _Body({"error": f"no forecast for {series!r}"}), {}
+            else:
+                return 404, _Body({"error": "not found"}), {}
+        elif url.path == "/api/delays":
+            month = parse_qs(url.query).get("month", [""])[0]
+            body = aggregate.delays.get(month)
+            if body is None:
+                return 404, _Body({"error": f"no data for month {month!r}"}), {}
+        else:
+            return 404, _Body({"error": "not found"}), {}
+
+        cache_headers = {"ETag": body.etag, "Cache-Control": f"public, max-age={MAX_AGE}"}
+        if headers.get("if-none-match") == body.etag:
+            return 304, None, cache_headers
+        return 200, body, cache_headers
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                status, body, extra = self.route(method, target, headers)
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+                lines = [f"HTTP/1.1 {status} {_REASONS[status]}",
+                         "Content-Type: application/json",
+                         f"Content-Length: {len(body.data) if body else 0}",
+                         f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                lines += [f"{name}: {value}" for name, value in extra.items()]
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+                if body is not None:
+                    writer.write(body.data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass   # client went away or sent something that is not HTTP
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, ready=None):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.refresh)
+        server = await asyncio.start_server(self.handle, host, port)
+        refresher = asyncio.create_task(self._refresh_loop())
+        print(f"✈️ Forecast service on http://{host}:{port}/api")
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            refresher.cancel()
+
+
+_REASONS = {200: "OK", 304: "Not Modified", 404: "Not Found", 405: "Method Not Allowed",
+            503: "Service Unavailable"}
+
+
+def start_in_thread(host="127.0.0.1", port=DEFAULT_PORT, timeout=120):
+    """Run the service on a daemon thread (used by the app when none is running)."""
+    ready = threading.Event()
+    service = ForecastService()
+    failure = []
+
+    def run():
+        try:
+            asyncio.run(service.serve(host, port, ready))
+        except Exception as e:
+            failure.append(e)
+            ready.set()
+
+    threading.Thread(target=run, name="forecast-service", daemon=True).start()
+    if not ready.wait(timeout):
+        raise TimeoutError("Forecast service did not start in time")
+    if failure:
+        raise failure[0]
+    return service
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(ForecastService().serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,214 @@
+"""
+Incremental maintenance of per-day aggregates after new flights are loaded.
+
+New BTS data only appends recent FlightDates (ingest.py replaces the flights
+of each month it loads and logs the month in meta.LoadLog). A `DailyView`
+keeps a per-day aggregate in memory together with the watermark it was
+computed at; `refresh()` finds the first day that can have changed since then
+and re-queries only FlightDate >= that day, splicing the result onto the
+unchanged history. The cost of a refresh therefore follows the size of the new
+data, not of ops.Flights.
+
+The watermark is (MAX(FlightDate), MAX(LoadID) of meta.LoadLog when that table
+exists). Loads newer than a view's watermark change data from the earliest
+month they replaced; without a load log, days from the old MAX(FlightDate)
+onwards are re-aggregated (the boundary day may have been partly loaded).
+
+Code that caches query results derived from ops.Flights registers a callback
+with `on_refresh`; it receives the Change and drops only the affected entries.
+
+    python incremental.py      # print the current watermark
+"""
+import datetime
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import cache
+import db
+
+Watermark = namedtuple("Watermark", ["last_date", "load_id"])
+
+# `start`: first FlightDate whose aggregates may differ; `reloaded`: a load
+# (which may also add airlines/airports) happened, not just an append
+Change = namedtuple("Change", ["start", "reloaded", "watermark"])
+
+# recent_watermark() reuses a reading for this long (seconds); refresh() always re-reads
+WATERMARK_TTL = 30
+
+LOAD_LOG_EXISTS_QUERY = """
+SELECT COUNT(*) FROM information_schema.tables
+WHERE table_schema = 'meta' AND table_name = 'LoadLog'
+"""
+
+
+def current_watermark():
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(FlightDate) FROM ops.Flights")
+        last_date = cursor.fetchone()[0]
+        load_id = None
+        cursor.execute(LOAD_LOG_EXISTS_QUERY)
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT MAX(LoadID) FROM meta.LoadLog")
+            load_id = cursor.fetchone()[0]
+    return Watermark(db.to_date(last_date) if last_date is not None else None, load_id)
+
+
+_recent = None   # (Watermark, monotonic time read)
+_recent_lock = threading.Lock()
+
+
+def recent_watermark(max_age=WATERMARK_TTL):
+    """
+    current_watermark(), reused for up to `max_age` seconds. An older reading
+    is safe wherever it is taken before the data it describes: at worst a
+    later refresh re-reads a few more days.
+    """
+    global _recent
+    with _recent_lock:
+        if _recent is not None and time.monotonic() - _recent[1] < max_age:
+            return _recent[0]
+    watermark = current_watermark()
+    with _recent_lock:
+        _recent = (watermark, time.monotonic())
+    return watermark
+
+
+def changed_since(old, new):
+    """The Change between two watermarks, or None if nothing was loaded in between."""
+    if old == new:
+        return None
+    starts = []
+    reloaded = new.load_id is not None and new.load_id != old.load_id
+    if reloaded:
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MIN(PartitionMonth) FROM meta.LoadLog WHERE LoadID > ?", (old.load_id or 0,))
+            month = cursor.fetchone()[0]
+        if month:
+            year, mon = (int(part) for part in month.split("-"))
+            starts.append(datetime.date(year, mon, 1))
+    if new.last_date is not None and old.last_date is not None and new.last_date != old.last_date:
+        starts.append(min(old.last_date, new.last_date))
+    if old.last_date is None or new.last_date is None:
+        starts.append(datetime.date.min)   # was empty, or emptied: everything changed
+    if not starts:
+        return None
+    return Change(min(starts), reloaded, new)
+
+
+class DailyView:
+    """
+    A per-day aggregate held in memory and kept current incrementally.
+
+    `fetch(start)` returns {column: ndarray} sorted by FlightDate, for all days
+    (start=None) or for FlightDate >= start. With the result cache disabled
+    (benchmarks, plan capture) every get() reads the database.
+
+    A view whose rows cover longer periods than a day (date_column holds each
+    period's first day) passes `align(day)` -> the first day of the period
+    holding `day`, or datetime.date.min when only a full re-read will do; a
+    refresh then re-reads whole periods.
+    """
+
+    def __init__(self, fetch, date_column="FlightDate", align=None):
+        self._fetch = fetch
+        self._date_column = date_column
+        self._align = align
+        self._lock = threading.Lock()
+        self._columns = None
+        self._watermark = None
+
+    def get(self):
+        if not cache.default_cache.enabled:
+            return self._fetch(None)
+        with self._lock:
+            if self._columns is None:
+                watermark = recent_watermark()   # read before the data, so nothing slips between
+                self._columns = self._fetch(None)
+                self._watermark = watermark
+            return self._columns
+
+    def refresh(self, watermark):
+        """Bring the view up to `watermark`. Returns the number of days re-read (None if not loaded)."""
+        with self._lock:
+            if self._columns is None:
+                return None
+            change = changed_since(self._watermark, watermark)
+            if change is None:
+                return 0
+            first = change.start
+            if self._align is not None and first != datetime.date.min:
+                first = self._align(first)
+            start = np.datetime64(first, "D") if first != datetime.date.min else None
+            delta = self._fetch(first if start is not None else None)
+            if start is None:
+                self._columns = delta
+            else:
+                keep = self._columns[self._date_column] < start
+                self._columns = {name: np.concatenate([values[keep], delta[name]])
+                                 for name, values in self._columns.items()}
+            self._watermark = watermark
+            return len(delta[self._date_column])
+
+    def clear(self):
+        with self._lock:
+            self._columns = None
+            self._watermark = None
+
+
+def _sort_key(watermark):
+    return (watermark.last_date or datetime.date.min, watermark.load_id or 0)
+
+
+_views = []
+_callbacks = []
+_last_watermark = None
+_refresh_lock = threading.Lock()
+
+
+def register(view):
+    _views.append(view)
+    return view
+
+
+def on_refresh(callback):
+    """Call `callback(change)` after each refresh that found new data."""
+    _callbacks.append(callback)
+    return callback
+
+
+def refresh():
+    """
+    Bring every registered view up to date and notify the callbacks.
+    Returns the Change since the previous refresh, or None if there was none.
+    The first call measures from the oldest loaded view (nothing cached yet
+    is assumed current if no view is loaded).
+    """
+    global _last_watermark, _recent
+    with _refresh_lock:
+        watermark = current_watermark()
+        with _recent_lock:
+            _recent = (watermark, time.monotonic())
+        if _last_watermark is None:
+            loaded = [view._watermark for view in _views if view._watermark is not None]
+            _last_watermark = min(loaded, key=_sort_key) if loaded else watermark
+        for view in list(_views):
+            view.refresh(watermark)
+        change = changed_since(_last_watermark, watermark)
+        _last_watermark = watermark
+    if change is not None:
+        for callback in list(_callbacks):
+            try:
+                callback(change)
+            except Exception as e:
+                print("❌ Error in refresh callback:", e)
+    return change
+
+
+if __name__ == "__main__":
+    watermark = current_watermark()
+    print(f"Watermark: last FlightDate {watermark.last_date}, last load {watermark.load_id}")
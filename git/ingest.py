@@ -0,0 +1,360 @@
+"""
+Bulk-load flight CSVs (BTS monthly drops, or Airline_Normalization(3NF).csv)
+into ops.Flights and its dimension tables on SQL Server.
+
+    python ingest.py On_Time_2020_03.csv --workers 4
+
+1. The CSV is streamed once and split into one spool file per FlightDate
+   month; dimension keys (airlines, airports, time blocks) are collected on
+   the way. Memory stays flat whatever the file size. Only the sectioned 3NF
+   sample (a small spreadsheet export) is also read whole, for its reference
+   tables.
+2. Missing dimension rows are inserted once, from in-memory maps of the keys
+   already in the database.
+3. Month partitions are loaded in parallel worker processes with
+   fast_executemany. Each partition replaces the flights it contains — rows
+   of ops.Flights with the same FLIGHT_KEY — and records itself in
+   meta.LoadLog inside one transaction, so a load is idempotent, a file
+   covering part of a month (a daily drop, the 3NF sample) leaves the month's
+   other flights alone, and an interrupted load resumes with the partitions
+   that did not finish.
+"""
+import argparse
+import csv
+import datetime
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import csv_sections
+import db
+
+INSERT_BATCH = 50_000   # rows per executemany call
+
+# CSV column -> ops.Flights column (columns not listed keep their name)
+RENAMES = {
+    "Tail_Number": "TailNumber",
+    "Flight_Number_Reporting_Airline": "FlightNumberReportingAirline",
+    "IATA_CODE_Reporting_Airline": "IATACodeReportingAirline",
+    "DOT_ID_Reporting_Airline": "ReportingAirlineID",
+}
+
+FLIGHT_COLUMNS = [
+    "FlightDate", "TailNumber", "CRSDepTime", "FlightNumberReportingAirline", "IATACodeReportingAirline",
+    "DepTime", "DepDelay", "DepDelayMinutes", "DepDel15", "DepartureDelayGroups", "TaxiOut",
+    "WheelsOff", "WheelsOn", "TaxiIn", "CRSArrTime", "ArrDelay", "ArrDelayMinutes", "ArrDel15",
+    "ArrivalDelayGroups", "Cancelled", "Diverted", "CRSElapsedTime", "ActualElapsedTime", "AirTime",
+    "Distance", "DistanceGroup", "OriginAirportSeqID", "DestAirportSeqID", "ReportingAirlineID", "ArrTime",
+]
+# One flight leg: a partition replaces the ops.Flights rows matching its rows on these
+FLIGHT_KEY = ["FlightDate", "ReportingAirlineID", "FlightNumberReportingAirline", "OriginAirportSeqID",
+              "CRSDepTime"]
+TIME_COLUMNS = {"CRSDepTime", "DepTime", "WheelsOff", "WheelsOn", "CRSArrTime", "ArrTime"}
+TEXT_COLUMNS = {"TailNumber", "IATACodeReportingAirline"}
+
+# Airport attributes a BTS drop may carry, per side
+AIRPORT_ATTRIBUTES = ["AirportID", "CityMarketID", "", "CityName", "State", "StateFips", "StateName", "Wac"]
+
+
+# --- value parsing ---
+def parse_date(text):
+    text = text.strip().split(" ")[0]   # BTS sometimes writes "1/1/2020 12:00:00 AM"
+    if "-" in text:
+        return datetime.date.fromisoformat(text)
+    month, day, year = text.split("/")
+    return datetime.date(int(year), int(month), int(day))
+
+
+def parse_hhmm(text):
+    """BTS 'hhmm' (2400 = midnight) -> datetime.time."""
+    text = text.strip()
+    if not text:
+        return None
+    value = int(float(text))
+    return datetime.time(value // 100 % 24, value % 100)
+
+
+def parse_number(text):
+    text = text.strip()
+    if not text:
+        return None
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def time_block(t):
+    """datetime.time -> BTS hour block, e.g. '1300-1359'."""
+    return f"{t.hour:02d}00-{t.hour:02d}59"
+
+
+def convert_row(raw):
+    """Spooled text values (FLIGHT_COLUMNS order) -> typed tuple for the INSERT."""
+    out = []
+    for column, text in zip(FLIGHT_COLUMNS, raw):
+        if column == "FlightDate":
+            out.append(parse_date(text))
+        elif column in TIME_COLUMNS:
+            out.append(parse_hhmm(text))
+        elif column in TEXT_COLUMNS:
+            out.append(text.strip() or None)
+        else:
+            out.append(parse_number(text))
+    return tuple(out)
+
+
+# --- pass 1: split by month and collect dimension keys ---
+class Dimensions:
+    def __init__(self):
+        self.airlines = {}      # ReportingAirlineID -> IATA code
+        self.origins = {}       # OriginAirportSeqID -> {column: value}
+        self.destinations = {}  # DestAirportSeqID -> {column: value}
+        self.dep_times = set()
+        self.arr_times = set()
+
+    def add(self, record):
+        airline_id = parse_number(record.get("DOT_ID_Reporting_Airline", ""))
+        if airline_id is not None:
+            self.airlines[airline_id] = record.get("IATA_CODE_Reporting_Airline", "").strip()
+        for prefix, target in (("Origin", self.origins), ("Dest", self.destinations)):
+            seq = parse_number(record.get(f"{prefix}AirportSeqID", ""))
+            if seq is not None and seq not in target:
+                attrs = {f"{prefix}AirportID": seq // 100}
+                for suffix in AIRPORT_ATTRIBUTES:
+                    name = f"{prefix}{suffix}"
+                    if record.get(name, "").strip():
+                        attrs[name] = record[name].strip()
+                target[seq] = attrs
+        for column, target in (("CRSDepTime", self.dep_times), ("ArrTime", self.arr_times)):
+            t = parse_hhmm(record.get(column, ""))
+            if t is not None:
+                target.add(t)
+
+    def add_reference_tables(self, csv_path):
+        """The 3NF sample carries full Origin/Destination/ReportingAirline blocks after the flights."""
+        tables = csv_sections.read_sections(csv_path)
+        for prefix, name, target in (("Origin", "origin", self.origins),
+                                     ("Dest", "destination", self.destinations)):
+            if name not in tables:
+                continue
+            columns, rows = tables[name]
+            for row in rows:
+                record = dict(zip(columns, row))
+                seq = parse_number(record.get(f"{prefix}AirportSeqID", ""))
+                if seq is not None:
+                    target.setdefault(seq, {}).update(
+                        {k: v.strip() for k, v in record.items() if k != f"{prefix}AirportSeqID" and v.strip()})
+        if "reporting_airline" in tables:
+            columns, rows = tables["reporting_airline"]
+            for row in rows:
+                record = dict(zip(columns, row))
+                airline_id = parse_number(record.get("DOT_ID_Reporting_Airline", ""))
+                if airline_id is not None:
+                    self.airlines[airline_id] = record.get("Reporting_Airline", "").strip()
+
+
+def split_by_month(csv_path, work_dir):
+    """
+    Stream the flights rows into work_dir/YYYY-MM.csv spool files.
+    Returns ({month: spool_path}, Dimensions, total_rows).
+    """
+    dims = Dimensions()
+    spools, writers = {}, {}
+    total = 0
+    try:
+        with open(csv_path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            header = [c.strip() for c in next(reader)]
+            sectioned = csv_sections.is_sectioned(header)
+            index = {RENAMES.get(name, name): i for i, name in enumerate(header) if name}
+            missing = [c for c in FLIGHT_COLUMNS if c not in index]
+            if missing:
+                raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+            positions = [index[c] for c in FLIGHT_COLUMNS]
+
+            for row in reader:
+                if not any(cell.strip() for cell in row):
+                    break   # end of the flights block (the 3NF sample stacks other tables below)
+                record = dict(zip(header, row))
+                day = parse_date(row[index["FlightDate"]])
+                month = f"{day.year:04d}-{day.month:02d}"
+                if month not in writers:
+                    spools[month] = os.path.join(work_dir, f"{month}.csv")
+                    writers[month] = open(spools[month], "w", newline="", encoding="utf-8")
+                csv.writer(writers[month]).writerow([row[p] for p in positions])
+                dims.add(record)
+                total += 1
+    finally:
+        for handle in writers.values():
+            handle.close()
+
+    if sectioned:
+        dims.add_reference_tables(csv_path)
+    return spools, dims, total
+
+
+# --- pass 2: dimensions ---
+def _table_exists(cursor, name):
+    cursor.execute("SELECT OBJECT_ID(?)", (name,))
+    return cursor.fetchone()[0] is not None
+
+
+def _insert_missing(cursor, table, key_column, rows_by_key, columns):
+    cursor.execute(f"SELECT {key_column} FROM {table}")
+    existing = {row[0] for row in cursor.fetchall()}
+    new_rows = [[key] + [attrs.get(c) for c in columns]
+                for key, attrs in rows_by_key.items() if key not in existing]
+    if new_rows:
+        placeholders = ", ".join("?" * (len(columns) + 1))
+        cursor.fast_executemany = True
+        cursor.executemany(f"INSERT INTO {table} ({key_column}, {', '.join(columns)}) VALUES ({placeholders})",
+                           new_rows)
+    return len(new_rows)
+
+
+def load_dimensions(conn, dims):
+    cursor = conn.cursor()
+    added = {}
+    added["meta.ReportingAirline"] = _insert_missing(
+        cursor, "meta.ReportingAirline", "ReportingAirlineID",
+        {k: {"ReportingAirline": v} for k, v in dims.airlines.items()}, ["ReportingAirline"])
+    for prefix, table, rows in (("Origin", "ops.Origin", dims.origins),
+                                ("Dest", "ops.Destination", dims.destinations)):
+        columns = [f"{prefix}{suffix}" for suffix in AIRPORT_ATTRIBUTES]
+        added[table] = _insert_missing(cursor, table, f"{prefix}AirportSeqID", rows, columns)
+    # Time-block lookups exist in the normalized design; fill them if this database has them
+    for table, key, block, times in (("ops.Departure", "CRSDepTime", "DepTimeBlk", dims.dep_times),
+                                     ("ops.Arrival", "ArrTime", "ArrTimeBlk", dims.arr_times)):
+        if _table_exists(cursor, table):
+            added[table] = _insert_missing(cursor, table, key,
+                                           {t: {block: time_block(t)} for t in times}, [block])
+    conn.commit()
+    return added
+
+
+# --- pass 3: partitions ---
+def _ensure_load_log(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        IF OBJECT_ID('meta.LoadLog') IS NULL
+            CREATE TABLE meta.LoadLog (
+                LoadID INT IDENTITY PRIMARY KEY,
+                PartitionMonth CHAR(7) NOT NULL,
+                Checksum CHAR(40) NOT NULL,
+                SourceFile NVARCHAR(400) NOT NULL,
+                RowsLoaded INT NOT NULL,
+                LoadedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+            )
+    """)
+    conn.commit()
+
+
+def file_checksum(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def already_loaded(conn, month, checksum):
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM meta.LoadLog WHERE PartitionMonth = ? AND Checksum = ?", (month, checksum))
+    return cursor.fetchone() is not None
+
+
+def load_partition(month, spool_path, checksum, source_file):
+    """Worker process: replace one month's flights in ops.Flights with those of its spool file."""
+    backend = db.create_backend("sqlserver")
+    start = time.perf_counter()
+    year, mon = (int(part) for part in month.split("-"))
+    first = datetime.date(year, mon, 1)
+    after = datetime.date(year + mon // 12, mon % 12 + 1, 1)
+    columns = ", ".join(FLIGHT_COLUMNS)
+    placeholders = ", ".join("?" * len(FLIGHT_COLUMNS))
+    insert = f"INSERT INTO #FlightsStage ({columns}) VALUES ({placeholders})"
+    # INTERSECT compares NULLs as equal (flights without a CRSDepTime)
+    same_key = (f"s.FlightDate = f.FlightDate AND EXISTS (SELECT {', '.join('f.' + c for c in FLIGHT_KEY[1:])} "
+                f"INTERSECT SELECT {', '.join('s.' + c for c in FLIGHT_KEY[1:])})")
+    rows = 0
+    with backend.connection() as conn:
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        try:
+            cursor.execute(f"SELECT TOP 0 {columns} INTO #FlightsStage FROM ops.Flights")
+            with open(spool_path, newline="", encoding="utf-8") as f:
+                batch = []
+                for raw in csv.reader(f):
+                    batch.append(convert_row(raw))
+                    if len(batch) >= INSERT_BATCH:
+                        cursor.executemany(insert, batch)
+                        rows += len(batch)
+                        batch = []
+                if batch:
+                    cursor.executemany(insert, batch)
+                    rows += len(batch)
+            # The month bounds let the delete seek on FlightDate instead of scanning ops.Flights
+            cursor.execute("DELETE f FROM ops.Flights f WHERE f.FlightDate >= ? AND f.FlightDate < ? "
+                           f"AND EXISTS (SELECT 1 FROM #FlightsStage s WHERE {same_key})", (first, after))
+            cursor.execute(f"INSERT INTO ops.Flights ({columns}) SELECT {columns} FROM #FlightsStage")
+            cursor.execute("DELETE FROM meta.LoadLog WHERE PartitionMonth = ? AND Checksum = ?", (month, checksum))
+            cursor.execute("INSERT INTO meta.LoadLog (PartitionMonth, Checksum, SourceFile, RowsLoaded) "
+                           "VALUES (?, ?, ?, ?)", (month, checksum, source_file, rows))
+            cursor.execute("DROP TABLE #FlightsStage")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    backend.close()
+    return month, rows, time.perf_counter() - start
+
+
+def ingest(csv_path, workers=None, work_dir=None, force=False):
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=work_dir) as spool_dir:
+        print(f"Splitting {csv_path} by month ...")
+        spools, dims, total = split_by_month(csv_path, spool_dir)
+        print(f"  {total} rows in {len(spools)} month partition(s)")
+
+        with db.connection() as conn:
+            _ensure_load_log(conn)
+            for table, count in load_dimensions(conn, dims).items():
+                if count:
+                    print(f"  + {count} new row(s) in {table}")
+            pending = []
+            for month, path in sorted(spools.items()):
+                checksum = file_checksum(path)
+                if not force and already_loaded(conn, month, checksum):
+                    print(f"  = {month} already loaded, skipping")
+                    continue
+                pending.append((month, path, checksum))
+
+        failures = 0
+        source = os.path.basename(csv_path)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(load_partition, month, path, checksum, source): month
+                       for month, path, checksum in pending}
+            for future in as_completed(futures):
+                month = futures[future]
+                try:
+                    _, rows, seconds = future.result()
+                    print(f"✅ {month}: {rows} rows in {seconds:.1f}s")
+                except Exception as e:
+                    failures += 1
+                    print(f"❌ {month} failed:", e)
+
+    print(f"Done in {time.perf_counter() - start:.1f}s"
+          + (f" — {failures} partition(s) failed, re-run to resume" if failures else ""))
+    return failures == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv_path")
+    parser.add_argument("--workers", type=int, default=None, help="parallel partition loaders (default: CPU count)")
+    parser.add_argument("--work-dir", default=None, help="where to put the month spool files")
+    parser.add_argument("--force", action="store_true", help="reload partitions even if already loaded")
+    args = parser.parse_args()
+    sys.exit(0 if ingest(args.csv_path, args.workers, args.work_dir, args.force) else 1)
@@ -0,0 +1,96 @@
+"""
+Delay-trend leaderboard: every carrier's 3-month, 1-year and 5-year regression at once.
+
+    python leaderboard.py                       # print carriers by 1-year trend
+    python leaderboard.py --out trends.csv      # one row per carrier and window
+
+All carriers come from one grouped query (ALL_DAILY_STATS_QUERY) and one
+batched least-squares solve (regression.fit_all_airlines), so a fit equals
+what the Airline Regression window shows for that carrier. Per window:
+
+    Slope          minutes of arrival delay per day (the fitted coefficient)
+    Intercept      fitted delay at date ordinal 0 (date.toordinal())
+    R2, N          coefficient of determination, flights in the window
+    TrendPerYear   Slope × 365.25
+    DelayAtEnd     fitted delay on the end date
+
+A window with fewer than two flights is left out.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import db
+import regression
+
+DAYS_PER_YEAR = 365.25
+
+Entry = namedtuple("Entry", ["Airline", "Window", "Start", "Slope", "Intercept", "R2", "N",
+                             "TrendPerYear", "DelayAtEnd"])
+
+
+def window_label(title):
+    """'📉 Last 1 Year' -> 'Last 1 Year'."""
+    return title.replace("📉", "").strip()
+
+
+def entries(fits_by_airline, end=regression.REGRESSION_END):
+    """One Entry per airline and fitted window, airlines in code order."""
+    end_day = np.array([end], dtype="datetime64[D]")
+    rows = []
+    for airline in sorted(fits_by_airline):
+        for fit in fits_by_airline[airline]:
+            if fit is None:
+                continue
+            rows.append(Entry(airline, window_label(fit.title), str(fit.start), fit.slope, fit.intercept,
+                              fit.r2, fit.n, fit.slope * DAYS_PER_YEAR,
+                              float(regression.predict(fit, end_day)[0])))
+    return rows
+
+
+def compute(end=regression.REGRESSION_END):
+    """({airline: [Fit or None, ...]}, [Entry, ...]) for every carrier."""
+    fits = regression.fit_all_airlines(end)
+    return fits, entries(fits, end)
+
+
+def write_csv(rows, path):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(Entry._fields)
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--end", default=str(regression.REGRESSION_END),
+                        help="last date of the windows (YYYY-MM-DD)")
+    parser.add_argument("--window", default=window_label(regression.WINDOWS[1][0]),
+                        help="window to rank carriers by")
+    parser.add_argument("--out", help="write every carrier and window to this CSV")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        fits, rows = compute(db.to_date(args.end))
+        if args.out:
+            write_csv(rows, args.out)
+    except Exception as e:
+        print("❌ Error computing the leaderboard:", e)
+        sys.exit(1)
+
+    ranked = sorted((r for r in rows if r.Window == args.window), key=lambda r: r.TrendPerYear, reverse=True)
+    print(f"{len(fits)} carriers, {len(rows)} fits in {time.perf_counter() - start:.1f}s; "
+          f"{args.window} to {args.end}, worsening first\n")
+    print(f"{'Airline':<8} {'Trend/yr':>9} {'R²':>6} {'Flights':>10} {'At end':>8}")
+    for r in ranked:
+        print(f"{r.Airline:<8} {r.TrendPerYear:>+9.2f} {r.R2:>6.3f} {r.N:>10,} {r.DelayAtEnd:>8.1f}")
+    if args.out:
+        print(f"\n✅ {len(rows)} rows written to {args.out}")
@@ -0,0 +1,91 @@
+"""
+Apply the versioned DDL migrations in migrations/ to the SQL Server database.
+
+Files are named NNN_description.sql and applied in order; batches inside a
+file are separated by GO lines. Applied versions are recorded in
+meta.SchemaMigrations so re-running only applies what is new.
+
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied / pending
+"""
+import os
+import re
+import sys
+
+import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+_GO = re.compile(r"^\s*GO\s*$", re.IGNORECASE | re.MULTILINE)
+
+
+def list_migrations():
+    """[(version, name, path), ...] sorted by version."""
+    found = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = re.match(r"^(\d+)_(.+)\.sql$", filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return found
+
+
+def split_batches(sql_text):
+    return [batch.strip() for batch in _GO.split(sql_text) if batch.strip()]
+
+
+def _ensure_history_table(cursor):
+    cursor.execute("""
+        IF OBJECT_ID('meta.SchemaMigrations') IS NULL
+            CREATE TABLE meta.SchemaMigrations (
+                Version INT PRIMARY KEY,
+                Name VARCHAR(200) NOT NULL,
+                AppliedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+            )
+    """)
+
+
+def applied_versions(conn):
+    cursor = conn.cursor()
+    _ensure_history_table(cursor)
+    conn.commit()
+    cursor.execute("SELECT Version FROM meta.SchemaMigrations")
+    return {row.Version for row in cursor.fetchall()}
+
+
+def migrate():
+    with db.connection() as conn:
+        done = applied_versions(conn)
+        for version, name, path in list_migrations():
+            if version in done:
+                continue
+            print(f"Applying {version:03d}_{name} ...")
+            with open(path, encoding="utf-8") as f:
+                batches = split_batches(f.read())
+            cursor = conn.cursor()
+            try:
+                for batch in batches:
+                    cursor.execute(batch)
+                    while cursor.nextset():
+                        pass
+                cursor.execute("INSERT INTO meta.SchemaMigrations (Version, Name) VALUES (?, ?)",
+                               (version, name))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"❌ Migration {version:03d}_{name} failed:", e)
+                raise
+            print(f"✅ Applied {version:03d}_{name}")
+
+
+def status():
+    with db.connection() as conn:
+        done = applied_versions(conn)
+    for version, name, _ in list_migrations():
+        print(f"{'applied' if version in done else 'pending'}  {version:03d}_{name}")
+
+
+if __name__ == "__main__":
+    if "--status" in sys.argv[1:]:
+        status()
+    else:
+        migrate()
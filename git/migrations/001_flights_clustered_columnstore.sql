@@ -0,0 +1,31 @@
+-- ops.Flights: move the table to a clustered columnstore layout.
+-- The per-date aggregates and the compare-window averages scan a handful of
+-- columns over the whole table; columnstore reads only those columns, with
+-- segment elimination on FlightDate.
+-- The primary key on FlightID is kept, as a nonclustered index.
+
+DECLARE @pk SYSNAME, @pk_is_clustered BIT;
+SELECT @pk = kc.name, @pk_is_clustered = CASE WHEN i.type = 1 THEN 1 ELSE 0 END
+FROM sys.key_constraints kc
+JOIN sys.indexes i ON i.object_id = kc.parent_object_id AND i.index_id = kc.unique_index_id
+WHERE kc.parent_object_id = OBJECT_ID('ops.Flights') AND kc.type = 'PK';
+
+IF @pk IS NOT NULL AND @pk_is_clustered = 1
+BEGIN
+    EXEC('ALTER TABLE ops.Flights DROP CONSTRAINT ' + QUOTENAME(@pk));
+    EXEC('ALTER TABLE ops.Flights ADD CONSTRAINT ' + QUOTENAME(@pk) + ' PRIMARY KEY NONCLUSTERED (FlightID)');
+END
+GO
+
+-- Any other clustered rowstore index has to go before the columnstore is built
+DECLARE @cix SYSNAME;
+SELECT @cix = name FROM sys.indexes
+WHERE object_id = OBJECT_ID('ops.Flights') AND type = 1;
+IF @cix IS NOT NULL
+    EXEC('DROP INDEX ' + QUOTENAME(@cix) + ' ON ops.Flights');
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes
+               WHERE object_id = OBJECT_ID('ops.Flights') AND name = 'CCI_Flights')
+    CREATE CLUSTERED COLUMNSTORE INDEX CCI_Flights ON ops.Flights;
+GO
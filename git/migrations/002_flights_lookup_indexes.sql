@@ -0,0 +1,19 @@
+-- Rowstore lookup indexes on top of the columnstore.
+
+-- Flight lookup: get_matching_departure_times / search_flight_info seek on
+-- (airline, flight number, scheduled departure). The INCLUDE list covers
+-- every Flights column those queries read.
+IF NOT EXISTS (SELECT 1 FROM sys.indexes
+               WHERE object_id = OBJECT_ID('ops.Flights') AND name = 'IX_Flights_Airline_FlightNumber_CRSDepTime')
+    CREATE NONCLUSTERED INDEX IX_Flights_Airline_FlightNumber_CRSDepTime
+        ON ops.Flights (ReportingAirlineID, FlightNumberReportingAirline, CRSDepTime)
+        INCLUDE (FlightDate, OriginAirportSeqID, DestAirportSeqID, ArrTime, DepDelayMinutes);
+GO
+
+-- Single-date filters and per-date aggregates
+IF NOT EXISTS (SELECT 1 FROM sys.indexes
+               WHERE object_id = OBJECT_ID('ops.Flights') AND name = 'IX_Flights_FlightDate')
+    CREATE NONCLUSTERED INDEX IX_Flights_FlightDate
+        ON ops.Flights (FlightDate)
+        INCLUDE (ReportingAirlineID, OriginAirportSeqID, DepDelayMinutes, ArrDelayMinutes);
+GO
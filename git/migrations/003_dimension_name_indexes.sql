@@ -0,0 +1,16 @@
+-- The app filters the dimensions by name (ra.ReportingAirline = ?,
+-- o.OriginCityName = ?) before joining to ops.Flights.
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes
+               WHERE object_id = OBJECT_ID('meta.ReportingAirline') AND name = 'IX_ReportingAirline_ReportingAirline')
+    CREATE NONCLUSTERED INDEX IX_ReportingAirline_ReportingAirline
+        ON meta.ReportingAirline (ReportingAirline)
+        INCLUDE (ReportingAirlineID);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes
+               WHERE object_id = OBJECT_ID('ops.Origin') AND name = 'IX_Origin_OriginCityName')
+    CREATE NONCLUSTERED INDEX IX_Origin_OriginCityName
+        ON ops.Origin (OriginCityName)
+        INCLUDE (OriginAirportSeqID, OriginStateName);
+GO
@@ -0,0 +1,255 @@
+"""
+Delay-trend regression from per-day sufficient statistics.
+
+Instead of pulling every (FlightDate, ArrDelayMinutes) row for an airline,
+the database returns one row per day with the count, sum and sum of squares
+of the delays. Ordinary least squares of delay on date ordinal only needs
+these sums, so the fit is identical to fitting the raw rows:
+
+    N = Σn    Sx = Σn·x    Sxx = Σn·x²    Sy = Σs    Sxy = Σx·s    Syy = Σss
+
+    slope     = (Sxy - Sx·Sy/N) / (Sxx - Sx²/N)
+    intercept = (Sy - slope·Sx) / N
+    R²        = 1 - SSres / SStot,  SStot = Syy - Sy²/N,  SSres = SStot - slope²·(Sxx - Sx²/N)
+
+Every time window ("dates >= cutoff") is a suffix of the sorted days, so all
+windows are solved together from segment sums in one NumPy pass. For the
+leaderboard, every airline's days come from one grouped query and the
+airline × window grid is solved in that same pass (`fit_all_airlines`).
+
+The per-day statistics are kept in incremental.DailyViews (one per airline,
+one for all airlines), so after a load only the new days are queried.
+"""
+import calendar
+import datetime
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+import columnar
+import db
+import disk_cache
+import incremental
+
+# Last date in the loaded data; the windows are measured back from here
+REGRESSION_END = datetime.date(2020, 3, 31)
+
+# (title, months back from REGRESSION_END)
+WINDOWS = [
+    ("📉 Last 3 Months", 3),
+    ("📉 Last 1 Year", 12),
+    ("📉 Last 5 Years", 60),
+]
+
+DAILY_STATS_QUERY = """
+SELECT
+    f.FlightDate,
+    COUNT(*) AS Flights,
+    SUM(CAST(f.ArrDelayMinutes AS DOUBLE PRECISION)) AS SumDelay,
+    SUM(CAST(f.ArrDelayMinutes AS DOUBLE PRECISION) * f.ArrDelayMinutes) AS SumSqDelay
+FROM ops.Flights f
+JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID
+WHERE ra.ReportingAirline = ?
+  AND f.ArrDelayMinutes IS NOT NULL
+  {since}
+GROUP BY f.FlightDate
+ORDER BY f.FlightDate
+"""
+
+# The same statistics for every airline at once
+ALL_DAILY_STATS_QUERY = """
+SELECT
+    ra.ReportingAirline,
+    f.FlightDate,
+    COUNT(*) AS Flights,
+    SUM(CAST(f.ArrDelayMinutes AS DOUBLE PRECISION)) AS SumDelay,
+    SUM(CAST(f.ArrDelayMinutes AS DOUBLE PRECISION) * f.ArrDelayMinutes) AS SumSqDelay
+FROM ops.Flights f
+JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID
+WHERE ra.ReportingAirline IS NOT NULL
+  AND f.ArrDelayMinutes IS NOT NULL
+  {since}
+GROUP BY ra.ReportingAirline, f.FlightDate
+ORDER BY f.FlightDate, ra.ReportingAirline
+"""
+
+DAILY_STATS_DTYPES = {
+    "FlightDate": "datetime64[D]",
+    "Flights": np.float64,
+    "SumDelay": np.float64,
+    "SumSqDelay": np.float64,
+}
+
+DailyStats = namedtuple("DailyStats", ["dates", "counts", "sums", "sumsqs"])
+
+# One fitted window. `dates`/`means` are the per-day points inside the window.
+Fit = namedtuple("Fit", ["title", "start", "slope", "intercept", "r2", "n", "dates", "means"])
+
+
+def query_daily_stats(airline_code, start=None):
+    """
+    {column: ndarray} of DAILY_STATS_QUERY for every day (from the disk cache
+    when current), or for FlightDate >= start.
+    """
+    if start is None:
+        return disk_cache.fetch_columns(DAILY_STATS_QUERY.format(since=""), [airline_code], DAILY_STATS_DTYPES)
+    date_sql, date_params = db.get_backend().flight_dates_since("f", start)
+    return columnar.fetch_columns(DAILY_STATS_QUERY.format(since=f"AND {date_sql}"),
+                                  [airline_code] + date_params, DAILY_STATS_DTYPES)
+
+
+def query_all_daily_stats(start=None):
+    """ALL_DAILY_STATS_QUERY for every day (from the disk cache when current), or for FlightDate >= start."""
+    if start is None:
+        return disk_cache.fetch_columns(ALL_DAILY_STATS_QUERY.format(since=""), dtypes=DAILY_STATS_DTYPES)
+    date_sql, date_params = db.get_backend().flight_dates_since("f", start)
+    return columnar.fetch_columns(ALL_DAILY_STATS_QUERY.format(since=f"AND {date_sql}"),
+                                  date_params, DAILY_STATS_DTYPES)
+
+
+_views = {}
+_views_lock = threading.Lock()
+
+
+def fetch_daily_stats(airline_code):
+    """Per-day count / sum / sum of squares of ArrDelayMinutes for one airline."""
+    with _views_lock:
+        view = _views.get(airline_code)
+        if view is None:
+            view = _views[airline_code] = incremental.register(
+                incremental.DailyView(lambda start: query_daily_stats(airline_code, start)))
+    columns = view.get()
+    return DailyStats(columns["FlightDate"], columns["Flights"], columns["SumDelay"], columns["SumSqDelay"])
+
+
+_all_view = incremental.register(incremental.DailyView(query_all_daily_stats))
+
+
+def fetch_all_daily_stats():
+    """
+    (airline codes, DailyStats of every airline's days, offsets): airline i's
+    days are [offsets[i], offsets[i + 1]), sorted by date.
+    """
+    columns = _all_view.get()
+    airlines, codes = np.unique(columns["ReportingAirline"].astype(str), return_inverse=True)
+    order = np.argsort(codes, kind="stable")   # rows are in date order: keep it within each airline
+    offsets = np.searchsorted(codes[order], np.arange(len(airlines) + 1))
+    stats = DailyStats(columns["FlightDate"][order], columns["Flights"][order],
+                       columns["SumDelay"][order], columns["SumSqDelay"][order])
+    return airlines.tolist(), stats, offsets
+
+
+def months_before(day, months):
+    """Same calendar arithmetic as `pd.Timestamp(day) - pd.DateOffset(months=months)`."""
+    total = day.year * 12 + (day.month - 1) - months
+    year, month = divmod(total, 12)
+    month += 1
+    return datetime.date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _ordinals(dates):
+    """datetime64[D] -> proleptic Gregorian ordinal (date.toordinal())."""
+    epoch_ordinal = datetime.date(1970, 1, 1).toordinal()
+    return dates.astype(np.int64).astype(np.float64) + epoch_ordinal
+
+
+def solve_grouped(stats, offsets, cutoffs):
+    """
+    Least-squares fit for every group × cutoff at once; group g is the days
+    [offsets[g], offsets[g + 1]) of `stats`, sorted by date.
+    Returns (slope, intercept, r2, n, start_index) arrays of shape (groups, cutoffs).
+    """
+    offsets = np.asarray(offsets)
+    sizes = np.diff(offsets)
+    groups = len(sizes)
+    x = _ordinals(stats.dates)
+    # Centre x on each group's last day for numerical stability; the slope is unaffected
+    x_ref = x[np.maximum(offsets[1:] - 1, 0)] if len(x) else np.zeros(groups)
+    xc = x - np.repeat(x_ref, sizes)
+    n, s, ss = stats.counts, stats.sums, stats.sumsqs
+    columns = np.vstack([n, n * xc, n * xc * xc, s, xc * s, ss])
+
+    # Window of group g for a cutoff: its days from the first one >= cutoff to the group's end
+    cutoffs = np.array(cutoffs, dtype="datetime64[D]")
+    start = np.empty((groups, len(cutoffs)), dtype=np.int64)
+    for g in range(groups):
+        lo, hi = offsets[g], offsets[g + 1]
+        start[g] = lo + np.searchsorted(stats.dates[lo:hi], cutoffs, side="left")
+    end = np.broadcast_to(offsets[1:, None], start.shape)
+
+    # Segment sums with one reduceat over interleaved (start, end) bounds; a trailing
+    # zero column keeps `end` a valid index, empty windows are zeroed below
+    padded = np.concatenate([columns, np.zeros((columns.shape[0], 1))], axis=1)
+    bounds = np.stack([start, end], axis=-1).ravel()
+    sums = np.add.reduceat(padded, bounds, axis=1)[:, ::2].reshape(columns.shape[0], groups, len(cutoffs))
+    sums[:, start >= end] = 0.0
+    N, Sx, Sxx, Sy, Sxy, Syy = sums
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sxx = Sxx - Sx * Sx / N
+        sxy = Sxy - Sx * Sy / N
+        ss_tot = Syy - Sy * Sy / N
+        # All points on one day: no trend (what LinearRegression returns too)
+        slope = np.where(sxx > 0, sxy / sxx, 0.0)
+        intercept_c = (Sy - slope * Sx) / N
+        ss_res = np.maximum(ss_tot - slope * sxy, 0.0)
+        r2 = np.where(ss_tot > 0, 1.0 - ss_res / ss_tot, np.where(ss_res > 0, 0.0, 1.0))
+
+    intercept = intercept_c - slope * x_ref[:, None]
+    return slope, intercept, r2, N.astype(np.int64), start
+
+
+def solve_windows(stats, cutoffs):
+    """
+    Least-squares fit for every cutoff at once.
+    Returns (slope, intercept, r2, n, start_index) arrays, one entry per cutoff.
+    """
+    return tuple(values[0] for values in solve_grouped(stats, [0, len(stats.dates)], cutoffs))
+
+
+def _fits(stats, cutoffs, windows, solved):
+    """[Fit or None, ...] for one group's DailyStats and its row of solve_grouped()."""
+    slope, intercept, r2, n, start = solved
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = stats.sums / stats.counts
+    fits = []
+    for i, (title, _) in enumerate(windows):
+        if n[i] < 2:
+            fits.append(None)
+            continue
+        fits.append(Fit(title, cutoffs[i], float(slope[i]), float(intercept[i]), float(r2[i]),
+                        int(n[i]), stats.dates[start[i]:], means[start[i]:]))
+    return fits
+
+
+def fit_windows(stats, end=REGRESSION_END, windows=WINDOWS):
+    """[Fit, ...] for each window; None where the window has fewer than two flights."""
+    cutoffs = [months_before(end, months) for _, months in windows]
+    fits = _fits(stats, cutoffs, windows, solve_windows(stats, cutoffs))
+    for (title, _), fit in zip(windows, fits):
+        if fit is None:
+            print(f"Not enough data for {title}")
+    return fits
+
+
+def fit_all_airlines(end=REGRESSION_END, windows=WINDOWS):
+    """
+    {airline code: [Fit or None, ...]} for every airline, from one grouped
+    query and one batched solve; each list is what fit_windows returns for
+    that airline.
+    """
+    airlines, stats, offsets = fetch_all_daily_stats()
+    cutoffs = [months_before(end, months) for _, months in windows]
+    slope, intercept, r2, n, start = solve_grouped(stats, offsets, cutoffs)
+    result = {}
+    for g, airline in enumerate(airlines):
+        lo, hi = offsets[g], offsets[g + 1]
+        group = DailyStats(*(values[lo:hi] for values in stats))
+        result[airline] = _fits(group, cutoffs, windows, (slope[g], intercept[g], r2[g], n[g], start[g] - lo))
+    return result
+
+
+def predict(fit, dates):
+    """Regression line values at `dates` (datetime64[D] array)."""
+    return fit.intercept + fit.slope * _ordinals(np.asarray(dates, dtype="datetime64[D]"))
@@ -0,0 +1,298 @@
+"""
+Aircraft rotations and knock-on (late-aircraft) delay, by tail number.
+
+    result = rotation.analyze("2019-01-01", "2019-12-31")
+    result.total.LateAircraftShare        # share of departure delay caused by the inbound leg
+    result.airlines[0], result.airports[0]   # worst first
+
+    python rotation.py 2019-01-01 2019-12-31 --budget-mb 256
+
+The legs of the date range are sorted by (tail number, scheduled departure).
+Within one tail every leg's predecessor is the row before it, so the rotation
+is built with one shift of the sorted arrays; no per-aircraft loop. A leg is
+linked to its predecessor when the aircraft arrived at the airport the leg
+leaves from, at most MAX_TURN_MINUTES before the scheduled departure:
+
+    turn          = scheduled departure - predecessor's scheduled arrival
+    slack         = max(turn - MIN_TURN_MINUTES, 0)
+    late aircraft = min(DepDelayMinutes, max(inbound ArrDelayMinutes - slack, 0))
+    own cause     = DepDelayMinutes - late aircraft
+    absorbed      = min(inbound ArrDelayMinutes, slack)
+
+Both times are local times of the connecting airport, so no time zone is
+needed. Cancelled legs did not fly and are left out; legs without a tail
+number or a scheduled time cannot be placed in a rotation and are skipped.
+
+Memory. The range is read in chunks of whole days, at most
+budget / BYTES_PER_LEG legs each (AIRLINE_ROTATION_BUDGET_MB). Each
+aircraft's last leg of a chunk is carried into the next one, so rotations
+running past a chunk boundary are still linked. Per-airline and per-airport
+sums are merged after every chunk; only those totals outlive it.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import columnar
+import db
+
+ROTATION_BUDGET_MB = float(os.environ.get("AIRLINE_ROTATION_BUDGET_MB", 256))
+# Compact leg arrays (36 B) plus the sort order, shifted copies and per-leg results
+BYTES_PER_LEG = 128
+
+MIN_TURN_MINUTES = 30      # ground time an on-time turn needs; the rest of the turn is slack
+MAX_TURN_MINUTES = 12 * 60  # longer gaps (overnight, maintenance) break the rotation
+
+DAY_COUNTS_QUERY = """
+SELECT f.FlightDate, COUNT(*) AS Legs
+FROM ops.Flights f
+WHERE {where}
+GROUP BY f.FlightDate
+ORDER BY f.FlightDate
+"""
+
+LEGS_QUERY = """
+SELECT f.TailNumber, f.FlightDate,
+       {dep} AS CRSDep, {arr} AS CRSArr,
+       f.DepDelayMinutes, f.ArrDelayMinutes,
+       f.ReportingAirlineID, f.OriginAirportSeqID, f.DestAirportSeqID
+FROM ops.Flights f
+WHERE {where}
+  AND COALESCE(f.Cancelled, 0) = 0
+  AND f.TailNumber IS NOT NULL AND f.TailNumber <> ''
+  AND f.CRSDepTime IS NOT NULL AND f.CRSArrTime IS NOT NULL
+"""
+
+LEG_DTYPES = {"FlightDate": "datetime64[D]", "CRSDep": np.float64, "CRSArr": np.float64,
+              "DepDelayMinutes": np.float64, "ArrDelayMinutes": np.float64,
+              "ReportingAirlineID": np.float64, "OriginAirportSeqID": np.float64,
+              "DestAirportSeqID": np.float64}
+
+# Per-group sums; see Metrics for the derived ratios
+SUMS = ("Legs", "Linked", "DelayMinutes", "LateAircraftMinutes", "OwnMinutes",
+        "PropagatedLegs", "InboundDelayMinutes", "AbsorbedMinutes", "TurnMinutes")
+
+Metrics = namedtuple("Metrics", ("Name",) + SUMS + ("LateAircraftShare", "AbsorptionRate", "AvgTurn"))
+Propagation = namedtuple("Propagation", ["first", "last", "total", "airlines", "airports",
+                                         "chunks", "max_chunk_legs", "seconds"])
+
+
+def _tail_keys(tails):
+    """Tail numbers as uint64 (first 8 ASCII bytes); equal tails get equal keys."""
+    return np.ascontiguousarray(tails.astype("S8")).view(">u8").astype(np.uint64)
+
+
+def _ids(values):
+    return np.nan_to_num(values, nan=-1).astype(np.int32)
+
+
+def _compact(batch):
+    """One fetched batch as the compact leg arrays the engine works on."""
+    day = batch["FlightDate"].astype(np.int64) * 1440
+    dep, arr = batch["CRSDep"], batch["CRSArr"]
+    return {
+        "tail": _tail_keys(batch["TailNumber"]),
+        "dep": (day + dep).astype(np.int32),                                   # minutes since 1970, local
+        "arr": (day + arr + np.where(arr < dep, 1440, 0)).astype(np.int32),   # past midnight: next day
+        "dep_delay": np.nan_to_num(batch["DepDelayMinutes"]).astype(np.float32),
+        "arr_delay": batch["ArrDelayMinutes"].astype(np.float32),              # NaN: diverted
+        "airline": _ids(batch["ReportingAirlineID"]),
+        "origin": _ids(batch["OriginAirportSeqID"]),
+        "dest": _ids(batch["DestAirportSeqID"]),
+    }
+
+
+def plan_chunks(first, last, max_legs):
+    """[(first day, last day, legs)]: consecutive days, at most `max_legs` legs per chunk unless one day has more."""
+    where, params = db.get_backend().flight_dates_between("f", first, last)
+    chunks = []
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(DAY_COUNTS_QUERY.format(where=where), tuple(params))
+        for day, legs in cursor.fetchall():
+            day, legs = db.to_date(day), int(legs)
+            if chunks and chunks[-1][2] + legs <= max_legs:
+                chunks[-1] = (chunks[-1][0], day, chunks[-1][2] + legs)
+            else:
+                chunks.append((day, day, legs))
+    return chunks
+
+
+def read_legs(first, last):
+    """The legs flown first..last as compact arrays (fetched in batches, converted as they arrive)."""
+    backend = db.get_backend()
+    where, params = backend.flight_dates_between("f", first, last)
+    sql = LEGS_QUERY.format(where=where, dep=backend.minute_of_day("f.CRSDepTime"),
+                            arr=backend.minute_of_day("f.CRSArrTime"))
+    parts = [_compact(batch) for batch in columnar.iter_column_batches(sql, params, LEG_DTYPES)]
+    if not parts:
+        empty = {name: np.array([], dtype=dtype) for name, dtype in LEG_DTYPES.items()}
+        parts = [_compact(dict(empty, TailNumber=np.array([], dtype=object)))]
+    return {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+
+
+def _concat(a, b):
+    return {name: np.concatenate([a[name], b[name]]) for name in b}
+
+
+def propagate(legs):
+    """
+    Sort `legs` by (tail, scheduled departure) in place and attribute every
+    leg's departure delay; returns {late_aircraft, own, linked, inbound,
+    absorbed, turn}, aligned with the sorted legs.
+    """
+    order = np.lexsort((legs["dep"], legs["tail"]))
+    for name in legs:
+        legs[name] = legs[name][order]
+    del order
+
+    tail = legs["tail"]
+    n = len(tail)
+    # Group shift: row i - 1 is the previous leg of the same aircraft when the tails match
+    linked = np.zeros(n, dtype=bool)
+    turn = np.zeros(n, dtype=np.float32)
+    inbound = np.zeros(n, dtype=np.float32)
+    if n > 1:
+        turn[1:] = legs["dep"][1:] - legs["arr"][:-1]
+        inbound[1:] = np.nan_to_num(legs["arr_delay"][:-1])
+        linked[1:] = ((tail[1:] == tail[:-1])
+                      & (legs["origin"][1:] == legs["dest"][:-1])
+                      & (turn[1:] >= 0) & (turn[1:] <= MAX_TURN_MINUTES))
+    turn[~linked] = 0
+    inbound[~linked] = 0
+
+    slack = np.maximum(turn - MIN_TURN_MINUTES, 0)
+    dep_delay = legs["dep_delay"]
+    late_aircraft = np.minimum(dep_delay, np.maximum(inbound - slack, 0))
+    return {"late_aircraft": late_aircraft, "own": dep_delay - late_aircraft, "linked": linked,
+            "inbound": inbound, "absorbed": np.minimum(inbound, slack), "turn": turn}
+
+
+class _Totals:
+    """Running SUMS per integer key (airline or airport ID), merged chunk by chunk."""
+
+    def __init__(self):
+        self.keys = np.array([], dtype=np.int64)
+        self.sums = np.zeros((0, len(SUMS)))
+
+    def add(self, keys, values, where):
+        uniq, inverse = np.unique(keys[where], return_inverse=True)
+        sums = np.column_stack([np.bincount(inverse, weights=values[name][where], minlength=len(uniq))
+                                for name in SUMS])
+        merged = np.union1d(self.keys, uniq)
+        total = np.zeros((len(merged), len(SUMS)))
+        total[np.searchsorted(merged, self.keys)] += self.sums
+        total[np.searchsorted(merged, uniq)] += sums
+        self.keys, self.sums = merged, total
+
+    def by_name(self, names):
+        """{name: sums}, adding up IDs that share a name (unknown IDs -> "Unknown")."""
+        grouped = {}
+        for key, sums in zip(self.keys.tolist(), self.sums):
+            name = names.get(key, "Unknown")
+            grouped[name] = grouped[name] + sums if name in grouped else sums.copy()
+        return grouped
+
+
+def _metrics(name, sums):
+    s = dict(zip(SUMS, (float(v) for v in sums)))
+    return Metrics(
+        name, *(int(s[k]) if k in ("Legs", "Linked", "PropagatedLegs") else s[k] for k in SUMS),
+        LateAircraftShare=s["LateAircraftMinutes"] / s["DelayMinutes"] if s["DelayMinutes"] else None,
+        AbsorptionRate=s["AbsorbedMinutes"] / s["InboundDelayMinutes"] if s["InboundDelayMinutes"] else None,
+        AvgTurn=s["TurnMinutes"] / s["Linked"] if s["Linked"] else None)
+
+
+def _names():
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT ReportingAirlineID, ReportingAirline FROM meta.ReportingAirline")
+        airlines = {int(i): name for i, name in cursor.fetchall() if i is not None}
+        cursor.execute("SELECT OriginAirportSeqID, Origin, OriginCityName FROM ops.Origin")
+        airports = {int(i): f"{code} ({city})" for i, code, city in cursor.fetchall() if i is not None}
+    return airlines, airports
+
+
+def analyze(first, last, budget_mb=ROTATION_BUDGET_MB):
+    """Propagation metrics for flights first..last, read in chunks that fit `budget_mb`."""
+    start = time.perf_counter()
+    max_legs = max(int(budget_mb * 2**20 // BYTES_PER_LEG), 1)
+    chunks = plan_chunks(first, last, max_legs)
+
+    airlines, airports = _Totals(), _Totals()
+    carry = None   # each aircraft's last leg of the previous chunk
+    for chunk_first, chunk_last, _ in chunks:
+        legs = read_legs(chunk_first, chunk_last)
+        legs["carried"] = np.zeros(len(legs["tail"]), dtype=bool)
+        if carry is not None:
+            # Only legs that can still link to a departure of this chunk
+            boundary = np.datetime64(chunk_first, "D").astype(np.int64) * 1440 - MAX_TURN_MINUTES
+            recent = carry["arr"] >= boundary
+            legs = _concat({name: values[recent] for name, values in carry.items()}, legs)
+
+        result = propagate(legs)
+        values = {
+            "Legs": np.ones(len(legs["tail"]), dtype=np.float32),
+            "Linked": result["linked"],
+            "DelayMinutes": legs["dep_delay"],
+            "LateAircraftMinutes": result["late_aircraft"],
+            "OwnMinutes": result["own"],
+            "PropagatedLegs": result["late_aircraft"] > 0,
+            "InboundDelayMinutes": result["inbound"],
+            "AbsorbedMinutes": result["absorbed"],
+            "TurnMinutes": result["turn"],
+        }
+        counted = ~legs["carried"]   # carried legs were counted in their own chunk
+        airlines.add(legs["airline"], values, counted)
+        airports.add(legs["origin"], values, counted)
+
+        last_leg = np.ones(len(legs["tail"]), dtype=bool)
+        last_leg[:-1] = legs["tail"][:-1] != legs["tail"][1:]
+        carry = {name: values[last_leg] for name, values in legs.items()}
+        carry["carried"][:] = True
+        del legs, result, values
+
+    airline_names, airport_names = _names()
+    by_airline = [_metrics(name, sums) for name, sums in airlines.by_name(airline_names).items()]
+    by_airport = [_metrics(name, sums) for name, sums in airports.by_name(airport_names).items()]
+    worst_first = lambda m: -m.LateAircraftMinutes
+    return Propagation(str(db.to_date(first)), str(db.to_date(last)),
+                       _metrics("All", airlines.sums.sum(axis=0)),
+                       sorted(by_airline, key=worst_first), sorted(by_airport, key=worst_first),
+                       len(chunks), max((legs for _, _, legs in chunks), default=0),
+                       time.perf_counter() - start)
+
+
+def _format(m):
+    share = f"{m.LateAircraftShare:.0%}" if m.LateAircraftShare is not None else "-"
+    absorbed = f"{m.AbsorptionRate:.0%}" if m.AbsorptionRate is not None else "-"
+    return (f"{m.Name:<32} {m.Legs:>10,} {m.Linked / m.Legs if m.Legs else 0:>7.0%} "
+            f"{m.DelayMinutes:>14,.0f} {share:>7} {absorbed:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("first", help="first flight date (YYYY-MM-DD)")
+    parser.add_argument("last", help="last flight date (YYYY-MM-DD)")
+    parser.add_argument("--budget-mb", type=float, default=ROTATION_BUDGET_MB,
+                        help=f"memory for one chunk of legs (default {ROTATION_BUDGET_MB:g})")
+    parser.add_argument("--top", type=int, default=10, help="airlines and airports to list")
+    args = parser.parse_args()
+
+    try:
+        result = analyze(args.first, args.last, args.budget_mb)
+    except Exception as e:
+        print("❌ Error analysing rotations:", e)
+        sys.exit(1)
+    print(f"{result.total.Legs:,} legs {result.first}..{result.last} in {result.chunks} chunks "
+          f"(largest {result.max_chunk_legs:,} legs), {result.seconds:.1f}s")
+    header = f"{'':<32} {'Legs':>10} {'Linked':>7} {'Delay min':>14} {'Late AC':>7} {'Absorbed':>9}"
+    for title, rows in (("Airlines", result.airlines), ("Airports", result.airports)):
+        print(f"\n{title} (most late-aircraft minutes first)\n{header}")
+        for m in rows[:args.top]:
+            print(_format(m))
+    print("\n" + _format(result.total))
@@ -0,0 +1,100 @@
+"""
+Client-side schedule index for the Flight Lookup window.
+
+"Load Times" fetches every scheduled leg of one carrier + flight number in a
+single query and indexes it by (airline, flight number, CRSDepTime). Picking
+a time and pressing Search is then answered from memory, and returns every
+FlightDate the flight operated at that time, not just one row. Legs without a
+scheduled departure time cannot be picked and are left out.
+"""
+import threading
+from collections import OrderedDict
+
+import db
+
+# Flights (airline + number) kept in memory, least recently used dropped first
+MAX_FLIGHTS = 64
+
+SCHEDULE_QUERY = """
+SELECT
+    CONCAT(ra.ReportingAirline, ' ', f.FlightNumberReportingAirline) AS FullFlightNumber,
+    f.CRSDepTime,
+    f.FlightDate,
+    o.OriginStateName AS Origin,
+    d.DestStateName AS Destination,
+    f.ArrTime AS ScheduledArrival,
+    CASE
+        WHEN f.DepDelayMinutes IS NULL OR f.DepDelayMinutes <= 15 THEN 'On-time'
+        ELSE 'Delayed'
+    END AS Status
+FROM ops.Flights f
+JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID
+LEFT JOIN ops.Origin o ON f.OriginAirportSeqID = o.OriginAirportSeqID
+LEFT JOIN ops.Destination d ON f.DestAirportSeqID = d.DestAirportSeqID
+WHERE ra.ReportingAirline = ?
+  AND f.FlightNumberReportingAirline = ?
+  AND f.CRSDepTime IS NOT NULL
+ORDER BY f.CRSDepTime, f.FlightDate DESC
+"""
+
+
+class ScheduleIndex:
+    def __init__(self, max_flights=MAX_FLIGHTS):
+        self.max_flights = max_flights
+        self._flights = OrderedDict()   # (airline, number) -> {CRSDepTime: [leg, ...]}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(airline, number):
+        return airline.strip().upper(), int(number)
+
+    def load(self, airline, number):
+        """Fetch all legs of the flight (one round trip) and index them. Returns the sorted times."""
+        key = self._key(airline, number)
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SCHEDULE_QUERY, key)
+            rows = cursor.fetchall()
+
+        by_time = {}
+        for row in rows:
+            by_time.setdefault(db.to_time(row.CRSDepTime), []).append({
+                "FlightNumber": row.FullFlightNumber,
+                "FlightDate": row.FlightDate,
+                "Origin": row.Origin,
+                "Destination": row.Destination,
+                "ScheduledArrival": row.ScheduledArrival,
+                "Status": row.Status,
+            })
+
+        with self._lock:
+            self._flights[key] = by_time
+            self._flights.move_to_end(key)
+            while len(self._flights) > self.max_flights:
+                self._flights.popitem(last=False)
+        return sorted(by_time)
+
+    def is_loaded(self, airline, number):
+        with self._lock:
+            return self._key(airline, number) in self._flights
+
+    def times(self, airline, number):
+        with self._lock:
+            return sorted(self._flights.get(self._key(airline, number), {}))
+
+    def clear(self):
+        """Forget every loaded flight (new data may have added legs to any of them)."""
+        with self._lock:
+            self._flights.clear()
+
+    def lookup(self, airline, number, crs_time):
+        """Every leg at that scheduled departure time, most recent FlightDate first."""
+        with self._lock:
+            by_time = self._flights.get(self._key(airline, number))
+            if by_time is None:
+                raise KeyError(f"{airline} {number} has not been loaded")
+            self._flights.move_to_end(self._key(airline, number))
+            return list(by_time.get(db.to_time(crs_time), []))
+
+
+default_index = ScheduleIndex()
@@ -0,0 +1,348 @@
+"""
+Per-query instrumentation for every `db.connection()` borrow.
+
+Each statement executed on a borrowed connection is recorded with:
+  connect   time to get the connection from the pool (charged to the first statement)
+  execute   time inside cursor.execute
+  fetch     time inside fetchone / fetchmany / fetchall / columnar batches
+  rows      rows handed back to the caller
+  bytes     estimated payload size (first row's size × rows; ndarray.nbytes for batches)
+
+and labelled with the calling function (e.g. "regression.fetch_daily_stats")
+and the shape of its parameters (e.g. "(str, int, time)").
+
+A rolling window of recent latencies is kept per label for the histograms in
+`report()` and the app's Diagnostics window. Statements slower than
+SLOW_QUERY_MS are appended, with SQL and parameters, to SLOW_QUERY_LOG as one
+JSON object per line.
+
+Environment:
+  AIRLINE_TELEMETRY=0          turn recording off
+  AIRLINE_SLOW_QUERY_MS=500    slow-query threshold
+  AIRLINE_SLOW_QUERY_LOG=path  slow-query log (default: slow_queries.log next to this file)
+"""
+import datetime
+import decimal
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+ENABLED = os.environ.get("AIRLINE_TELEMETRY", "1") != "0"
+SLOW_QUERY_MS = float(os.environ.get("AIRLINE_SLOW_QUERY_MS", "500"))
+SLOW_QUERY_LOG = os.environ.get(
+    "AIRLINE_SLOW_QUERY_LOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "slow_queries.log"))
+
+HISTORY = 1000          # latencies kept per label for the rolling histogram
+RECENT_SLOW = 50        # slow queries kept in memory for the Diagnostics window
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Frames in these modules are plumbing; the label is the first caller outside them
+_PLUMBING = {__name__, "db", "columnar", "duckdb_backend", "contextlib", "cache"}
+
+
+def _caller():
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_globals.get("__name__") in _PLUMBING:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+
+
+def _shape(params):
+    return "(" + ", ".join("null" if p is None else type(p).__name__ for p in params) + ")"
+
+
+_FIXED_SIZES = {int: 8, float: 8, bool: 1, datetime.date: 4, datetime.time: 5,
+                datetime.datetime: 8, decimal.Decimal: 9}
+
+
+def _row_bytes(row):
+    size = 0
+    for value in row:
+        if isinstance(value, (str, bytes)):
+            size += len(value)
+        elif value is not None:
+            size += _FIXED_SIZES.get(type(value), 8)
+    return size
+
+
+class QueryStats:
+    """Totals and a rolling latency window for one label."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.connect = 0.0
+        self.execute = 0.0
+        self.fetch = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.latencies_ms = deque(maxlen=HISTORY)
+        self.shapes = set()
+
+    def percentile(self, q):
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    def histogram(self):
+        """[(upper bound ms, count), ...] over the rolling window; the last bound is inf."""
+        counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        for ms in self.latencies_ms:
+            i = 0
+            while i < len(HISTOGRAM_BUCKETS_MS) and ms > HISTOGRAM_BUCKETS_MS[i]:
+                i += 1
+            counts[i] += 1
+        return list(zip(HISTOGRAM_BUCKETS_MS + (float("inf"),), counts))
+
+
+class Recorder:
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS, slow_query_log=SLOW_QUERY_LOG):
+        self.enabled = ENABLED
+        self.slow_query_ms = slow_query_ms
+        self.slow_query_log = slow_query_log
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._slow = deque(maxlen=RECENT_SLOW)
+
+    def record(self, query):
+        total_ms = (query.connect + query.execute + query.fetch) * 1000
+        with self._lock:
+            stats = self._stats.setdefault(query.label, QueryStats())
+            stats.calls += 1
+            stats.errors += query.error is not None
+            stats.connect += query.connect
+            stats.execute += query.execute
+            stats.fetch += query.fetch
+            stats.rows += query.rows
+            stats.bytes += query.bytes
+            stats.latencies_ms.append(total_ms)
+            stats.shapes.add(query.shape)
+
+        if total_ms >= self.slow_query_ms:
+            entry = {
+                "at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "label": query.label,
+                "total_ms": round(total_ms, 1),
+                "connect_ms": round(query.connect * 1000, 1),
+                "execute_ms": round(query.execute * 1000, 1),
+                "fetch_ms": round(query.fetch * 1000, 1),
+                "rows": query.rows,
+                "sql": " ".join(query.sql.split()),
+                "params": [repr(p) for p in query.params],
+                "error": query.error,
+            }
+            with self._lock:
+                self._slow.append(entry)
+            try:
+                with open(self.slow_query_log, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print("❌ Could not write slow-query log:", e)
+
+    def snapshot(self):
+        """label -> dict of totals and percentiles, for reports and the Diagnostics window."""
+        with self._lock:
+            items = list(self._stats.items())
+            out = {}
+            for label, s in items:
+                out[label] = {
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "p50_ms": s.percentile(50),
+                    "p95_ms": s.percentile(95),
+                    "max_ms": max(s.latencies_ms, default=0.0),
+                    "avg_connect_ms": s.connect / s.calls * 1000,
+                    "avg_execute_ms": s.execute / s.calls * 1000,
+                    "avg_fetch_ms": s.fetch / s.calls * 1000,
+                    "rows": s.rows,
+                    "bytes": s.bytes,
+                    "shapes": sorted(s.shapes),
+                    "histogram": s.histogram(),
+                }
+        return out
+
+    def slow_queries(self):
+        with self._lock:
+            return list(self._slow)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+
+
+recorder = Recorder()
+
+
+class _Query:
+    __slots__ = ("label", "shape", "sql", "params", "connect", "execute", "fetch", "rows", "bytes", "error")
+
+    def __init__(self, label, sql, params, connect):
+        self.label = label
+        self.shape = _shape(params)
+        self.sql = sql
+        self.params = params
+        self.connect = connect
+        self.execute = 0.0
+        self.fetch = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.error = None
+
+
+class _Cursor:
+    """Times execute and fetch calls; everything else passes through to the driver cursor."""
+
+    def __init__(self, cursor, conn):
+        self._cursor = cursor
+        self._conn = conn
+        self._query = None
+
+    def _finish(self):
+        if self._query is not None:
+            self._conn._recorder.record(self._query)
+            self._query = None
+
+    def execute(self, sql, params=()):
+        self._finish()
+        params = tuple(params)
+        query = self._query = _Query(_caller(), sql, params, self._conn._take_connect_time())
+        start = time.perf_counter()
+        try:
+            self._cursor.execute(sql, params)
+        except Exception as e:
+            query.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            query.execute = time.perf_counter() - start
+        return self
+
+    def _fetched(self, start, rows):
+        if self._query is not None:
+            self._query.fetch += time.perf_counter() - start
+            if rows:
+                self._query.rows += len(rows)
+                self._query.bytes += _row_bytes(rows[0]) * len(rows)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(start, [row] if row is not None else [])
+        return row
+
+    def fetchmany(self, *args):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(*args)
+        self._fetched(start, rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(start, rows)
+        return rows
+
+    def _numpy_batches(self, native):
+        def batches(batch_size):
+            it = native(batch_size)
+            while True:
+                start = time.perf_counter()
+                batch = next(it, None)
+                if self._query is not None:
+                    self._query.fetch += time.perf_counter() - start
+                if batch is None:
+                    return
+                if self._query is not None and batch:
+                    self._query.rows += len(next(iter(batch.values())))
+                    self._query.bytes += sum(values.nbytes for values in batch.values())
+                yield batch
+        return batches
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)   # AttributeError if the driver has no such method
+        if name == "fetch_numpy_batches":
+            return self._numpy_batches(attr)
+        return attr
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+class _Connection:
+    def __init__(self, conn, connect_time, recorder):
+        self._conn = conn
+        self._connect_time = connect_time
+        self._recorder = recorder
+        self._cursors = []
+
+    def _take_connect_time(self):
+        connect, self._connect_time = self._connect_time, 0.0
+        return connect
+
+    def cursor(self):
+        cursor = _Cursor(self._conn.cursor(), self)
+        self._cursors.append(cursor)
+        return cursor
+
+    def _finish(self):
+        for cursor in self._cursors:
+            cursor._finish()
+        self._cursors.clear()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+@contextmanager
+def instrumented(open_connection, recorder=recorder):
+    """Wrap a connection context manager so every statement on it is recorded."""
+    if not recorder.enabled:
+        with open_connection() as conn:
+            yield conn
+        return
+    start = time.perf_counter()
+    with open_connection() as conn:
+        wrapped = _Connection(conn, time.perf_counter() - start, recorder)
+        try:
+            yield wrapped
+        finally:
+            wrapped._finish()
+
+
+def _format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def report(histograms=True):
+    """Plain-text report of everything recorded so far, slowest median first."""
+    snapshot = recorder.snapshot()
+    lines = [f"{'query':56s} {'calls':>6s} {'err':>4s} {'p50 ms':>9s} {'p95 ms':>9s} {'max ms':>9s} "
+             f"{'connect':>8s} {'execute':>8s} {'fetch':>8s} {'rows':>10s} {'bytes':>10s}"]
+    for label, s in sorted(snapshot.items(), key=lambda item: -item[1]["p50_ms"]):
+        lines.append(f"{label[:56]:56s} {s['calls']:6d} {s['errors']:4d} {s['p50_ms']:9.1f} {s['p95_ms']:9.1f} "
+                     f"{s['max_ms']:9.1f} {s['avg_connect_ms']:8.1f} {s['avg_execute_ms']:8.1f} "
+                     f"{s['avg_fetch_ms']:8.1f} {s['rows']:10d} {_format_bytes(s['bytes']):>10s}")
+        if histograms:
+            lines.append("    shapes: " + ", ".join(s["shapes"]))
+            lines.append("    " + "  ".join(f"≤{bound:g}:{count}" for bound, count in s["histogram"] if count))
+    slow = recorder.slow_queries()
+    if slow:
+        lines.append(f"\nSlow queries (≥ {recorder.slow_query_ms:g} ms), most recent last:")
+        for entry in slow:
+            lines.append(f"  {entry['at']}  {entry['total_ms']:8.1f} ms  {entry['label']}  {entry['sql'][:80]}")
+    return "\n".join(lines)
+
+
+def dump_report(path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(report() + "\n")
@@ -0,0 +1,138 @@
+"""
+The app's modules against DuckDB over small Parquet datasets.
+
+    python -m pytest tests
+
+- sample:    the shipped Airline_Normalization(3NF).csv, converted to Parquet
+- generated: 20,000 synthetic flights 2002-2020 (benchmarks/generate.py, seed 0)
+- orphans:   the generated flights with three origin airports missing from
+             ops.Origin and two others whose city is NULL
+
+Each fixture makes its dataset the active backend, with the result caches,
+incremental views and cube emptied, and the disk cache in a temp directory.
+"""
+import os
+import shutil
+import sys
+
+import pytest
+
+GIT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, GIT_DIR)
+
+import duckdb
+
+import cache
+import cube
+import db
+import disk_cache
+import incremental
+from benchmarks import generate
+from duckdb_backend import DuckDBBackend, convert_csv_to_parquet
+
+GENERATED_ROWS = 20_000
+MISSING_AIRPORTS = 3
+NULL_CITY_AIRPORTS = 2
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _disk_cache_dir(tmp_path_factory):
+    disk_cache.CACHE_DIR = str(tmp_path_factory.mktemp("result_cache"))
+
+
+@pytest.fixture(scope="session")
+def sample_dir(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("sample"))
+    convert_csv_to_parquet(generate.SAMPLE_CSV, root)
+    return root
+
+
+@pytest.fixture(scope="session")
+def generated_dir(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("generated"))
+    generate.generate(GENERATED_ROWS, root, seed=0)
+    return root
+
+
+@pytest.fixture(scope="session")
+def orphans_dir(tmp_path_factory, generated_dir):
+    root = str(tmp_path_factory.mktemp("orphans"))
+    shutil.copytree(os.path.join(generated_dir, "flights"), os.path.join(root, "flights"))
+    for name in ("destination", "reporting_airline"):
+        shutil.copy(os.path.join(generated_dir, f"{name}.parquet"), root)
+    # The most used airports first, so the orphans have flights in most slices
+    origin = os.path.join(generated_dir, "origin.parquet")
+    duckdb.execute(f"""
+        COPY (
+            WITH ranked AS (
+                SELECT o.*, row_number() OVER (ORDER BY n DESC, o.OriginAirportSeqID) AS r
+                FROM read_parquet('{origin}') o
+                JOIN (SELECT OriginAirportSeqID, COUNT(*) AS n
+                      FROM read_parquet('{os.path.join(generated_dir, "flights", "*", "*", "*.parquet")}')
+                      GROUP BY OriginAirportSeqID) f USING (OriginAirportSeqID))
+            SELECT * EXCLUDE (r) REPLACE (
+                       CASE WHEN r <= {MISSING_AIRPORTS + NULL_CITY_AIRPORTS} THEN NULL
+                            ELSE OriginCityName END AS OriginCityName)
+            FROM ranked WHERE r > {MISSING_AIRPORTS}
+        ) TO '{os.path.join(root, "origin.parquet")}' (FORMAT PARQUET)
+    """)
+    return root
+
+
+def _activate(root):
+    db.set_backend(DuckDBBackend(root))
+    cache.default_cache.invalidate()
+    cube.default_cube.clear()
+    for view in incremental._views:
+        view.clear()
+    incremental._recent = None
+    incremental._last_watermark = None
+
+
+@pytest.fixture
+def sample(sample_dir):
+    _activate(sample_dir)
+    return sample_dir
+
+
+@pytest.fixture
+def generated(generated_dir):
+    _activate(generated_dir)
+    return generated_dir
+
+
+@pytest.fixture
+def orphans(orphans_dir):
+    _activate(orphans_dir)
+    return orphans_dir
+
+
+def query(sql, params=()):
+    """All rows of `sql` on the active backend."""
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, tuple(params))
+        return cursor.fetchall()
+
+
+def comparison_filters(airlines=4, cities=5, dates=3):
+    """
+    (airline, city, date) filters for the Compare window: the busiest airlines,
+    cities and days, an unknown value of each, and "any" for every field.
+    """
+    def top(sql):
+        return [row[0] for row in query(sql)]
+    airline_values = top(f"""
+        SELECT ra.ReportingAirline FROM ops.Flights f
+        JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID
+        GROUP BY ra.ReportingAirline ORDER BY COUNT(*) DESC, 1 LIMIT {airlines}""")
+    city_values = top(f"""
+        SELECT o.OriginCityName FROM ops.Flights f
+        JOIN ops.Origin o ON f.OriginAirportSeqID = o.OriginAirportSeqID
+        WHERE o.OriginCityName IS NOT NULL
+        GROUP BY o.OriginCityName ORDER BY COUNT(*) DESC, 1 LIMIT {cities}""")
+    date_values = [str(day) for day in top(f"""
+        SELECT FlightDate FROM ops.Flights GROUP BY FlightDate ORDER BY COUNT(*) DESC, 1 LIMIT {dates}""")]
+    return [(a, c, d) for a in airline_values + ["ZZ", None]
+            for c in city_values + ["Nowhere", None]
+            for d in date_values + ["1999-01-01", None]]
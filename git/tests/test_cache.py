@@ -0,0 +1,94 @@
+import threading
+
+import cache
+from conftest import query
+
+CALLERS = 8
+
+
+def _held_query(started, release, calls):
+    """A query that counts its executions and blocks until `release` is set."""
+    def call():
+        calls.append(threading.get_ident())
+        started.set()
+        release.wait(10)
+        return [row[0] for row in query("SELECT DISTINCT IATACodeReportingAirline FROM ops.Flights ORDER BY 1")]
+    return call
+
+
+def _in_threads(fn, count):
+    results = [None] * count
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, fn())) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_calls_share_one_query(sample):
+    results_cache = cache.ResultCache()
+    started, release, calls = threading.Event(), threading.Event(), []
+    call = _held_query(started, release, calls)
+    key = ("airlines", (), ())
+
+    threads, results = _in_threads(lambda: results_cache.get_or_call(key, None, call), CALLERS)
+    assert started.wait(10)
+    while results_cache.stats()["shared"] < CALLERS - 1:
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(calls) == 1
+    assert all(result == results[0] for result in results) and results[0]
+    assert results_cache.get_or_call(key, None, call) == results[0]
+    assert len(calls) == 1
+    assert results_cache.stats()["functions"]["airlines"] == {"hits": 1, "misses": 1, "shared": CALLERS - 1}
+
+
+def test_results_are_copies(sample):
+    results_cache = cache.ResultCache()
+    key = ("airlines", (), ())
+    call = lambda: [row[0] for row in query("SELECT DISTINCT IATACodeReportingAirline FROM ops.Flights")]
+    first = results_cache.get_or_call(key, None, call)
+    first.append("XX")
+    assert "XX" not in results_cache.get_or_call(key, None, call)
+
+
+def test_invalidated_call_is_not_stored(sample):
+    results_cache = cache.ResultCache()
+    started, release, calls = threading.Event(), threading.Event(), []
+    call = _held_query(started, release, calls)
+    key = ("airlines", (), ())
+
+    threads, results = _in_threads(lambda: results_cache.get_or_call(key, None, call), 1)
+    assert started.wait(10)
+    assert results_cache.invalidate() == 0   # nothing stored yet; the running call is marked stale
+    release.set()
+    threads[0].join(10)
+
+    assert results[0]                        # the running call still answers its caller
+    assert results_cache.stats()["size"] == 0
+    results_cache.get_or_call(key, None, call)
+    assert len(calls) == 2                   # the next caller queries again
+    assert results_cache.stats()["size"] == 1
+
+
+def test_caller_after_invalidation_starts_a_new_call(sample):
+    results_cache = cache.ResultCache()
+    started, release, calls = threading.Event(), threading.Event(), []
+    call = _held_query(started, release, calls)
+    key = ("airlines", (), ())
+
+    first, _ = _in_threads(lambda: results_cache.get_or_call(key, None, call), 1)
+    assert started.wait(10)
+    results_cache.invalidate(lambda k: k[0] == "airlines")
+    second, _ = _in_threads(lambda: results_cache.get_or_call(key, None, call), 1)
+    while len(calls) < 2:
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in first + second:
+        thread.join(10)
+
+    assert len(calls) == 2
+    assert results_cache.stats()["functions"]["airlines"]["shared"] == 0
+    assert results_cache.stats()["size"] == 1   # only the call started after the invalidation is kept
@@ -0,0 +1,42 @@
+import pytest
+
+import compare_batch
+import FinalDataBaseApplication as app
+from conftest import comparison_filters
+
+
+def _per_call(filters):
+    return [app._fetch_avg_delay.uncached(*f) for f in filters]
+
+
+def _assert_same(batch, single):
+    assert batch.TotalFlights == single["TotalFlights"]
+    assert batch.AirportTraffic == single["AirportTraffic"]
+    if single["AvgDelay"] is None:
+        assert batch.AvgDelay is None
+    else:
+        assert batch.AvgDelay == pytest.approx(single["AvgDelay"], rel=1e-9)
+
+
+@pytest.mark.parametrize("dataset", ["sample", "generated", "orphans"])
+def test_batch_matches_per_call(dataset, request):
+    request.getfixturevalue(dataset)
+    filters = comparison_filters()
+    results = compare_batch.compare([compare_batch.normalize(*f) for f in filters])
+    assert len(results) == len(filters)
+    for f, batch, single in zip(filters, results, _per_call(filters)):
+        assert (batch.Airline, batch.City, batch.Date) == tuple(v or "" for v in f)
+        _assert_same(batch, single)
+    assert any(r.TotalFlights for r in results if r.Airline and r.City and r.Date)
+
+
+def test_each_grouping_pattern_on_its_own(generated):
+    # One grouping set per query, and the IN pre-filters that only apply then
+    filters = comparison_filters(airlines=2, cities=2, dates=2)
+    patterns = {}
+    for f in filters:
+        patterns.setdefault(tuple(v is not None for v in f), []).append(f)
+    for group in patterns.values():
+        results = compare_batch.compare([compare_batch.normalize(*f) for f in group])
+        for batch, single in zip(results, _per_call(group)):
+            _assert_same(batch, single)
@@ -0,0 +1,54 @@
+import pytest
+
+import cube
+import FinalDataBaseApplication as app
+from conftest import comparison_filters, query
+
+# Small enough that the generated data's cube falls back to months
+MONTH_BUDGET_MB = 5
+
+
+def _assert_same(answer, single):
+    assert answer["TotalFlights"] == single["TotalFlights"]
+    assert answer["AirportTraffic"] == single["AirportTraffic"]
+    if single["AvgDelay"] is None:
+        assert answer["AvgDelay"] is None
+    else:
+        assert answer["AvgDelay"] == pytest.approx(single["AvgDelay"], rel=1e-9)
+
+
+@pytest.mark.parametrize("dataset", ["sample", "generated", "orphans"])
+def test_cube_matches_per_call(dataset, request):
+    request.getfixturevalue(dataset)
+    day_cube = cube.build()
+    assert day_cube.grain == "day"
+    for f in comparison_filters():
+        _assert_same(day_cube.answer(*f), app._fetch_avg_delay.uncached(*f))
+
+
+def test_monthly_cube_answers_undated_filters_only(generated):
+    month_cube = cube.build(budget_mb=MONTH_BUDGET_MB)
+    assert month_cube.grain == "month"
+    for f in comparison_filters():
+        answer = month_cube.answer(*f)
+        if f[2] is not None:
+            assert answer is None
+        else:
+            _assert_same(answer, app._fetch_avg_delay.uncached(*f))
+
+
+def test_orphan_airports_count_apart_from_null_city_airports(orphans):
+    orphan_ids = {row[0] for row in query("""
+        SELECT DISTINCT f.OriginAirportSeqID FROM ops.Flights f
+        LEFT JOIN ops.Origin o ON f.OriginAirportSeqID = o.OriginAirportSeqID
+        WHERE o.OriginAirportSeqID IS NULL""")}
+    null_city_ids = {row[0] for row in query("SELECT OriginAirportSeqID FROM ops.Origin WHERE OriginCityName IS NULL")}
+    assert orphan_ids and null_city_ids
+
+    all_airports = query("SELECT COUNT(DISTINCT OriginAirportSeqID) FROM ops.Flights")[0][0]
+    for budget in (cube.CUBE_BUDGET_MB, MONTH_BUDGET_MB):
+        built = cube.build(budget_mb=budget)
+        assert built.answer()["AirportTraffic"] == all_airports
+        # Per airline too: each orphan and NULL-city airport has its own bit
+        for (airline,) in query("SELECT ReportingAirline FROM meta.ReportingAirline"):
+            _assert_same(built.answer(airline), app._fetch_avg_delay.uncached(airline, None, None))
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+import regression
+from conftest import query
+
+FLIGHTS_QUERY = """
+SELECT ra.ReportingAirline, f.FlightDate, f.ArrDelayMinutes
+FROM ops.Flights f
+JOIN meta.ReportingAirline ra ON f.ReportingAirlineID = ra.ReportingAirlineID
+WHERE f.ArrDelayMinutes IS NOT NULL
+"""
+
+
+def _flights():
+    """{airline: (date ordinals, delays)}, one point per flight."""
+    points = {}
+    for airline, day, delay in query(FLIGHTS_QUERY):
+        x, y = points.setdefault(airline, ([], []))
+        x.append(day.toordinal())
+        y.append(float(delay))
+    return {airline: (np.array(x, dtype=float), np.array(y)) for airline, (x, y) in points.items()}
+
+
+def _polyfit(x, y):
+    slope, intercept = np.polyfit(x, y, 1)
+    residual = y - (slope * x + intercept)
+    ss_tot = ((y - y.mean()) ** 2).sum()
+    return slope, intercept, 1.0 - (residual ** 2).sum() / ss_tot
+
+
+def _check(fit, x, y, cutoff):
+    inside = x >= cutoff.toordinal()
+    if inside.sum() < 2:
+        assert fit is None
+        return
+    slope, intercept, r2 = _polyfit(x[inside], y[inside])
+    assert fit.n == inside.sum()
+    assert fit.slope == pytest.approx(slope, rel=1e-6, abs=1e-9)
+    assert fit.intercept == pytest.approx(intercept, rel=1e-6, abs=1e-6)
+    assert fit.r2 == pytest.approx(r2, rel=1e-6, abs=1e-9)
+
+
+def test_batched_fits_match_polyfit_on_every_flight(generated):
+    flights = _flights()
+    fits = regression.fit_all_airlines()
+    assert set(fits) == set(flights)
+    cutoffs = [regression.months_before(regression.REGRESSION_END, months) for _, months in regression.WINDOWS]
+    checked = 0
+    for airline, windows in fits.items():
+        x, y = flights[airline]
+        for fit, cutoff in zip(windows, cutoffs):
+            _check(fit, x, y, cutoff)
+            checked += fit is not None
+    assert checked >= len(fits)
+
+
+def test_per_airline_fit_matches_batched_fit(generated):
+    batched = regression.fit_all_airlines()
+    for airline, windows in batched.items():
+        single = regression.fit_windows(regression.fetch_daily_stats(airline))
+        for a, b in zip(single, windows):
+            if a is None or b is None:
+                assert a is b
+                continue
+            assert (a.title, a.start, a.n) == (b.title, b.start, b.n)
+            assert a.slope == pytest.approx(b.slope, rel=1e-9, abs=1e-12)
+            assert a.intercept == pytest.approx(b.intercept, rel=1e-9, abs=1e-9)
+            assert a.r2 == pytest.approx(b.r2, rel=1e-9, abs=1e-12)
+            np.testing.assert_array_equal(a.dates, b.dates)
+            np.testing.assert_allclose(a.means, b.means)
+
+
+def test_sample_data_fits(sample):
+    flights = _flights()
+    cutoffs = [regression.months_before(regression.REGRESSION_END, months) for _, months in regression.WINDOWS]
+    for airline, windows in regression.fit_all_airlines().items():
+        x, y = flights[airline]
+        for fit, cutoff in zip(windows, cutoffs):
+            _check(fit, x, y, cutoff)
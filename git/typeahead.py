@@ -0,0 +1,227 @@
+"""
+Type-ahead pickers for large dimension lists (cities, dates, flight numbers).
+
+    cities = typeahead.Source(load_all=fetch_all_cities, query_prefix=fetch_cities_like)
+    entry = typeahead.TypeAheadEntry(win, cities, on_select=run_comparison)
+    entry.pack()
+
+A Source answers "top N values starting with <prefix>". The first lookup
+starts loading the full list into a sorted PrefixIndex on a side thread and is
+answered by `query_prefix` (a server-side range / LIKE 'prefix%' query on an
+indexed column) meanwhile; once the index is built every lookup is a binary
+search in memory. A Source can hold one index per context, e.g. flight numbers
+per airline.
+
+TypeAheadEntry waits DEBOUNCE_MS after the last keystroke, runs the lookup
+through the background runner (a newer keystroke supersedes a pending one) and
+shows the matches in a list under the entry. Up/Down/Return/Escape and clicks
+pick a value.
+"""
+import bisect
+import datetime
+import threading
+import tkinter as tk
+
+import background
+
+TOP_N = 15
+DEBOUNCE_MS = 200
+
+
+class PrefixIndex:
+    """Case-insensitive prefix search over a fixed set of strings."""
+
+    def __init__(self, values, descending=False):
+        pairs = sorted((v.casefold(), v) for v in {str(v) for v in values if v is not None})
+        self._keys = [key for key, _ in pairs]
+        self._values = [value for _, value in pairs]
+        self.descending = descending
+
+    def __len__(self):
+        return len(self._values)
+
+    def search(self, prefix, limit=TOP_N):
+        prefix = prefix.casefold()
+        lo = bisect.bisect_left(self._keys, prefix)
+        hi = bisect.bisect_left(self._keys, prefix + "\U0010ffff", lo)
+        if self.descending:
+            return self._values[max(lo, hi - limit):hi][::-1]
+        return self._values[lo:min(hi, lo + limit)]
+
+
+class Source:
+    """
+    Suggestions for one picker.
+
+    load_all(context)                    -> every value (builds the in-memory index)
+    query_prefix(prefix, limit, context) -> up to `limit` values, used until the index is ready
+    """
+
+    def __init__(self, load_all, query_prefix, descending=False):
+        self._load_all = load_all
+        self._query_prefix = query_prefix
+        self.descending = descending
+        self._indexes = {}
+        self._building = set()
+        self._generation = 0   # bumped by clear(); builds started before it are discarded
+        self._lock = threading.Lock()
+
+    def _build(self, context, generation):
+        try:
+            index = PrefixIndex(self._load_all(context), self.descending)
+        except Exception as e:
+            print("❌ Error building type-ahead index:", e)
+            index = None
+        with self._lock:
+            if generation != self._generation:
+                return   # the data changed while loading: this index may be stale
+            self._building.discard(context)
+            if index is not None:
+                self._indexes[context] = index
+
+    def lookup(self, prefix, limit=TOP_N, context=None):
+        with self._lock:
+            index = self._indexes.get(context)
+            if index is None and context not in self._building:
+                self._building.add(context)
+                threading.Thread(target=self._build, args=(context, self._generation), daemon=True,
+                                 name="typeahead-index").start()
+        if index is not None:
+            return index.search(prefix, limit)
+        return [str(v) for v in self._query_prefix(prefix, limit, context)]
+
+    def clear(self):
+        """Drop the in-memory indexes (the data changed); the next lookup rebuilds them."""
+        with self._lock:
+            self._generation += 1
+            self._indexes.clear()
+            self._building.clear()
+
+
+def like_prefix(prefix):
+    """Escape a user-typed prefix for `LIKE ? ESCAPE '\\'`."""
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def int_prefix_ranges(prefix, max_digits):
+    """[(lo, hi), ...] inclusive ranges of the integers (≤ max_digits digits) whose decimal form starts with `prefix`."""
+    if not prefix.isdigit():
+        return []
+    if prefix.startswith("0"):
+        return [(0, 0)] if prefix == "0" else []   # no other number is written with a leading 0
+    ranges = []
+    for extra in range(max_digits - len(prefix) + 1):
+        lo = int(prefix) * 10 ** extra
+        ranges.append((lo, lo + 10 ** extra - 1))
+    return ranges
+
+
+def date_prefix_range(prefix):
+    """
+    (first, last) datetime.date bounding every ISO date that starts with `prefix`
+    (whole years, or one month once the month is complete), or None if the
+    prefix cannot start a date. Callers still filter on the exact prefix.
+    """
+    if not prefix or not all(c.isdigit() or c == "-" for c in prefix):
+        return None
+    year = prefix[:4]
+    if not year.isdigit():
+        return None
+    first_year = max(1, int(year.ljust(4, "0")))
+    last_year = int(year.ljust(4, "9"))
+    if len(prefix) >= 7 and prefix[5:7].isdigit() and 1 <= int(prefix[5:7]) <= 12:
+        month = int(prefix[5:7])
+        after = datetime.date(first_year + month // 12, month % 12 + 1, 1)
+        return datetime.date(first_year, month, 1), after - datetime.timedelta(days=1)
+    return datetime.date(first_year, 1, 1), datetime.date(last_year, 12, 31)
+
+
+class TypeAheadEntry(tk.Frame):
+    """An Entry that suggests values from a Source as the user types."""
+
+    def __init__(self, master, source, on_select=None, context=None, limit=TOP_N,
+                 debounce_ms=DEBOUNCE_MS, textvariable=None, **entry_opts):
+        super().__init__(master, bg=entry_opts.pop("bg", master.cget("bg")))
+        self.source = source
+        self.on_select = on_select
+        self.context = context or (lambda: None)
+        self.limit = limit
+        self.debounce_ms = debounce_ms
+        self.var = textvariable or tk.StringVar()
+        self.entry = tk.Entry(self, textvariable=self.var, **entry_opts)
+        self.entry.pack(fill='x')
+        # Listbox overlays the widgets below the entry instead of pushing them down
+        self.listbox = tk.Listbox(self.winfo_toplevel(), height=min(limit, 8), exportselection=False)
+        self._pending = None
+        self._suppress = False
+
+        self.var.trace_add("write", self._on_change)
+        self.entry.bind("<Down>", lambda e: self._move(1))
+        self.entry.bind("<Up>", lambda e: self._move(-1))
+        self.entry.bind("<Return>", lambda e: self._choose())
+        self.entry.bind("<Escape>", lambda e: self._hide())
+        self.entry.bind("<FocusOut>", lambda e: self.after(150, self._hide))
+        self.listbox.bind("<ButtonRelease-1>", lambda e: self._choose())
+
+    def get(self):
+        return self.var.get().strip()
+
+    def set(self, value):
+        self._suppress = True
+        self.var.set(value)
+        self._suppress = False
+
+    def _on_change(self, *args):
+        if self._suppress:
+            return
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(self.debounce_ms, self._lookup)
+
+    def _lookup(self):
+        self._pending = None
+        prefix = self.get()
+        if not prefix:
+            self._hide()
+            if self.on_select is not None:
+                self.on_select("")   # cleared: no filter
+            return
+        background.submit(self.source.lookup, prefix, self.limit, self.context(),
+                          key=("typeahead", str(self)), owner=self, on_success=self._show,
+                          on_error=lambda e: print("❌ Error fetching suggestions:", e))
+
+    def _show(self, values):
+        self.listbox.delete(0, 'end')
+        if not values:
+            self._hide()
+            return
+        for value in values:
+            self.listbox.insert('end', value)
+        self.listbox.place(in_=self.entry, x=0, rely=1.0, relwidth=1.0, bordermode='outside')
+        self.listbox.lift()
+
+    def _hide(self):
+        self.listbox.place_forget()
+
+    def _move(self, step):
+        if not self.listbox.winfo_ismapped() or self.listbox.size() == 0:
+            return
+        current = self.listbox.curselection()
+        i = (current[0] + step) if current else (0 if step > 0 else self.listbox.size() - 1)
+        i = max(0, min(self.listbox.size() - 1, i))
+        self.listbox.selection_clear(0, 'end')
+        self.listbox.selection_set(i)
+        self.listbox.see(i)
+
+    def _choose(self):
+        current = self.listbox.curselection()
+        if self.listbox.winfo_ismapped() and current:
+            self.set(self.listbox.get(current[0]))
+        self._hide()
+        if self.on_select is not None:
+            self.on_select(self.get())
+
+    def destroy(self):
+        self.listbox.destroy()
+        super().destroy()